@@ -0,0 +1,63 @@
+"""
+Benchmark importing entries into a backend one save at a time, and in one
+transaction.
+
+Each FilestoreBackend.save_entry outside a transaction rewrites the whole file,
+and each TestBackend.save_entry rebuilds its whole cache, so importing N entries
+one at a time takes O(N^2) time.  A transaction commits them all at once.
+
+Usage::
+
+    python benchmarks/backend_import.py [--entries 1000 10000]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from superscore.backends.filestore import FilestoreBackend
+from superscore.backends.test import TestBackend
+from superscore.model import Parameter
+
+
+def time_import(make_backend, n_entries: int, batched: bool) -> float:
+    backend = make_backend()
+    entries = [Parameter(pv_name=f"PV{i}") for i in range(n_entries)]
+    t0 = time.perf_counter()
+    if batched:
+        backend.save_entries(entries)
+    else:
+        for entry in entries:
+            backend.save_entry(entry)
+    return time.perf_counter() - t0
+
+
+def main(n_entries_list, skip_unbatched_above: int) -> None:
+    print(f"{'backend':>10} {'entries':>8} {'one by one (s)':>15} "
+          f"{'transaction (s)':>16}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        backends = {
+            "filestore": lambda: FilestoreBackend(
+                str(Path(tmp_dir) / f"{time.perf_counter_ns()}.json")
+            ),
+            "test": TestBackend,
+        }
+        for name, make_backend in backends.items():
+            for n_entries in n_entries_list:
+                if n_entries > skip_unbatched_above:
+                    unbatched = "-"
+                else:
+                    unbatched = f"{time_import(make_backend, n_entries, False):.2f}"
+                batched = time_import(make_backend, n_entries, True)
+                print(f"{name:>10} {n_entries:>8} {unbatched:>15} {batched:>16.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument(
+        "--skip-unbatched-above", type=int, default=2_000,
+        help="Only time one-by-one imports of at most this many entries",
+    )
+    args = parser.parse_args()
+    main(args.entries, args.skip_unbatched_above)
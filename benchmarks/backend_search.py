@@ -0,0 +1,77 @@
+"""
+Benchmark the filestore and SQLite backends: importing, lookups and searches.
+
+Builds a database of N entries (Snapshots of 100 Setpoints each) in each
+backend, then times get_entry, a search by PV name, and a search for the
+Setpoints under one Snapshot.  The filestore checks every entry on each
+search, while SQLite answers these searches from its indexes.
+
+Usage::
+
+    python benchmarks/backend_search.py [--entries 1000 100000 1000000]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from superscore.backends.core import SearchTerm
+from superscore.backends.filestore import FilestoreBackend
+from superscore.backends.sqlite import SqliteBackend
+from superscore.model import Setpoint, Snapshot
+
+CHILDREN = 100
+
+
+def build_snapshots(n_entries: int):
+    snapshots = []
+    for i in range(max(n_entries // (CHILDREN + 1), 1)):
+        children = [
+            Setpoint(pv_name=f"SNAP{i}:PV{j}", data=float(j)) for j in range(CHILDREN)
+        ]
+        snapshots.append(Snapshot(title=f"snapshot {i}", children=children))
+    return snapshots
+
+
+def timed(func, repeat: int = 1) -> float:
+    """Mean time (seconds) taken by ``func``"""
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main(n_entries_list, repeat: int) -> None:
+    print(f"{'backend':>10} {'entries':>8} {'import (s)':>11} {'get (ms)':>9} "
+          f"{'pv_name (ms)':>13} {'ancestor (ms)':>14}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_entries in n_entries_list:
+            backends = {
+                "filestore": FilestoreBackend(str(Path(tmp_dir) / f"{n_entries}.json")),
+                "sqlite": SqliteBackend(str(Path(tmp_dir) / f"{n_entries}.db")),
+            }
+            for name, backend in backends.items():
+                snapshots = build_snapshots(n_entries)
+                target = snapshots[len(snapshots) // 2]
+                setpoint = target.children[0]
+                import_time = timed(lambda: backend.save_entries(snapshots))
+
+                get_time = timed(lambda: backend.get_entry(setpoint.uuid), repeat)
+                pv_time = timed(lambda: list(backend.search(
+                    SearchTerm("pv_name", "eq", setpoint.pv_name)
+                )), repeat)
+                ancestor_time = timed(lambda: list(backend.search(
+                    SearchTerm("ancestor", "eq", target.uuid),
+                    SearchTerm("entry_type", "eq", Setpoint),
+                )), repeat)
+                print(f"{name:>10} {n_entries:>8} {import_time:>11.2f} "
+                      f"{get_time * 1e3:>9.2f} {pv_time * 1e3:>13.2f} "
+                      f"{ancestor_time * 1e3:>14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.entries, args.repeat)
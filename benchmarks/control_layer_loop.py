@@ -0,0 +1,75 @@
+"""
+Benchmark the per-call overhead of synchronous ControlLayer requests, comparing
+a fresh event loop per call (the default) against a persistent event loop.
+
+Uses a shim that does no communication, so the times reported are the cost of
+the ControlLayer machinery itself.
+
+Usage::
+
+    python benchmarks/control_layer_loop.py [--repeat N]
+"""
+import argparse
+import time
+
+from superscore.control_layers import ControlLayer, EpicsData
+from superscore.control_layers._base_shim import _BaseShim
+
+
+class NullShim(_BaseShim):
+    """Shim that returns immediately without communicating"""
+    async def get(self, address: str) -> EpicsData:
+        return EpicsData(data=0)
+
+    async def put(self, address: str, value) -> None:
+        return
+
+
+def make_control_layer(persistent_loop: bool) -> ControlLayer:
+    cl = ControlLayer(persistent_loop=persistent_loop)
+    cl.shims = {'ca': NullShim()}
+    return cl
+
+
+def time_call(func, repeat: int) -> float:
+    """Return the best time (in seconds) of ``repeat`` calls of ``func``"""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(repeat: int = 20) -> None:
+    print(f"{'PVs':>8} {'operation':>10} {'asyncio.run (ms)':>18} "
+          f"{'persistent (ms)':>16} {'speedup':>8}")
+    for n_pvs in (1, 100, 10_000):
+        pvs = [f"BENCH:PV{i}" for i in range(n_pvs)]
+        values = list(range(n_pvs))
+        address = pvs[0] if n_pvs == 1 else pvs
+        value = values[0] if n_pvs == 1 else values
+        n_repeat = max(3, repeat // (1 + n_pvs // 1000))
+
+        results = {}
+        for persistent in (False, True):
+            cl = make_control_layer(persistent)
+            # warm up, starting the loop thread if necessary
+            cl.get(address)
+            results[persistent] = (
+                time_call(lambda: cl.get(address), n_repeat),
+                time_call(lambda: cl.put(address, value), n_repeat),
+            )
+            cl.close()
+
+        for i, op in enumerate(('get', 'put')):
+            fresh, persistent = results[False][i], results[True][i]
+            print(f"{n_pvs:>8} {op:>10} {fresh * 1e3:>18.3f} "
+                  f"{persistent * 1e3:>16.3f} {fresh / persistent:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.repeat)
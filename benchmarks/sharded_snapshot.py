@@ -0,0 +1,77 @@
+"""
+Benchmark bulk reads against a local caproto IOC, comparing a single process
+against reads sharded across worker processes.
+
+Serves N float PVs from a TempIOC (see superscore/tests/ioc/ioc_factory.py),
+then times ``ControlLayer.get`` of every PV.  The pure-python IOC may itself
+become the bottleneck at large N, so compare the relative timings.
+
+Usage::
+
+    python benchmarks/sharded_snapshot.py [--pvs 10000 50000 100000] [--workers 4]
+"""
+import argparse
+import os
+import time
+
+from superscore.client import Client
+from superscore.control_layers import ControlLayer
+from superscore.model import Setpoint
+from superscore.tests.ioc.ioc_factory import IOCFactory
+
+PREFIX = "SCOREBENCH:"
+
+
+def wait_for_ioc(pvs, timeout: float = 120.0) -> None:
+    """Wait until the last PV served by the IOC can be read"""
+    cl = ControlLayer(persistent_loop=True, timeout=1.0)
+    cl.health.failure_threshold = 0
+    deadline = time.monotonic() + timeout
+    try:
+        while time.monotonic() < deadline:
+            if not isinstance(cl.get(pvs[-1]), Exception):
+                return
+        raise TimeoutError("IOC did not start")
+    finally:
+        cl.close()
+
+
+def time_get(cl: ControlLayer, pvs) -> tuple[float, int]:
+    """Return the time taken to read ``pvs``, and the number of failed reads"""
+    t0 = time.perf_counter()
+    results = cl.get(pvs)
+    elapsed = time.perf_counter() - t0
+    return elapsed, sum(isinstance(result, Exception) for result in results)
+
+
+def main(n_pvs_list, workers: int, timeout: float) -> None:
+    print(f"{'PVs':>8} {'mode':>12} {'time (s)':>10} {'PVs/s':>10} {'failed':>7}")
+    for n_pvs in n_pvs_list:
+        entries = [Setpoint(pv_name=f"PV{i}", data=float(i)) for i in range(n_pvs)]
+        pvs = [PREFIX + entry.pv_name for entry in entries]
+        ioc_cls = IOCFactory.from_entries(entries, Client())
+
+        with ioc_cls(prefix=PREFIX):
+            wait_for_ioc(pvs)
+            modes = {
+                "1 process": ControlLayer(persistent_loop=True, timeout=timeout),
+                f"{workers} workers": ControlLayer(
+                    workers=workers, shard_threshold=1, timeout=timeout
+                ),
+            }
+            for mode, cl in modes.items():
+                # warm up, connecting channels and starting workers
+                cl.get(pvs)
+                elapsed, failed = time_get(cl, pvs)
+                print(f"{n_pvs:>8} {mode:>12} {elapsed:>10.2f} "
+                      f"{n_pvs / elapsed:>10.0f} {failed:>7}")
+                cl.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pvs", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    main(args.pvs, args.workers, args.timeout)
@@ -0,0 +1,139 @@
+"""
+Benchmark Client.snap, Client.apply and live tables against simulated PVs.
+
+Serves N PVs from the "sim://" shim (see superscore/control_layers/_sim.py),
+so large snapshots can be timed without an IOC.  A per-request latency and
+disconnect rate make the simulated PVs behave more like real ones.
+
+The live table case monitors every PV in a LivePVTableModel, with each PV
+sending updates at ``--monitor-rate`` Hz, and reports how many updates the
+model's CoalescingBuffer received and delivered, and the time the Qt thread
+spent applying each batch.  It needs a Qt platform (for example
+QT_QPA_PLATFORM=offscreen), and is skipped with ``--live-seconds 0``.
+
+Usage::
+
+    python benchmarks/sim_snapshot.py [--pvs 10000 100000] [--latency 0.001]
+"""
+import argparse
+import statistics
+import time
+
+from superscore.backends.test import TestBackend
+from superscore.client import Client
+from superscore.control_layers import ControlLayer
+from superscore.control_layers._sim import SimBehavior, SimShim
+from superscore.model import Collection, Parameter
+
+
+def live_table(
+    n_pvs: int,
+    behavior: SimBehavior,
+    max_in_flight: int,
+    seconds: float,
+) -> None:
+    """Monitor ``n_pvs`` PVs in a LivePVTableModel for ``seconds``"""
+    from qtpy import QtCore, QtWidgets
+
+    from superscore.widgets.views import LivePVTableModel
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    cl = ControlLayer(shims=["sim"], persistent_loop=True, max_in_flight=max_in_flight)
+    cl.shims = {"sim": SimShim(behavior=behavior, seed=0)}
+    client = Client(backend=TestBackend(), control_layer=cl)
+    entries = [Parameter(pv_name=f"sim://PV{i}") for i in range(n_pvs)]
+
+    t0 = time.perf_counter()
+    model = LivePVTableModel(client=client, entries=entries, use_monitors=True)
+    subscribe_time = time.perf_counter() - t0
+
+    # time the Qt thread spends applying each batch of updates
+    batch_times = []
+    apply_batch = model._monitor_batch_ready
+
+    def timed_apply_batch(batch):
+        t0 = time.perf_counter()
+        apply_batch(batch)
+        batch_times.append(time.perf_counter() - t0)
+
+    model.monitor_buffer.batch_ready.disconnect(apply_batch)
+    model.monitor_buffer.batch_ready.connect(timed_apply_batch)
+    model.monitor_buffer.reset_counters()
+
+    loop = QtCore.QEventLoop()
+    QtCore.QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec_()
+    buffer = model.monitor_buffer
+    received, delivered, batches = buffer.received, buffer.delivered, buffer.batches
+
+    model.stop_polling()
+    cl.close()
+    app.processEvents()
+
+    mean_batch = statistics.mean(batch_times) * 1000 if batch_times else 0.0
+    max_batch = max(batch_times, default=0.0) * 1000
+    print(f"{n_pvs:>8} {subscribe_time:>13.2f} {received / seconds:>12.0f} "
+          f"{delivered / seconds:>13.0f} {batches:>8} {mean_batch:>10.1f} "
+          f"{max_batch:>10.1f}")
+
+
+def main(
+    n_pvs_list,
+    latency: float,
+    jitter: float,
+    disconnect_rate: float,
+    max_in_flight: int,
+    monitor_rate: float,
+    live_seconds: float,
+) -> None:
+    behavior = SimBehavior(
+        latency=latency, latency_jitter=jitter, disconnect_rate=disconnect_rate
+    )
+    print(f"{'PVs':>8} {'snap (s)':>10} {'PVs/s':>10} {'apply (s)':>10} {'PVs/s':>10}")
+    for n_pvs in n_pvs_list:
+        cl = ControlLayer(shims=["sim"], persistent_loop=True, max_in_flight=max_in_flight)
+        cl.shims = {"sim": SimShim(behavior=behavior, seed=0)}
+        client = Client(backend=TestBackend(), control_layer=cl)
+        collection = Collection(
+            children=[Parameter(pv_name=f"sim://PV{i}") for i in range(n_pvs)]
+        )
+
+        t0 = time.perf_counter()
+        snapshot = client.snap(collection)
+        snap_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        client.apply(snapshot)
+        apply_time = time.perf_counter() - t0
+
+        print(f"{n_pvs:>8} {snap_time:>10.2f} {n_pvs / snap_time:>10.0f} "
+              f"{apply_time:>10.2f} {n_pvs / apply_time:>10.0f}")
+        cl.close()
+
+    if not live_seconds:
+        return
+    live_behavior = SimBehavior(
+        latency=latency, latency_jitter=jitter, disconnect_rate=disconnect_rate,
+        monitor_rate=monitor_rate, monitor_noise=0.1,
+    )
+    print(f"\nLive table, {monitor_rate} Hz per PV for {live_seconds} s")
+    print(f"{'PVs':>8} {'subscribe (s)':>13} {'received/s':>12} "
+          f"{'delivered/s':>13} {'batches':>8} {'mean (ms)':>10} {'max (ms)':>10}")
+    for n_pvs in n_pvs_list:
+        live_table(n_pvs, live_behavior, max_in_flight, live_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pvs", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--latency", type=float, default=0.001)
+    parser.add_argument("--jitter", type=float, default=0.0005)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--max-in-flight", type=int, default=None)
+    parser.add_argument("--monitor-rate", type=float, default=0.1)
+    parser.add_argument("--live-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    main(
+        args.pvs, args.latency, args.jitter, args.disconnect_rate, args.max_in_flight,
+        args.monitor_rate, args.live_seconds,
+    )
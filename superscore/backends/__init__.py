@@ -18,6 +18,9 @@ def _get_backend(backend: str) -> _Backend:
     if backend == 'test':
         from .test import TestBackend
         return TestBackend
+    if backend == 'sqlite':
+        from .sqlite import SqliteBackend
+        return SqliteBackend
 
     raise ValueError(f"Unknown backend {backend}")
 
@@ -35,6 +38,11 @@ def _init_backends() -> Dict[str, _Backend]:
     except ImportError as ex:
         logger.debug(f"Test Backend unavailable: {ex}")
 
+    try:
+        backends['sqlite'] = _get_backend('sqlite')
+    except ImportError as ex:
+        logger.debug(f"SQLite Backend unavailable: {ex}")
+
     return backends
 
 
@@ -1,9 +1,11 @@
 """
 Base superscore data storage backend interface
 """
+import contextlib
 import re
+import threading
 from collections.abc import Container, Generator
-from typing import Callable, Iterable, NamedTuple, Union
+from typing import Any, Callable, Iterable, NamedTuple, Union
 from uuid import UUID
 
 import superscore.tests.conftest_data
@@ -24,6 +26,18 @@ class _Backend:
     """
     Base class for data storage backend.
     """
+    @property
+    def _transaction_depth(self) -> int:
+        """Number of (nested) transactions open in the calling thread"""
+        return getattr(self._thread_state(), "transaction_depth", 0)
+
+    @_transaction_depth.setter
+    def _transaction_depth(self, depth: int) -> None:
+        self._thread_state().transaction_depth = depth
+
+    def _thread_state(self) -> threading.local:
+        # created on first use, as subclasses do not call __init__ here
+        return self.__dict__.setdefault("_thread_local", threading.local())
 
     def get_entry(self, meta_id: Union[UUID, str]) -> Entry:
         """
@@ -54,6 +68,84 @@ class _Backend:
         """
         raise NotImplementedError
 
+    def save_entries(self, entries: Iterable[Entry]) -> None:
+        """
+        Save each of ``entries`` into the database, in one transaction.
+        Throws EntryExistsError, saving none of ``entries``
+        """
+        with self.transaction():
+            for entry in entries:
+                self.save_entry(entry)
+
+    def update_entries(self, entries: Iterable[Entry]) -> None:
+        """
+        Update each of ``entries`` in the backend, in one transaction.
+        Throws EntryNotFoundError, updating none of ``entries``
+        """
+        with self.transaction():
+            for entry in entries:
+                self.update_entry(entry)
+
+    def delete_entries(self, entries: Iterable[Entry]) -> None:
+        """
+        Delete each of ``entries`` from the system, in one transaction.
+        Throws BackendError, deleting none of ``entries``
+        """
+        with self.transaction():
+            for entry in entries:
+                self.delete_entry(entry)
+
+    @contextlib.contextmanager
+    def transaction(self) -> Generator[None, None, None]:
+        """
+        Context manager grouping the mutations made in the ``with`` block into
+        one commit.  If the block raises, the mutations are rolled back and the
+        exception is re-raised.  Transactions opened inside another in the same
+        thread join the outermost one.  Transactions are tracked per thread, so
+        backends shared between threads must hold a lock from
+        ``_begin_transaction`` until the transaction ends.
+
+        .. code::
+
+            with backend.transaction():
+                backend.save_entry(collection)
+                backend.update_entry(snapshot)
+
+        Backends that do not override the ``_begin_transaction``,
+        ``_commit_transaction`` and ``_rollback_transaction`` hooks apply each
+        mutation immediately, and cannot roll them back.
+        """
+        if self._transaction_depth > 0:
+            self._transaction_depth += 1
+            try:
+                yield
+            finally:
+                self._transaction_depth -= 1
+            return
+
+        state = self._begin_transaction()
+        self._transaction_depth = 1
+        try:
+            yield
+        except BaseException:
+            self._transaction_depth = 0
+            self._rollback_transaction(state)
+            raise
+        self._transaction_depth = 0
+        self._commit_transaction()
+
+    def _begin_transaction(self) -> Any:
+        """Start a transaction, returning the state needed to roll it back"""
+        return None
+
+    def _commit_transaction(self) -> None:
+        """Make the mutations in the current transaction permanent"""
+        return
+
+    def _rollback_transaction(self, state: Any) -> None:
+        """Undo the mutations since ``_begin_transaction`` returned ``state``"""
+        return
+
     def search(self, *search_terms: SearchTermType) -> Generator[Entry, None, None]:
         """
         Yield Entry objects matching all ``search_terms``. Each SearchTerm has the format
@@ -117,20 +209,23 @@ def populate_backend(backend: _Backend, sources: Iterable[Union[Callable, str, R
     * Entries
     * Callables that return Roots or Entries
     * strings that search for test data callables, but critically not fixtures
-    """
-    for source in sources:
-        if isinstance(source, Callable):
-            data = source()
-        elif isinstance(source, str):
-            func = getattr(superscore.tests.conftest_data, source, False)
-            data = func()
-        elif isinstance(source, (Root, Entry)):
-            data = source
-        else:
-            raise ValueError(f"Unsupported source type: {type(source)}")
 
-        if isinstance(data, Root):
-            for entry in data.entries:
-                backend.save_entry(entry)
-        else:
-            backend.save_entry(data)
+    Every entry is saved in one transaction.
+    """
+    with backend.transaction():
+        for source in sources:
+            if isinstance(source, Callable):
+                data = source()
+            elif isinstance(source, str):
+                func = getattr(superscore.tests.conftest_data, source, False)
+                data = func()
+            elif isinstance(source, (Root, Entry)):
+                data = source
+            else:
+                raise ValueError(f"Unsupported source type: {type(source)}")
+
+            if isinstance(data, Root):
+                for entry in data.entries:
+                    backend.save_entry(entry)
+            else:
+                backend.save_entry(data)
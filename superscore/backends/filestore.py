@@ -2,19 +2,25 @@
 Backend for configurations backed by files
 """
 
+import atexit
 import contextlib
 import json
 import logging
 import os
 import shutil
+import threading
+import weakref
+from configparser import ConfigParser
 from dataclasses import fields, replace
-from functools import cache
-from typing import Any, Container, Dict, Generator, Optional, Union
+from functools import partial
+from typing import (Any, Container, Dict, Generator, List, Optional, Tuple,
+                    Union)
 from uuid import UUID, uuid4
 
 from apischema import deserialize, serialize
 
 from superscore.backends.core import SearchTermType, _Backend
+from superscore.backends.index import EntryIndex
 from superscore.errors import (BackendError, EntryExistsError,
                                EntryNotFoundError)
 from superscore.model import Entry, Nestable, Root
@@ -23,25 +29,85 @@ from superscore.utils import build_abs_path
 logger = logging.getLogger(__name__)
 
 
+def _flush_at_exit(backend_ref: weakref.ReferenceType) -> None:
+    """Flush the backend referenced by ``backend_ref``, if it is still alive"""
+    backend = backend_ref()
+    if backend is not None:
+        backend.flush()
+
+
 class FilestoreBackend(_Backend):
     """
     Filestore configuration backend.
 
-    Holds an entry cache, filled when a file is loaded.
-    All CRUD operations reconstruct the Root object and save a new version of
-    the database.
+    Holds a flattened entry cache, filled once when the file is first loaded
+    and kept in memory from then on.  Reads are served from the cache.
+    Operations that modify the cache mark it dirty, and dirty caches are saved
+    by reconstructing the Root object and atomically replacing the file.
     File storage is a json file containing serialized model dataclasses.
+
+    By default every modification is saved immediately.  With ``write_behind``,
+    modifications are batched, and saved by ``flush`` (called by ``close``, at
+    exit, and when the backend is garbage collected) or ``flush_interval``
+    seconds after the first unsaved change.
+
+    Mutations made in a ``transaction`` are saved together once it completes,
+    or undone if it raises.
+
+    In ``journal`` mode, the json file holds a base snapshot of the database,
+    and saving appends save, update and delete records to a JSON-lines journal
+    next to it (``path`` + ".journal") rather than rewriting the file.  Loading
+    replays the journal over the base.  Once the journal grows past
+    ``compact_threshold`` bytes, a background thread folds it into a new base.
+
+    Entries are returned as shallow copies, so filling or editing them does not
+    change the cache until they are saved with ``update_entry``.
+
+    Parameters
+    ----------
+    path : str
+        Path to the json file
+    cfg_path : Optional[str], optional
+        Path to the configuration file, which relative ``path``s are relative to
+    write_behind : bool, optional
+        Whether to batch modifications rather than saving each, by default False
+    flush_interval : Optional[float], optional
+        Time (seconds) after the first unsaved modification to save the
+        database, in ``write_behind`` mode.  By default None, only saving
+        on ``flush``.
+    journal : bool, optional
+        Whether to save modifications to an append-only journal, by default
+        False
+    compact_threshold : int, optional
+        Size (bytes) of journal to compact into the base file, by default 16 MiB
     """
     _entry_cache: Dict[UUID, Entry]
+    # secondary indexes over the entries in _entry_cache
+    _index: EntryIndex
     _root: Root
+    _flush_timer: Optional[threading.Timer]
+    # serialized journal records not yet appended to the journal
+    _journal_records: List[str]
+    _compaction_thread: Optional[threading.Thread]
 
     def __init__(
         self,
         path: str,
-        cfg_path: Optional[str] = None
+        cfg_path: Optional[str] = None,
+        write_behind: Union[bool, str] = False,
+        flush_interval: Optional[Union[float, str]] = None,
+        journal: Union[bool, str] = False,
+        compact_threshold: Union[int, str] = 2**24,
     ) -> None:
         self._entry_cache = {}
+        self._index = EntryIndex()
         self._root = None
+        self._dirty = False
+        self._lock = threading.RLock()
+        self._flush_timer = None
+        self._journal_records = []
+        self._compaction_lock = threading.Lock()
+        self._compaction_thread = None
         self.path = path
         if cfg_path is not None:
             cfg_dir = os.path.dirname(cfg_path)
@@ -49,10 +115,33 @@ class FilestoreBackend(_Backend):
         else:
             self.path = path
 
-    def _load_or_initialize(self) -> Dict[str, Any]:
+        # options read from configuration files arrive as strings
+        if isinstance(write_behind, str):
+            write_behind = ConfigParser.BOOLEAN_STATES[write_behind.lower()]
+        if isinstance(flush_interval, str):
+            flush_interval = float(flush_interval)
+        if isinstance(journal, str):
+            journal = ConfigParser.BOOLEAN_STATES[journal.lower()]
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.journal = journal
+        self.compact_threshold = int(compact_threshold)
+        self.journal_path = f"{self.path}.journal"
+        self._flush_at_exit = None
+        if self.write_behind:
+            # registered by weak reference, so the backend can still be freed
+            self._flush_at_exit = partial(_flush_at_exit, weakref.ref(self))
+            atexit.register(self._flush_at_exit)
+
+    @property
+    def dirty(self) -> bool:
+        """Whether the cache holds modifications not yet saved to the file"""
+        return self._dirty
+
+    def _load_or_initialize(self) -> Dict[UUID, Entry]:
         """
-        Load an existing database or initialize a new one.
-        Returns the entry cache for this backend
+        Load an existing database or initialize a new one, the first time it is
+        needed.  Returns the entry cache for this backend
         """
         if self._root is None:
             try:
@@ -62,17 +151,22 @@ class FilestoreBackend(_Backend):
                 self.initialize()
                 self._root = self.load()
 
-        # flatten create entry cache
-        self._entry_cache = {}
-        for entry in self._root.entries:
-            self.flatten_and_cache(entry)
+            # flatten create entry cache
+            self._entry_cache = {}
+            self._index.clear()
+            for entry in self._root.entries:
+                self.flatten_and_cache(entry)
+
+            if self.journal:
+                self._replay_journal()
 
         return self._entry_cache
 
     def flatten_and_cache(self, entry: Union[Entry, UUID]) -> None:
         """
         Flatten ``entry`` recursively, adding it to ``self._entry_cache`` if not
-        present already.
+        present already.  The entries ``entry`` references are cached as
+        shallow copies, leaving the caller's entries filled.
 
         If ``entry`` is already a UUID, it should have already been cached, and
         can be skipped.
@@ -87,6 +181,7 @@ class FilestoreBackend(_Backend):
         refs = entry.swap_to_uuids()
         for ref in refs:
             if isinstance(ref, Entry):
+                ref = replace(ref)
                 self.maybe_add_to_cache(ref)
                 self.flatten_and_cache(ref)
 
@@ -109,6 +204,7 @@ class FilestoreBackend(_Backend):
             return
 
         self._entry_cache[meta_id] = item
+        self._index.add(item)
 
     def initialize(self):
         """
@@ -131,7 +227,10 @@ class FilestoreBackend(_Backend):
             raise PermissionError("File {} already exists. Can not initialize "
                                   "a new database.".format(self.path))
         self._root = Root()
-        self.store()
+        if self.journal and os.path.exists(self.journal_path):
+            logger.warning(f"Discarding journal without a database: {self.journal_path}")
+            os.remove(self.journal_path)
+        self._write_file(self.path, serialize(Root, self._root))
 
     def reconstruct_root(self) -> Root:
         """
@@ -191,29 +290,35 @@ class FilestoreBackend(_Backend):
 
     def store(self) -> None:
         """
-        Stash the database in the JSON file.
+        Stash the database in the JSON file, or in ``journal`` mode append the
+        unsaved modifications to the journal.
+        """
+        with self._lock:
+            self._cancel_flush_timer()
+            if self.journal:
+                self._append_journal()
+            else:
+                self._write_file(self.path, serialize(Root, self.reconstruct_root()))
+            self._dirty = False
+
+    def _write_file(self, path: str, serialized: Any) -> None:
+        """
+        Write ``serialized`` to the JSON file at ``path``.
         This is a two-step process:
-        1. Write the database out to a temporary file
-        2. Move the temporary file over the previous database.
-        Step 2 is an atomic operation, ensuring that the database
+        1. Write the data out to a temporary file
+        2. Move the temporary file over the previous file.
+        Step 2 is an atomic operation, ensuring that the file
         does not get corrupted by an interrupted json.dump.
-        Parameters
-        ----------
-        db : dict
-            Dictionary to store in JSON.
         """
-        temp_path = self._temp_path()
-        self._root = self.reconstruct_root()
-        serialized = serialize(Root, self._root)
-
+        temp_path = self._temp_path(path)
         try:
             with open(temp_path, 'w') as fd:
                 json.dump(serialized, fd, indent=2)
                 fd.write('\n')
 
-            if os.path.exists(self.path):
-                shutil.copymode(self.path, temp_path)
-            shutil.move(temp_path, self.path)
+            if os.path.exists(path):
+                shutil.copymode(path, temp_path)
+            shutil.move(temp_path, path)
         except BaseException as ex:
             logger.debug('JSON db move failed: %s', ex, exc_info=ex)
             # remove temporary file
@@ -221,16 +326,236 @@ class FilestoreBackend(_Backend):
                 os.remove(temp_path)
             raise
 
-    def _temp_path(self) -> str:
+    def _journal(self, op: str, entry: Entry) -> None:
+        """Record a save, update or delete of ``entry`` for the journal"""
+        if not self.journal:
+            return
+        if op == "delete":
+            record = {"op": op, "uuid": str(entry.uuid)}
+        else:
+            record = {"op": op, "entry": serialize(Entry, entry)}
+        self._journal_records.append(json.dumps(record))
+
+    def _append_journal(self) -> None:
+        """
+        Append the recorded modifications to the journal, starting a compaction
+        if it has grown past ``compact_threshold``
         """
-        Return a temporary path to write the json file to during "store".
-        Includes a hash for uniqueness
+        if not self._journal_records:
+            return
+        data = "".join(f"{record}\n" for record in self._journal_records)
+        with open(self.journal_path, "a+b") as fd:
+            if fd.seek(0, os.SEEK_END) > 0:
+                fd.seek(-1, os.SEEK_END)
+                if fd.read(1) != b"\n":
+                    # end a record torn by an interrupted append
+                    fd.write(b"\n")
+            fd.write(data.encode())
+            size = fd.tell()
+        self._journal_records = []
+
+        if size > self.compact_threshold:
+            self._start_compaction()
+
+    def _replay_journal(self) -> None:
+        """
+        Apply the records in the journal to the entry cache.  Replaying is
+        idempotent, so records already folded into the base by an interrupted
+        compaction are harmless.
+        """
+        try:
+            fd = open(self.journal_path)
+        except FileNotFoundError:
+            return
+
+        with fd:
+            for line_number, line in enumerate(fd, start=1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(
+                        f"Skipping torn journal record: {self.journal_path}, "
+                        f"line {line_number}"
+                    )
+                    continue
+
+                if record["op"] == "delete":
+                    self._delete(UUID(record["uuid"]))
+                    continue
+                entry = deserialize(Entry, record["entry"])
+                if record["op"] == "save":
+                    if entry.uuid in self._entry_cache:
+                        self._delete(entry.uuid)
+                    self._save(entry)
+                else:
+                    self._update(entry)
+
+    def compact(self) -> None:
+        """
+        Fold the journal into a new base file, then drop the folded records from
+        the journal.  Both files are replaced atomically, and a compaction
+        interrupted between the two only leaves records that are replayed
+        harmlessly.  Other threads may keep using the backend while the new base
+        is written, but this must not be called inside a transaction.
+        """
+        if not self.journal:
+            return
+        with self._compaction_lock:
+            with self._lock:
+                self._load_or_initialize()
+                self.flush()
+                try:
+                    journal_size = os.path.getsize(self.journal_path)
+                except FileNotFoundError:
+                    return
+                root = self.reconstruct_root()
+
+            # cached entries are replaced rather than modified, so ``root`` can
+            # be serialized without the lock
+            self._write_file(self.path, serialize(Root, root))
+
+            with self._lock:
+                with open(self.journal_path, "rb") as fd:
+                    fd.seek(journal_size)
+                    remainder = fd.read()
+                if not remainder:
+                    os.remove(self.journal_path)
+                    return
+                temp_path = self._temp_path(self.journal_path)
+                try:
+                    with open(temp_path, "wb") as fd:
+                        fd.write(remainder)
+                    shutil.move(temp_path, self.journal_path)
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+
+    def _start_compaction(self) -> None:
+        """Compact the journal in a background thread, unless already running"""
+        if self._compaction_lock.locked():
+            return
+        self._compaction_thread = threading.Thread(
+            target=self._background_compact, name="filestore-compaction", daemon=True
+        )
+        self._compaction_thread.start()
+
+    def _background_compact(self) -> None:
+        try:
+            # appends made while compacting do not start another compaction,
+            # so repeat until they leave the journal below the threshold
+            while self._journal_size() > self.compact_threshold:
+                self.compact()
+        except Exception as ex:
+            # the journal is left as it was, to be compacted later
+            logger.error(f"Could not compact journal {self.journal_path}: {ex}")
+
+    def _journal_size(self) -> int:
+        """Return the size (bytes) of the journal, 0 if it does not exist"""
+        try:
+            return os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            return 0
+
+    def flush(self) -> None:
+        """Save the database if it holds unsaved modifications"""
+        with self._lock:
+            if self._dirty:
+                self.store()
+
+    def close(self) -> None:
+        """
+        Save any unsaved modifications, stop the flush timer and wait for any
+        compaction to finish
+        """
+        self.flush()
+        if self._flush_at_exit is not None:
+            atexit.unregister(self._flush_at_exit)
+            self._flush_at_exit = None
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+            self._compaction_thread = None
+
+    def __del__(self) -> None:
+        # as file objects do, save modifications that would otherwise be lost
+        flush_at_exit = self.__dict__.get("_flush_at_exit")
+        if flush_at_exit is not None:
+            atexit.unregister(flush_at_exit)
+            self.flush()
+
+    def _mark_dirty(self) -> None:
+        """
+        Record that the cache has been modified, saving it now or (in
+        ``write_behind`` mode) scheduling a save
+        """
+        self._dirty = True
+        if not self.write_behind:
+            self.store()
+        elif self.flush_interval is not None and self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_interval, self._timed_flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _begin_transaction(
+        self,
+    ) -> Tuple[Dict[UUID, Entry], List[Entry], bool, int]:
+        # held until the transaction ends, so it is never saved half-done
+        self._lock.acquire()
+        try:
+            self._load_or_initialize()
+        except BaseException:
+            self._lock.release()
+            raise
+        # mutations replace cached entries rather than modifying them, so
+        # shallow copies are enough to roll back to
+        return (
+            dict(self._entry_cache),
+            list(self._root.entries),
+            self._dirty,
+            len(self._journal_records),
+        )
+
+    def _commit_transaction(self) -> None:
+        try:
+            if self._dirty:
+                self._mark_dirty()
+        finally:
+            self._lock.release()
+
+    def _rollback_transaction(
+        self,
+        state: Tuple[Dict[UUID, Entry], List[Entry], bool, int],
+    ) -> None:
+        self._entry_cache, self._root.entries, self._dirty, n_records = state
+        self._index.rebuild(self._entry_cache.values())
+        del self._journal_records[n_records:]
+        self._lock.release()
+
+    def _timed_flush(self) -> None:
+        with self._lock:
+            self._flush_timer = None
+            try:
+                self.flush()
+            except Exception as ex:
+                # leave the cache dirty, to be saved by a later flush
+                logger.error(f"Could not save database to {self.path}: {ex}")
+
+    def _cancel_flush_timer(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+    def _temp_path(self, path: Optional[str] = None) -> str:
+        """
+        Return a temporary path to write the json file (or ``path``) to during
+        "store".  Includes a hash for uniqueness
         (in the cases where multiple temp files are written at once).
         """
-        directory = os.path.dirname(self.path)
+        path = self.path if path is None else path
+        directory = os.path.dirname(path)
         filename = (
             f"_{str(uuid4())[:8]}"
-            f"_{os.path.basename(self.path)}"
+            f"_{os.path.basename(path)}"
         )
         return os.path.join(directory, filename)
 
@@ -245,13 +570,13 @@ class FilestoreBackend(_Backend):
 
     @property
     def root(self) -> Root:
-        """Refresh the cache and return the root object"""
-        with self._load_and_store_context():
-            return self._root
+        """Return the root object, filled with copies of every entry"""
+        with self._load_context():
+            return self.reconstruct_root()
 
     def get_entry(self, uuid: Union[UUID, str]) -> Entry:
         """Return the entry with ``uuid``"""
-        with self._load_and_store_context() as db:
+        with self._load_context() as db:
             if isinstance(uuid, str):
                 uuid = UUID(uuid)
             result = db.get(uuid)
@@ -259,7 +584,7 @@ class FilestoreBackend(_Backend):
         if result is None:
             raise EntryNotFoundError(f"Entry {uuid} could not be found")
 
-        return result
+        return replace(result)
 
     def save_entry(self, entry: Entry) -> None:
         """
@@ -270,8 +595,8 @@ class FilestoreBackend(_Backend):
             if db.get(entry.uuid):
                 raise EntryExistsError("Entry already exists, try updating the "
                                        "entry instead of saving it")
-            self.flatten_and_cache(entry)
-            self._root.entries.append(entry)
+            self._journal("save", entry)
+            self._save(entry)
 
     def update_entry(self, entry: Entry) -> None:
         """Updates ``entry``.  Looks for references"""
@@ -279,39 +604,76 @@ class FilestoreBackend(_Backend):
             if not db.get(entry.uuid):
                 raise BackendError("Entry does not exist, cannot update")
 
-            db[entry.uuid] = entry
+            self._journal("update", entry)
+            self._update(entry)
 
     def delete_entry(self, entry: Entry) -> None:
         """Delete meta_id from the system (all instances)"""
-        with self._load_and_store_context() as db:
-            db.pop(entry.uuid, None)
+        with self._load_and_store_context():
+            self._journal("delete", entry)
+            self._delete(entry.uuid)
+
+    def _save(self, entry: Entry) -> None:
+        self.flatten_and_cache(entry)
+        # cache a copy, so later edits to the caller's entry are not saved
+        entry = replace(entry)
+        self._entry_cache[entry.uuid] = entry
+        self._index.add(entry)
+        self._root.entries.append(entry)
+
+    def _update(self, entry: Entry) -> None:
+        # flatten a copy, leaving the caller's entry filled
+        entry = replace(entry)
+        self._entry_cache[entry.uuid] = entry
+        self.flatten_and_cache(entry)
+        self._index.add(entry)
+
+    def _delete(self, uuid: UUID) -> None:
+        self._entry_cache.pop(uuid, None)
+        self._index.remove(uuid)
+        self._root.entries = [
+            root_child for root_child in self._root.entries
+            if root_child.uuid != uuid
+        ]
 
     def search(self, *search_terms: SearchTermType) -> Generator[Entry, None, None]:
         """
         Return entries that match all ``search_terms``.
         Keys are attributes on `Entry` subclasses, or special keywords.
         Values can be a single value or a tuple of values depending on operator.
+        Terms on indexed attributes are answered by ``EntryIndex``, and only the
+        remaining terms are checked against each candidate entry.
         """
-        reachable = cache(self._gather_reachable)
-        with self._load_and_store_context() as db:
-            for entry in db.values():
-                conditions = []
-                for attr, op, target in search_terms:
-                    # TODO: search for child pvs?
-                    if attr == "entry_type":
-                        conditions.append(isinstance(entry, target))
-                    elif attr == "ancestor":
-                        # `target` must be UUID since `reachable` is cached
-                        conditions.append(entry.uuid in reachable(target))
-                    else:
-                        try:
-                            # check entry attribute by name
-                            value = getattr(entry, attr)
-                            conditions.append(self.compare(op, value, target))
-                        except AttributeError:
-                            conditions.append(False)
-                if all(conditions):
-                    yield entry
+        with self._load_context() as db:
+            # the cache may be modified while results are consumed
+            candidates, search_terms = self._index.plan(search_terms)
+            if candidates is None:
+                entries = list(db.values())
+            else:
+                entries = [db[uuid] for uuid in self._index.ordered(candidates)]
+            # `target` must be a UUID, to be used as a key
+            reachable = {
+                target: self._gather_reachable(target)
+                for attr, _, target in search_terms if attr == "ancestor"
+            }
+
+        for entry in entries:
+            conditions = []
+            for attr, op, target in search_terms:
+                # TODO: search for child pvs?
+                if attr == "entry_type":
+                    conditions.append(isinstance(entry, target))
+                elif attr == "ancestor":
+                    conditions.append(entry.uuid in reachable[target])
+                else:
+                    try:
+                        # check entry attribute by name
+                        value = getattr(entry, attr)
+                        conditions.append(self.compare(op, value, target))
+                    except AttributeError:
+                        conditions.append(False)
+            if all(conditions):
+                yield replace(entry)
 
     def _gather_reachable(self, ancestor: Union[Entry, UUID]) -> Container[UUID]:
         """
@@ -320,21 +682,37 @@ class FilestoreBackend(_Backend):
         """
         reachable = set()
         q = [ancestor]
-        while len(q) > 0:
-            cur = q.pop()
-            if not isinstance(cur, Entry):
-                cur = self._entry_cache[cur]
-            reachable.add(cur.uuid)
-            if isinstance(cur, Nestable):
-                q.extend(cur.children)
+        with self._lock:
+            while len(q) > 0:
+                cur = q.pop()
+                if not isinstance(cur, Entry):
+                    cur = self._entry_cache[cur]
+                reachable.add(cur.uuid)
+                if isinstance(cur, Nestable):
+                    q.extend(cur.children)
         return reachable
 
     @contextlib.contextmanager
-    def _load_and_store_context(self) -> Generator[Dict[UUID, Any], None, None]:
+    def _load_context(self) -> Generator[Dict[UUID, Any], None, None]:
         """
-        Context manager used to load, and optionally store the JSON database.
+        Context manager used to read the JSON database, loading it if necessary.
         Yields the flattened entry cache
         """
-        db = self._load_or_initialize()
-        yield db
-        self.store()
+        with self._lock:
+            yield self._load_or_initialize()
+
+    @contextlib.contextmanager
+    def _load_and_store_context(self) -> Generator[Dict[UUID, Any], None, None]:
+        """
+        Context manager used to modify the JSON database, loading it if necessary.
+        Yields the flattened entry cache, which is saved (or scheduled to be
+        saved) once the block completes.
+        """
+        with self._lock:
+            db = self._load_or_initialize()
+            yield db
+            if self._transaction_depth > 0:
+                # saved when the transaction is committed
+                self._dirty = True
+            else:
+                self._mark_dirty()
@@ -0,0 +1,253 @@
+"""
+Secondary in-memory indexes for searching backends that hold entries in memory
+"""
+from __future__ import annotations
+
+import bisect
+from datetime import datetime, timedelta, timezone
+from typing import (Any, Dict, Iterable, List, NamedTuple, Optional, Set,
+                    Tuple, Type)
+from uuid import UUID
+
+from superscore.backends.core import SearchTermType
+from superscore.model import Entry
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+# attributes with a hash index
+HASHED = ("pv_name", "title")
+
+
+def _time_key(time: Any) -> Optional[int]:
+    """
+    Return ``time`` as integer microseconds since the epoch, or None if it is
+    not a timezone-aware datetime (which cannot be compared with aware ones)
+    """
+    if isinstance(time, datetime) and time.tzinfo is not None:
+        return (time - _EPOCH) // _MICROSECOND
+    return None
+
+
+class _Keys(NamedTuple):
+    """What an entry was indexed under, so it can be removed later"""
+    entry_type: Type[Entry]
+    hashed: Tuple[Tuple[str, Any], ...]
+    time: Optional[int]
+    tags: Optional[frozenset]
+
+
+class EntryIndex:
+    """
+    Secondary indexes over a set of entries, answering search terms with the
+    UUIDs of the matching entries without checking every entry.
+
+    Holds hash indexes on uuid, entry type, ``pv_name`` and ``title``, a
+    sorted index on ``creation_time`` for lt / gt range terms, and an index of
+    tags for gt (superset) terms.  Entries are added with ``add`` (which
+    re-indexes entries already present) and removed with ``remove``, and must
+    be re-added after being modified.
+
+    ``plan`` splits search terms into the UUIDs matching the indexed terms, and
+    the terms left to be checked against each of those entries.
+    """
+    _keys: Dict[UUID, _Keys]
+    _order: Dict[UUID, int]
+    _by_type: Dict[type, Set[UUID]]
+    _hashed: Dict[str, Dict[Any, Set[UUID]]]
+    _times: Dict[UUID, int]
+    _by_tag: Dict[Any, Set[UUID]]
+    _tagged: Set[UUID]
+
+    def __init__(self, entries: Iterable[Entry] = ()):
+        self.rebuild(entries)
+
+    def clear(self) -> None:
+        """Remove every entry from the index"""
+        self._keys = {}
+        self._order = {}
+        self._next_order = 0
+        self._by_type = {}
+        self._hashed = {attr: {} for attr in HASHED}
+        self._times = {}
+        # creation times in sorted order, and the matching UUIDs.  May hold
+        # stale pairs for removed entries, which are skipped by lookups.
+        self._time_keys: List[int] = []
+        self._time_uuids: List[UUID] = []
+        self._times_sorted = True
+        self._naive_times = 0
+        self._by_tag = {}
+        self._tagged = set()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, uuid: UUID) -> bool:
+        return uuid in self._keys
+
+    def add(self, entry: Entry) -> None:
+        """Index ``entry``, replacing any previous version of it"""
+        uuid = entry.uuid
+        if uuid in self._keys:
+            self._unindex(uuid)
+        else:
+            self._order[uuid] = self._next_order
+            self._next_order += 1
+
+        entry_type = type(entry)
+        self._by_type.setdefault(entry_type, set()).add(uuid)
+
+        hashed = []
+        for attr in HASHED:
+            try:
+                value = getattr(entry, attr)
+                self._hashed[attr].setdefault(value, set()).add(uuid)
+            except (AttributeError, TypeError):
+                # missing or unhashable
+                continue
+            hashed.append((attr, value))
+
+        time = _time_key(entry.creation_time)
+        if time is None:
+            self._naive_times += 1
+        else:
+            self._times[uuid] = time
+            if self._time_keys and time < self._time_keys[-1]:
+                self._times_sorted = False
+            self._time_keys.append(time)
+            self._time_uuids.append(uuid)
+
+        tags = None
+        if hasattr(entry, "tags"):
+            tags = frozenset(entry.tags)
+            self._tagged.add(uuid)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(uuid)
+
+        self._keys[uuid] = _Keys(entry_type, tuple(hashed), time, tags)
+
+    def rebuild(self, entries: Iterable[Entry]) -> None:
+        """Replace the contents of the index with ``entries``"""
+        self.clear()
+        for entry in entries:
+            self.add(entry)
+
+    def remove(self, uuid: UUID) -> None:
+        """Remove the entry with ``uuid`` from the index, if present"""
+        if uuid in self._keys:
+            self._unindex(uuid)
+            del self._order[uuid]
+
+    def _unindex(self, uuid: UUID) -> None:
+        keys = self._keys.pop(uuid)
+        self._by_type[keys.entry_type].discard(uuid)
+        for attr, value in keys.hashed:
+            self._hashed[attr][value].discard(uuid)
+        if keys.time is None:
+            self._naive_times -= 1
+        else:
+            # the pair left in the sorted lists is skipped by lookups
+            del self._times[uuid]
+        if keys.tags is not None:
+            self._tagged.discard(uuid)
+            for tag in keys.tags:
+                self._by_tag[tag].discard(uuid)
+
+    def ordered(self, uuids: Iterable[UUID]) -> List[UUID]:
+        """Return ``uuids`` in the order their entries were first indexed"""
+        return sorted(uuids, key=self._order.__getitem__)
+
+    def plan(
+        self,
+        search_terms: Iterable[SearchTermType],
+    ) -> Tuple[Optional[Set[UUID]], List[SearchTermType]]:
+        """
+        Split ``search_terms`` into the UUIDs of the entries matching every term
+        the indexes can answer (None if they can answer none), and the terms
+        left to check against each entry.
+        """
+        candidates = None
+        remaining = []
+        for attr, op, target in search_terms:
+            matches = self.lookup(attr, op, target)
+            if matches is None:
+                remaining.append((attr, op, target))
+            elif candidates is None:
+                candidates = set(matches)
+            else:
+                candidates &= matches
+        return candidates, remaining
+
+    def lookup(self, attr: str, op: str, target: Any) -> Optional[Set[UUID]]:
+        """
+        Return the UUIDs of the entries matching the term (``attr``, ``op``,
+        ``target``), exactly as ``_Backend.compare`` would, or None if the
+        indexes cannot answer it.  The result must not be modified.
+        """
+        if attr == "entry_type":
+            try:
+                return set().union(*(
+                    uuids for entry_type, uuids in self._by_type.items()
+                    if issubclass(entry_type, target)
+                ))
+            except TypeError:
+                # not a type, left to fail as it would without an index
+                return None
+        if attr == "uuid":
+            targets = self._hash_targets(op, target, UUID)
+            if targets is None:
+                return None
+            return {uuid for uuid in targets if uuid in self._keys}
+        if attr in HASHED:
+            targets = self._hash_targets(op, target, str)
+            if targets is None:
+                return None
+            index = self._hashed[attr]
+            return set().union(*(index.get(value, ()) for value in targets))
+        if attr == "creation_time" and op in ("lt", "gt"):
+            return self._time_range(op, target)
+        if attr == "tags" and op == "gt" and isinstance(target, (set, frozenset)):
+            try:
+                tag_sets = [self._by_tag.get(tag, set()) for tag in target]
+            except TypeError:
+                return None
+            return self._tagged.intersection(*tag_sets)
+        return None
+
+    @staticmethod
+    def _hash_targets(op: str, target: Any, value_type: type) -> Optional[List[Any]]:
+        """
+        Return the values to look up for an eq or in term, if each is a
+        ``value_type`` (and so compares equal only to values that hash equal)
+        """
+        if op == "eq":
+            targets = [target]
+        elif op == "in" and isinstance(target, (tuple, list, set, frozenset)):
+            targets = list(target)
+        else:
+            return None
+        if all(isinstance(value, value_type) for value in targets):
+            return targets
+        return None
+
+    def _time_range(self, op: str, target: Any) -> Optional[Set[UUID]]:
+        time = _time_key(target)
+        if time is None or self._naive_times:
+            return None
+        if not self._times_sorted or len(self._time_keys) > 2 * len(self._times) + 1000:
+            # sort, and drop stale pairs
+            pairs = sorted((time, uuid) for uuid, time in self._times.items())
+            self._time_keys = [pair[0] for pair in pairs]
+            self._time_uuids = [pair[1] for pair in pairs]
+            self._times_sorted = True
+
+        if op == "lt":
+            uuids = self._time_uuids[:bisect.bisect_right(self._time_keys, time)]
+            keys = self._time_keys
+        else:
+            start = bisect.bisect_left(self._time_keys, time)
+            uuids = self._time_uuids[start:]
+            keys = self._time_keys[start:]
+        return {
+            uuid for uuid, key in zip(uuids, keys) if self._times.get(uuid) == key
+        }
@@ -0,0 +1,503 @@
+"""
+Backend for configurations backed by an SQLite database
+"""
+
+import contextlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import fields, replace
+from datetime import datetime
+from enum import Flag
+from typing import (Any, Dict, Generator, Iterable, List, Optional, Set, Tuple,
+                    Type, Union)
+from uuid import UUID
+
+from apischema import deserialization_method, serialization_method
+
+from superscore.backends.core import SearchTermType, _Backend
+from superscore.errors import (BackendError, EntryExistsError,
+                               EntryNotFoundError)
+from superscore.model import Entry, Root
+from superscore.serialization import get_all_subclasses
+from superscore.utils import build_abs_path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    uuid TEXT PRIMARY KEY,
+    entry_type TEXT NOT NULL,
+    pv_name TEXT,
+    title TEXT,
+    description TEXT,
+    creation_time REAL,
+    -- 1 if the entry was saved directly, 0 if saved as another entry's child
+    top_level INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_entry_type ON entries (entry_type);
+CREATE INDEX IF NOT EXISTS entries_pv_name ON entries (pv_name);
+CREATE INDEX IF NOT EXISTS entries_title ON entries (title);
+CREATE INDEX IF NOT EXISTS entries_creation_time ON entries (creation_time);
+CREATE TABLE IF NOT EXISTS links (
+    parent TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    child TEXT NOT NULL,
+    PRIMARY KEY (parent, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS links_child ON links (child);
+CREATE TABLE IF NOT EXISTS tags (
+    uuid TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (uuid, tag)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);
+"""
+
+# Entry fields also held in their own columns
+COLUMNS = ("uuid", "pv_name", "title", "description", "creation_time")
+
+# UUIDs of the entries reachable through links from the parameter, including it
+REACHABLE = (
+    "WITH RECURSIVE reachable(uuid) AS ("
+    "SELECT ? UNION SELECT links.child FROM links "
+    "JOIN reachable ON links.parent = reachable.uuid"
+    ") SELECT uuid FROM reachable"
+)
+
+# compiled once, rather than looked up for every entry
+_deserialize_entry = deserialization_method(Entry)
+_serialize_entry = serialization_method(Entry)
+
+# SQLite limits the number of parameters in a statement
+CHUNK_SIZE = 500
+
+# Tag types that can be read back, by qualified name.  Tags are stored by name,
+# and names are only ever looked up here: nothing named in a database file is
+# imported.
+_tag_types: Dict[str, Type[Flag]] = {}
+
+
+def _tag_type_name(tag_type: Type[Flag]) -> str:
+    return f"{tag_type.__module__}:{tag_type.__qualname__}"
+
+
+def register_tag_type(tag_type: Type[Flag]) -> None:
+    """
+    Allow tags of ``tag_type`` to be read from SQLite databases.  Types are
+    registered by module and qualified name, and are registered automatically
+    when tags of that type are saved.  Processes that only read tags must
+    register their types before loading entries.
+    """
+    _tag_types.setdefault(_tag_type_name(tag_type), tag_type)
+
+
+def _tag_name(tag: Flag) -> str:
+    """Name a tag uniquely as "module:qualified type name:value\""""
+    tag_type = type(tag)
+    register_tag_type(tag_type)
+    return f"{_tag_type_name(tag_type)}:{tag.value}"
+
+
+def _tag_from_name(name: str) -> Optional[Flag]:
+    """Return the tag named by ``name``, or None if its type is not registered"""
+    type_name, value = name.rsplit(":", 1)
+    tag_type = _tag_types.get(type_name)
+    if tag_type is None:
+        logger.warning(f"Tag type {type_name} is not registered, dropping tag")
+        return None
+    return tag_type(int(value))
+
+
+def _regexp(pattern: str, value: Optional[str]) -> bool:
+    return value is not None and re.search(pattern, value) is not None
+
+
+def _entry_types(*bases: type) -> List[str]:
+    """Names of the Entry types that are subclasses of any of ``bases``"""
+    entry_types = (Entry, *get_all_subclasses(Entry))
+    return sorted({cls.__name__ for cls in entry_types if issubclass(cls, bases)})
+
+
+def _entry_types_with(attr: str) -> List[str]:
+    """Names of the Entry types with a field called ``attr``"""
+    return sorted(
+        cls.__name__ for cls in (Entry, *get_all_subclasses(Entry))
+        if attr in {fld.name for fld in fields(cls)}
+    )
+
+
+def _chunks(items: List[Any]) -> Iterable[List[Any]]:
+    for i in range(0, len(items), CHUNK_SIZE):
+        yield items[i:i + CHUNK_SIZE]
+
+
+class SqliteBackend(_Backend):
+    """
+    SQLite configuration backend.
+
+    Entries are stored in an ``entries`` table.  Each row holds the serialized
+    entry, with its children as UUID references, and copies of the fields most
+    often searched (type, PV name, title, description and creation time) in
+    indexed columns.  The children of Collections and Snapshots are also held
+    in a ``links`` table of (parent, position, child) rows, and tags in a
+    ``tags`` table, both indexed.
+
+    Searches are translated into SQL where possible: eq, lt, gt, in and like
+    on the indexed columns, entry_type, ancestor (through a recursive query
+    over ``links``), and gt on tags.  Other terms are checked in Python
+    against the entries the SQL query returns.
+
+    Tags are stored by the name of their type, and read back only for types
+    registered with ``register_tag_type`` (which saving a tag does).
+
+    Every mutation is a database transaction, and ``transaction`` groups
+    mutations into one.  Entries are returned as new objects, so filling or
+    editing them does not change the database until they are saved.
+
+    Parameters
+    ----------
+    path : str, optional
+        Path to the database file, by default ":memory:" for a database that
+        only lasts as long as the backend.  Created if it does not exist.
+    cfg_path : Optional[str], optional
+        Path to the configuration file, which relative ``path``s are relative to
+    """
+    def __init__(self, path: str = ":memory:", cfg_path: Optional[str] = None):
+        path = str(path)
+        if cfg_path is not None and path != ":memory:":
+            path = build_abs_path(os.path.dirname(cfg_path), path)
+        self.path = path
+        self._lock = threading.RLock()
+        # transactions are managed explicitly, rather than by the sqlite3 module
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.create_function("regexp", 2, _regexp, deterministic=True)
+        self._conn.executescript(SCHEMA)
+        # sample a bounded number of rows when analyzing, so it stays cheap
+        self._conn.execute("PRAGMA analysis_limit = 1000")
+        self._analyze()
+
+    def _analyze(self) -> None:
+        """
+        Update the statistics the query planner chooses indexes with.  Without
+        them, SQLite may scan e.g. every Setpoint rather than look up the few
+        entries under an ancestor.
+        """
+        self._conn.execute("ANALYZE")
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    @contextlib.contextmanager
+    def _write(self) -> Generator[sqlite3.Connection, None, None]:
+        """
+        Context manager making the ``with`` block one database transaction,
+        unless it is part of a larger one.  Yields the connection
+        """
+        with self._lock:
+            if self._transaction_depth > 0:
+                yield self._conn
+                return
+            self._conn.execute("BEGIN")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _begin_transaction(self) -> None:
+        # held until the transaction ends
+        self._lock.acquire()
+        try:
+            self._conn.execute("BEGIN")
+        except BaseException:
+            self._lock.release()
+            raise
+
+    def _commit_transaction(self) -> None:
+        try:
+            self._conn.execute("COMMIT")
+            # transactions are usually large imports
+            self._analyze()
+        finally:
+            self._lock.release()
+
+    def _rollback_transaction(self, state: None) -> None:
+        try:
+            self._conn.execute("ROLLBACK")
+        finally:
+            self._lock.release()
+
+    def _exists(self, uuid: UUID) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM entries WHERE uuid = ?", (str(uuid),)
+        ).fetchone()
+        return row is not None
+
+    def _insert(self, entry: Entry, top_level: bool) -> None:
+        """
+        Insert ``entry``, and any child entries not already stored.  ``entry``
+        itself is not modified.
+        """
+        flat = replace(entry)
+        refs = flat.swap_to_uuids()
+        self._write_row(flat, top_level)
+        for ref in refs:
+            if isinstance(ref, Entry) and not self._exists(ref.uuid):
+                self._insert(ref, top_level=False)
+
+    def _write_row(self, flat: Entry, top_level: bool) -> None:
+        """Write the row, links and tags for the flattened entry ``flat``"""
+        uuid = str(flat.uuid)
+        tags = getattr(flat, "tags", set())
+        if tags:
+            flat = replace(flat, tags=set())
+        body = json.dumps(_serialize_entry(flat), separators=(",", ":"))
+        self._conn.execute(
+            # updated in place, so the row keeps its rowid (and order)
+            "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(uuid) DO UPDATE SET entry_type = excluded.entry_type, "
+            "pv_name = excluded.pv_name, title = excluded.title, "
+            "description = excluded.description, "
+            "creation_time = excluded.creation_time, "
+            "top_level = excluded.top_level, body = excluded.body",
+            (
+                uuid,
+                type(flat).__name__,
+                getattr(flat, "pv_name", None),
+                getattr(flat, "title", None),
+                flat.description,
+                flat.creation_time.timestamp(),
+                int(top_level),
+                body,
+            ),
+        )
+        self._conn.execute("DELETE FROM links WHERE parent = ?", (uuid,))
+        self._conn.executemany(
+            "INSERT INTO links VALUES (?, ?, ?)",
+            [
+                (uuid, position, str(child))
+                for position, child in enumerate(getattr(flat, "children", []))
+            ],
+        )
+        self._conn.execute("DELETE FROM tags WHERE uuid = ?", (uuid,))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO tags VALUES (?, ?)",
+            [(uuid, _tag_name(tag)) for tag in tags],
+        )
+
+    def _load(self, rows: List[Tuple[str, str]]) -> List[Entry]:
+        """Deserialize entries from (uuid, body) rows, and restore their tags"""
+        entries = [_deserialize_entry(json.loads(body)) for _, body in rows]
+        tagged = {
+            str(entry.uuid): entry for entry in entries if hasattr(entry, "tags")
+        }
+        for chunk in _chunks(list(tagged)):
+            placeholders = ", ".join("?" * len(chunk))
+            for uuid, name in self._conn.execute(
+                f"SELECT uuid, tag FROM tags WHERE uuid IN ({placeholders})", chunk
+            ):
+                tag = _tag_from_name(name)
+                if tag is not None:
+                    tagged[uuid].tags.add(tag)
+        return entries
+
+    def get_entry(self, uuid: Union[UUID, str]) -> Entry:
+        """Return the entry with ``uuid``"""
+        if isinstance(uuid, str):
+            uuid = UUID(uuid)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT uuid, body FROM entries WHERE uuid = ?", (str(uuid),)
+            ).fetchall()
+            if not rows:
+                raise EntryNotFoundError(f"Entry {uuid} could not be found")
+            return self._load(rows)[0]
+
+    def save_entry(self, entry: Entry) -> None:
+        """
+        Save ``entry`` into database. Entry is expected to not already exist.
+        Child entries not yet in the database are saved with it.
+        """
+        with self._write():
+            if self._exists(entry.uuid):
+                raise EntryExistsError("Entry already exists, try updating the "
+                                       "entry instead of saving it")
+            self._insert(entry, top_level=True)
+
+    def update_entry(self, entry: Entry) -> None:
+        """
+        Updates ``entry``.  Child entries not yet in the database are saved
+        with it.
+        """
+        with self._write() as conn:
+            row = conn.execute(
+                "SELECT top_level FROM entries WHERE uuid = ?", (str(entry.uuid),)
+            ).fetchone()
+            if row is None:
+                raise BackendError("Entry does not exist, cannot update")
+            self._insert(entry, top_level=bool(row[0]))
+
+    def delete_entry(self, entry: Entry) -> None:
+        """Delete ``entry`` from the database, and any links to or from it"""
+        uuid = str(entry.uuid)
+        with self._write() as conn:
+            conn.execute("DELETE FROM entries WHERE uuid = ?", (uuid,))
+            conn.execute("DELETE FROM links WHERE parent = ?", (uuid,))
+            conn.execute("DELETE FROM links WHERE child = ?", (uuid,))
+            conn.execute("DELETE FROM tags WHERE uuid = ?", (uuid,))
+
+    @property
+    def root(self) -> Root:
+        """Return the root object, filled with every entry"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT uuid, body FROM entries ORDER BY rowid"
+            ).fetchall()
+            top_level = {
+                uuid for uuid, in
+                self._conn.execute("SELECT uuid FROM entries WHERE top_level = 1")
+            }
+            entries = self._load(rows)
+
+        by_uuid = {entry.uuid: entry for entry in entries}
+        return Root(entries=[
+            self._fill(entry, by_uuid) for entry in entries
+            if str(entry.uuid) in top_level
+        ])
+
+    def _fill(self, entry: Entry, by_uuid: Dict[UUID, Entry]) -> Entry:
+        """Return a copy of ``entry`` with UUID references replaced by entries"""
+        entry = replace(entry)
+        for fld in fields(entry):
+            if fld.name == "uuid":
+                continue
+            value = getattr(entry, fld.name)
+            if isinstance(value, list) and any(isinstance(v, UUID) for v in value):
+                setattr(entry, fld.name, [
+                    self._fill(by_uuid[v], by_uuid) for v in value if v in by_uuid
+                ])
+            elif isinstance(value, UUID) and value in by_uuid:
+                setattr(entry, fld.name, self._fill(by_uuid[value], by_uuid))
+        return entry
+
+    def search(self, *search_terms: SearchTermType) -> Generator[Entry, None, None]:
+        """
+        Return entries that match all ``search_terms``.
+        Keys are attributes on `Entry` subclasses, or special keywords.
+        Values can be a single value or a tuple of values depending on operator.
+        """
+        clauses = []
+        params = []
+        remaining = []
+        for attr, op, target in search_terms:
+            sql = self._term_to_sql(attr, op, target)
+            if sql is None:
+                remaining.append((attr, op, target))
+            else:
+                clauses.append(sql[0])
+                params.extend(sql[1])
+
+        query = "SELECT uuid, body FROM entries"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY rowid", params).fetchall()
+
+        for chunk in _chunks(rows):
+            with self._lock:
+                entries = self._load(chunk)
+            for entry in entries:
+                conditions = []
+                for attr, op, target in remaining:
+                    try:
+                        # check entry attribute by name
+                        value = getattr(entry, attr)
+                        conditions.append(self.compare(op, value, target))
+                    except AttributeError:
+                        conditions.append(False)
+                if all(conditions):
+                    yield entry
+
+    def _term_to_sql(
+        self,
+        attr: str,
+        op: str,
+        target: Any,
+    ) -> Optional[Tuple[str, List[Any]]]:
+        """
+        Translate a search term into an SQL condition and its parameters, or
+        return None if it must be checked in Python
+        """
+        if attr == "entry_type":
+            bases = target if isinstance(target, tuple) else (target,)
+            names = _entry_types(*bases)
+            return f"entry_type IN ({', '.join('?' * len(names))})", names
+        if attr == "ancestor":
+            if isinstance(target, Entry):
+                target = target.uuid
+            return f"uuid IN ({REACHABLE})", [str(target)]
+        if attr == "tags" and op == "gt" and isinstance(target, (set, frozenset)):
+            names = _entry_types_with("tags")
+            sql = f"entry_type IN ({', '.join('?' * len(names))})"
+            params = list(names)
+            if target:
+                tags = sorted(_tag_name(tag) for tag in target)
+                sql += (
+                    " AND uuid IN (SELECT uuid FROM tags WHERE tag IN "
+                    f"({', '.join('?' * len(tags))}) GROUP BY uuid "
+                    "HAVING COUNT(*) = ?)"
+                )
+                params.extend(tags)
+                params.append(len(tags))
+            return sql, params
+        if attr not in COLUMNS:
+            return None
+
+        if op in ("eq", "lt", "gt"):
+            value = self._column_value(attr, target)
+            if value is None:
+                return None
+            comparison = {"eq": "=", "lt": "<=", "gt": ">="}[op]
+            return f"{attr} {comparison} ?", [value]
+        if op == "in" and isinstance(target, (tuple, list, set, frozenset)):
+            values = [self._column_value(attr, item) for item in target]
+            if not values or any(value is None for value in values):
+                return None
+            return f"{attr} IN ({', '.join('?' * len(values))})", values
+        if op == "like" and isinstance(target, str) and attr != "creation_time":
+            return f"{attr} REGEXP ?", [target]
+        return None
+
+    @staticmethod
+    def _column_value(attr: str, value: Any) -> Optional[Union[str, float]]:
+        """
+        Convert ``value`` to compare with column ``attr`` in SQL, or return
+        None if SQL would not compare it the way Python does
+        """
+        if attr == "uuid":
+            return str(value) if isinstance(value, UUID) else None
+        if attr == "creation_time":
+            # naive datetimes cannot be compared with stored ones
+            if isinstance(value, datetime) and value.tzinfo is not None:
+                return value.timestamp()
+            return None
+        return value if isinstance(value, str) else None
+
+    def _gather_reachable(self, ancestor: Union[Entry, UUID]) -> Set[UUID]:
+        """
+        Finds all entries accessible from ancestor, including ancestor, and returns
+        their UUIDs.
+        """
+        if isinstance(ancestor, Entry):
+            ancestor = ancestor.uuid
+        with self._lock:
+            rows = self._conn.execute(REACHABLE, (str(ancestor),)).fetchall()
+        return {UUID(uuid) for uuid, in rows}
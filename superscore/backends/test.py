@@ -2,10 +2,11 @@
 Backend that manipulates Entries in-memory for testing purposes.
 """
 from copy import deepcopy
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 from uuid import UUID
 
 from superscore.backends.core import SearchTermType, _Backend
+from superscore.backends.index import EntryIndex
 from superscore.errors import (BackendError, EntryExistsError,
                                EntryNotFoundError)
 from superscore.model import Entry, Nestable, Root
@@ -15,6 +16,9 @@ class TestBackend(_Backend):
     """Backend that manipulates Entries in-memory, for testing purposes."""
     __test__ = False  # Tell pytest this isn't a test case
     _entry_cache: Dict[UUID, Entry] = {}
+    # secondary indexes over the entries in _entry_cache.  Entries modified
+    # in-place must be passed to update_entry to be re-indexed
+    _index: EntryIndex
 
     def __init__(self, data: Optional[List[Entry]] = None):
         if data is None:
@@ -27,13 +31,18 @@ class TestBackend(_Backend):
 
     def _fill_entry_cache(self) -> None:
         self._entry_cache = {}
-        stack = deepcopy(self.data)
+        self._index = EntryIndex()
+        self._cache_entries(self.data)
+
+    def _cache_entries(self, entries: List[Entry]) -> None:
+        stack = deepcopy(entries)
         while len(stack) > 0:
             entry = stack.pop()
             uuid = entry.uuid
             if isinstance(uuid, str):
                 uuid = UUID(uuid)
             self._entry_cache[uuid] = entry
+            self._index.add(entry)
             if isinstance(entry, Nestable):
                 stack.extend(entry.children)
 
@@ -43,7 +52,11 @@ class TestBackend(_Backend):
             raise EntryExistsError(f"Entry {entry.uuid} already exists")
         except EntryNotFoundError:
             self.data.append(entry)
-            self._fill_entry_cache()
+            if self._transaction_depth > 0:
+                # the cache is rebuilt when the transaction is committed
+                self._cache_entries([entry])
+            else:
+                self._fill_entry_cache()
 
     def get_entry(self, uuid: Union[UUID, str]) -> Entry:
         if isinstance(uuid, str):
@@ -57,6 +70,7 @@ class TestBackend(_Backend):
     def update_entry(self, entry: Entry) -> None:
         original = self.get_entry(entry.uuid)
         original.__dict__ = entry.__dict__
+        self._index.add(original)
 
     def delete_entry(self, to_delete: Entry) -> None:
         stack = [self.data.copy()]
@@ -77,14 +91,39 @@ class TestBackend(_Backend):
         if to_delete in self.data:
             self.data.remove(to_delete)
 
+        if self._transaction_depth > 0:
+            # the cache is rebuilt when the transaction is committed
+            self._entry_cache.pop(to_delete.uuid, None)
+            self._index.remove(to_delete.uuid)
+        else:
+            self._fill_entry_cache()
+
+    def _begin_transaction(self) -> Tuple[List[Entry], Dict[UUID, Entry]]:
+        return deepcopy(self.data), deepcopy(self._entry_cache)
+
+    def _commit_transaction(self) -> None:
         self._fill_entry_cache()
 
+    def _rollback_transaction(self, state: Tuple[List[Entry], Dict[UUID, Entry]]) -> None:
+        data, self._entry_cache = state
+        self._index.rebuild(self._entry_cache.values())
+        # self.data is shared with self._root
+        self.data[:] = data
+
     @property
     def root(self) -> Root:
         return self._root
 
     def search(self, *search_terms: SearchTermType):
-        for entry in self._entry_cache.values():
+        candidates, search_terms = self._index.plan(search_terms)
+        if candidates is None:
+            entries = list(self._entry_cache.values())
+        else:
+            entries = [
+                self._entry_cache[uuid] for uuid in self._index.ordered(candidates)
+            ]
+
+        for entry in entries:
             conditions = []
             for attr, op, target in search_terms:
                 # TODO: search for child pvs?
@@ -3,17 +3,21 @@ import configparser
 import logging
 import os
 from pathlib import Path
-from typing import Any, Dict, Generator, Iterable, List, Optional, Union
+from typing import (Any, Callable, Dict, Generator, Iterable, List, Optional,
+                    Sequence, Union)
 from uuid import UUID
 
 from superscore.backends import get_backend
 from superscore.backends.core import SearchTerm, SearchTermType, _Backend
 from superscore.compare import DiffItem, EntryDiff, walk_find_diff
-from superscore.control_layers import ControlLayer, EpicsData
-from superscore.control_layers.status import TaskStatus
-from superscore.errors import CommunicationError
+from superscore.control_layers import ControlLayer, EpicsData, EpicsDataBatch
+from superscore.control_layers.batch import StoredValue
+from superscore.control_layers.health import ReadOutcome
+from superscore.control_layers.status import StatusGroup, TaskStatus
 from superscore.model import (Collection, Entry, Nestable, Parameter, Readback,
-                              Setpoint, Snapshot)
+                              Setpoint, Snapshot, Tag)
+from superscore.restore import (ProgressCallback, RestoreEngine, RestorePhase,
+                                RestorePlan, RestoreReport)
 from superscore.utils import build_abs_path
 
 logger = logging.getLogger(__name__)
@@ -54,13 +58,21 @@ class Client:
             [control_layer]
             ca = true
             pva = true
+            persistent_loop = true
 
         The ``backend`` section has one special key ("type"), and the rest of the
         settings are passed to the appropriate ``_Backend`` as keyword arguments.
 
         The ``control_layer`` section has a key-value pair for each available shim.
         The ``ControlLayer`` object will be created with all the valid shims with
-        True values.
+        True values.  The remaining keys (listed in ``ControlLayer.config_options``)
+        configure the ``ControlLayer`` itself.  If ``persistent_loop`` is true,
+        the ``ControlLayer`` runs all requests in a single long-lived event loop.
+        ``max_in_flight`` limits the number of concurrent gets, and ``timeout``
+        sets the time (seconds) a get may take before it is abandoned.
+        ``workers`` sets the number of worker processes that gets of at least
+        ``shard_threshold`` PVs are split across.  ``warm_period`` sets the time
+        (seconds) a PV may go unused before its channel is released.
 
         Parameters
         ----------
@@ -106,10 +118,22 @@ class Client:
 
         # configure control layer and shims
         if 'control_layer' in cfg_parser.sections():
-            shim_choices = [val for val, enabled
-                            in cfg_parser["control_layer"].items()
-                            if enabled]
-            control_layer = ControlLayer(shims=shim_choices)
+            cl_section = cfg_parser["control_layer"]
+            shim_choices = [val for val, enabled in cl_section.items()
+                            if val not in ControlLayer.config_options and enabled]
+            control_layer = ControlLayer(
+                shims=shim_choices,
+                persistent_loop=cl_section.getboolean("persistent_loop", fallback=False),
+                max_in_flight=cl_section.getint("max_in_flight", fallback=None),
+                max_puts_in_flight=cl_section.getint(
+                    "max_puts_in_flight", fallback=None
+                ),
+                timeout=cl_section.getfloat("timeout", fallback=None),
+                workers=cl_section.getint("workers", fallback=None),
+                shard_threshold=cl_section.getint("shard_threshold", fallback=10_000),
+                warm_period=cl_section.getfloat("warm_period", fallback=None),
+                stats_interval=cl_section.getfloat("stats_interval", fallback=None),
+            )
         else:
             logger.debug('No control layer shims specified, loading all available')
             control_layer = ControlLayer()
@@ -248,10 +272,36 @@ class Client:
 
             entry.children = new_children
 
+    def prepare(self, entry: Union[Entry, UUID]) -> Dict[str, Exception]:
+        """
+        Connect the channels for every PV under ``entry`` in parallel, so a
+        later snapshot or restore only pays read and write latency.  Channels
+        only stay connected if the ControlLayer has a persistent loop.
+
+        Parameters
+        ----------
+        entry : Union[Entry, UUID]
+            The Collection, Snapshot or PV entry to prepare
+
+        Returns
+        -------
+        Dict[str, Exception]
+            The error raised for each PV that could not be reached
+        """
+        pvs, _ = self._gather_data(entry)
+        if isinstance(entry, Collection):
+            pvs.extend(Collection.meta_pvs)
+        unreachable = self.cl.connect(list(dict.fromkeys(pvs)))
+        if unreachable:
+            logger.warning(f"{len(unreachable)} PV(s) could not be reached: "
+                           f"{', '.join(unreachable)}")
+        return unreachable
+
     def snap(self, entry: Collection, dest: Optional[Snapshot] = None) -> Snapshot:
         """
         Asyncronously read data for all PVs under ``entry``, and store in a
-        Snapshot.  PVs that can't be read will have an exception as their value.
+        Snapshot.  PVs that can't be read will have None as their value, and a
+        status recording why the read failed (see ``ReadOutcome``).
 
         Parameters
         ----------
@@ -266,22 +316,52 @@ class Client:
         logger.debug(f"Saving Snapshot for Collection {entry.uuid}")
         pvs, _ = self._gather_data(entry)
         pvs.extend(Collection.meta_pvs)
-        values = self.cl.get(pvs)
-        data = {}
-        for pv, value in zip(pvs, values):
-            if isinstance(value, CommunicationError):
-                logger.debug(f"Couldn't read value for {pv}, storing \"None\"")
-                data[pv] = None
-            else:
-                logger.debug(f"Storing {pv} = {value}")
-                data[pv] = value
-        return self._build_snapshot(entry, data, dest=dest)
+        values = self.cl.get(pvs, batch=True)
+        return self._snapshot_from_batch(entry, values, dest=dest)
+
+    async def snap_async(
+        self,
+        entry: Collection,
+        dest: Optional[Snapshot] = None
+    ) -> Snapshot:
+        """
+        Awaitable version of ``snap``, for use from a running event loop.
+
+        Parameters
+        ----------
+        entry : Collection
+            the Collection to save
+
+        Returns
+        -------
+        Snapshot
+            a Snapshot corresponding to the input Collection
+        """
+        logger.debug(f"Saving Snapshot for Collection {entry.uuid}")
+        pvs, _ = self._gather_data(entry)
+        pvs.extend(Collection.meta_pvs)
+        values = await self.cl.get_many(pvs, batch=True)
+        return self._snapshot_from_batch(entry, values, dest=dest)
+
+    def _snapshot_from_batch(
+        self,
+        entry: Collection,
+        values: EpicsDataBatch,
+        dest: Optional[Snapshot] = None,
+    ) -> Snapshot:
+        """Build a Snapshot of ``entry`` from the results of a bulk read"""
+        for i, error in values.errors.items():
+            outcome = ReadOutcome.from_result(error)
+            logger.debug(f"Couldn't read value for {values.addresses[i]} "
+                         f"({outcome.name}), storing \"None\"")
+        return self._build_snapshot(entry, values, dest=dest)
 
     def apply(
         self,
         entry: Union[Setpoint, Snapshot],
-        sequential: bool = False
-    ) -> Optional[List[TaskStatus]]:
+        sequential: bool = False,
+        progress: Optional[Callable[[StatusGroup], None]] = None,
+    ) -> Optional[Union[List[TaskStatus], StatusGroup]]:
         """
         Apply settings found in ``entry``.  If no writable values found, return.
         If ``sequential`` is True, apply values in ``entry`` in sequence, blocking
@@ -293,34 +373,279 @@ class Client:
             The entry to apply values from
         sequential : bool, optional
             Whether to apply values sequentially, by default False
+        progress : Optional[Callable[[StatusGroup], None]], optional
+            If given, values applied simultaneously are tracked by a single
+            StatusGroup, and ``progress`` is called with it as puts complete
 
         Returns
         -------
-        Optional[List[TaskStatus]]
-            TaskStatus(es) for each value applied.
+        Optional[Union[List[TaskStatus], StatusGroup]]
+            TaskStatus(es) for each value applied, or their StatusGroup if
+            ``progress`` is given
+        """
+        return self.cl._run(
+            self.apply_async(entry, sequential=sequential, progress=progress)
+        )
+
+    async def apply_async(
+        self,
+        entry: Union[Setpoint, Snapshot],
+        sequential: bool = False,
+        progress: Optional[Callable[[StatusGroup], None]] = None,
+    ) -> Optional[Union[List[TaskStatus], StatusGroup]]:
+        """
+        Awaitable version of ``apply``, for use from a running event loop.
+
+        Parameters
+        ----------
+        entry : Union[Setpoint, Snapshot]
+            The entry to apply values from
+        sequential : bool, optional
+            Whether to apply values sequentially, by default False
+        progress : Optional[Callable[[StatusGroup], None]], optional
+            If given, values applied simultaneously are tracked by a single
+            StatusGroup, and ``progress`` is called with it as puts complete
+
+        Returns
+        -------
+        Optional[Union[List[TaskStatus], StatusGroup]]
+            TaskStatus(es) for each value applied, or their StatusGroup if
+            ``progress`` is given
         """
         if not isinstance(entry, (Setpoint, Snapshot)):
             logger.info("Entries must be a Snapshot or Setpoint")
             return
 
         if isinstance(entry, Setpoint):
-            return [self.cl.put(entry.pv_name, entry.data)]
+            return await self.cl.put_many(
+                [entry.pv_name], [entry.data], **self._put_options(entry)
+            )
+
+        setpoints = self._gather_writable(entry)
+        pv_list = [setpoint.pv_name for setpoint in setpoints]
+        data_list = [setpoint.data for setpoint in setpoints]
+        options = self._put_options(*setpoints)
+        if not sequential and progress is not None:
+            return await self.cl.put_many(
+                pv_list, data_list, group=True, progress=progress, **options
+            )
+        elif not sequential:
+            return await self.cl.put_many(pv_list, data_list, **options)
 
-        # Gather pv-value list and apply at once
         status_list = []
-        pv_list, data_list = self._gather_data(entry, writable_only=True)
-        if sequential:
-            for pv, data in zip(pv_list, data_list):
-                logger.debug(f'Putting {pv} = {data}')
-                status: TaskStatus = self.cl.put(pv, data)
-                if status.exception():
-                    logger.warning(f"Failed to put {pv} = {data}, "
-                                   "terminating put sequence")
-                    return
-
-                status_list.append(status)
+        for setpoint in setpoints:
+            pv, data = setpoint.pv_name, setpoint.data
+            logger.debug(f'Putting {pv} = {data}')
+            status, = await self.cl.put_many([pv], [data], **self._put_options(setpoint))
+            if status.exception():
+                logger.warning(f"Failed to put {pv} = {data}, "
+                               "terminating put sequence")
+                return
+
+            status_list.append(status)
+        return status_list
+
+    def restore(
+        self,
+        entry: Union[Setpoint, Snapshot, RestorePlan],
+        default_timeout: float = 10.0,
+        progress: Optional[ProgressCallback] = None,
+    ) -> RestoreReport:
+        """
+        Apply the settings found in ``entry``, then wait for each Setpoint's
+        readback to converge on the applied value (see ``RestoreEngine``).
+        Setpoints and Snapshots are restored all at once, RestorePlans (see
+        ``plan_restore``) phase by phase.
+
+        Parameters
+        ----------
+        entry : Union[Setpoint, Snapshot, RestorePlan]
+            The entry or plan to restore values from
+        default_timeout : float, optional
+            Time (seconds) to wait for readbacks that do not specify a timeout,
+            by default 10
+        progress : Optional[ProgressCallback], optional
+            Called as each PV resolves, see ``RestoreEngine.execute_async``
+
+        Returns
+        -------
+        RestoreReport
+            Whether each PV converged, stayed out of tolerance or timed out
+        """
+        plan = self._as_plan(entry)
+        engine = RestoreEngine(self.cl, default_timeout=default_timeout)
+        return engine.execute(plan, progress)
+
+    async def restore_async(
+        self,
+        entry: Union[Setpoint, Snapshot, RestorePlan],
+        default_timeout: float = 10.0,
+        progress: Optional[ProgressCallback] = None,
+    ) -> RestoreReport:
+        """
+        Awaitable version of ``restore``, for use from a running event loop.
+
+        Parameters
+        ----------
+        entry : Union[Setpoint, Snapshot, RestorePlan]
+            The entry or plan to restore values from
+        default_timeout : float, optional
+            Time (seconds) to wait for readbacks that do not specify a timeout,
+            by default 10
+        progress : Optional[ProgressCallback], optional
+            Called as each PV resolves, see ``RestoreEngine.execute_async``
+
+        Returns
+        -------
+        RestoreReport
+            Whether each PV converged, stayed out of tolerance or timed out
+        """
+        plan = self._as_plan(entry)
+        engine = RestoreEngine(self.cl, default_timeout=default_timeout)
+        return await engine.execute_async(plan, progress)
+
+    def plan_restore(
+        self,
+        snapshot: Union[Snapshot, UUID],
+        tag_order: Optional[Sequence[Tag]] = None,
+        max_rate: Optional[float] = None,
+        max_in_flight: Optional[int] = None,
+        abort_on_failure: bool = True,
+    ) -> RestorePlan:
+        """
+        Build a RestorePlan restoring ``snapshot`` in phases.
+
+        By default each child Snapshot of ``snapshot`` is its own phase, run in
+        the order the children appear, and consecutive Setpoints directly under
+        ``snapshot`` are grouped into phases between them.  If ``tag_order`` is
+        given, there is a phase for each tag in turn, holding the Setpoints under
+        Snapshots with that tag, then a final phase for the remaining Setpoints.
+        A Setpoint is restored only once, in the first phase it belongs to.
+
+        Parameters
+        ----------
+        snapshot : Union[Snapshot, UUID]
+            The Snapshot to restore
+        tag_order : Optional[Sequence[Tag]], optional
+            The tags to restore in order, by default None (phase by child)
+        max_rate : Optional[float], optional
+            The most puts started per second, by default no limit
+        max_in_flight : Optional[int], optional
+            The most puts outstanding at once, by default no limit
+        abort_on_failure : bool, optional
+            Whether to stop once a PV fails to restore or converge, by default
+            True
+
+        Returns
+        -------
+        RestorePlan
+            The phases to restore, in order
+        """
+        if isinstance(snapshot, UUID):
+            snapshot = self.backend.get_entry(snapshot)
+        if tag_order is None:
+            phases = self._phases_by_child(snapshot)
         else:
-            return self.cl.put(pv_list, data_list)
+            phases = self._phases_by_tag(snapshot, tag_order)
+
+        # restore each Setpoint once, and drop phases left empty
+        seen = set()
+        plan = RestorePlan(
+            max_rate=max_rate,
+            max_in_flight=max_in_flight,
+            abort_on_failure=abort_on_failure,
+        )
+        for name, setpoints in phases:
+            unique = []
+            for setpoint in setpoints:
+                if setpoint.uuid not in seen:
+                    seen.add(setpoint.uuid)
+                    unique.append(setpoint)
+            if unique:
+                plan.phases.append(RestorePhase(
+                    name=name,
+                    setpoints=unique,
+                    readbacks=[self._fill_readback(setpoint) for setpoint in unique],
+                ))
+        return plan
+
+    def _phases_by_child(
+        self,
+        snapshot: Snapshot,
+    ) -> List[tuple[str, List[Setpoint]]]:
+        """Group the Setpoints under ``snapshot`` by its children, in order"""
+        phases = []
+        loose = []
+        for child in snapshot.children:
+            if isinstance(child, UUID):
+                child = self.backend.get_entry(child)
+            if isinstance(child, Setpoint):
+                loose.append(child)
+            elif isinstance(child, Nestable):
+                if loose:
+                    phases.append((snapshot.title, loose))
+                    loose = []
+                phases.append((child.title, self._gather_setpoints(child)[0]))
+        if loose:
+            phases.append((snapshot.title, loose))
+        return phases
+
+    def _phases_by_tag(
+        self,
+        snapshot: Snapshot,
+        tag_order: Sequence[Tag],
+    ) -> List[tuple[str, List[Setpoint]]]:
+        """Group the Setpoints under ``snapshot`` by the first tag they inherit"""
+        by_tag = {tag: [] for tag in tag_order}
+        untagged = []
+        q = [(snapshot, frozenset())]
+        while q:
+            entry, tags = q.pop()
+            if isinstance(entry, UUID):
+                entry = self.backend.get_entry(entry)
+            if isinstance(entry, Nestable):
+                tags = tags | set(getattr(entry, "tags", ()))
+                q.extend((child, tags) for child in reversed(entry.children))
+            elif isinstance(entry, Setpoint):
+                tag = next((tag for tag in tag_order if tag in tags), None)
+                if tag is None:
+                    untagged.append(entry)
+                else:
+                    by_tag[tag].append(entry)
+
+        phases = [(tag.name or str(tag), setpoints) for tag, setpoints in by_tag.items()]
+        phases.append((snapshot.title, untagged))
+        return phases
+
+    def _as_plan(self, entry: Union[Setpoint, Snapshot, RestorePlan]) -> RestorePlan:
+        """Restore ``entry`` in a single phase, unless it is already a plan"""
+        if isinstance(entry, RestorePlan):
+            return entry
+        setpoints, readbacks = self._gather_setpoints(entry)
+        phase = RestorePhase(setpoints=setpoints, readbacks=readbacks)
+        return RestorePlan(phases=[phase], abort_on_failure=False)
+
+    def _gather_setpoints(
+        self,
+        entry: Union[Setpoint, Snapshot],
+    ) -> tuple[List[Setpoint], List[Optional[Readback]]]:
+        """
+        Gather the Setpoints under ``entry``, and the filled Readback for each
+        (None if a Setpoint has no readback)
+        """
+        if not isinstance(entry, (Setpoint, Snapshot)):
+            raise TypeError("Entries must be a Snapshot or Setpoint")
+
+        setpoints = [
+            leaf for leaf in self._gather_leaves(entry) if isinstance(leaf, Setpoint)
+        ]
+        return setpoints, [self._fill_readback(setpoint) for setpoint in setpoints]
+
+    def _fill_readback(self, setpoint: Setpoint) -> Optional[Readback]:
+        """Return the Readback of ``setpoint``, fetching it if necessary"""
+        if isinstance(setpoint.readback, UUID):
+            return self.backend.get_entry(setpoint.readback)
+        return setpoint.readback
 
     def find_origin_collection(self, entry: Union[Collection, Snapshot]) -> Collection:
         """
@@ -345,6 +670,27 @@ class Client:
             else:
                 return origin
 
+    def _gather_writable(self, entry: Union[Entry, UUID]) -> List[Setpoint]:
+        """Gather the Setpoints reachable from ``entry``, in order"""
+        return [
+            leaf for leaf in self._gather_leaves(entry) if isinstance(leaf, Setpoint)
+        ]
+
+    @staticmethod
+    def _put_options(*setpoints: Setpoint) -> Dict[str, Any]:
+        """
+        Return the put completion options (see ``ControlLayer.put``) for
+        ``setpoints``.  A single Setpoint gets single values, several get one
+        value each.  Empty if none of ``setpoints`` needs them.
+        """
+        waits = [setpoint.put_wait for setpoint in setpoints]
+        timeouts = [setpoint.put_timeout for setpoint in setpoints]
+        if not any(waits) and all(timeout is None for timeout in timeouts):
+            return {}
+        if len(setpoints) == 1:
+            return {"wait": waits[0], "timeout": timeouts[0]}
+        return {"wait": waits, "timeout": timeouts}
+
     def _gather_data(
         self,
         entry: Union[Entry, UUID],
@@ -419,7 +765,7 @@ class Client:
     def _build_snapshot(
         self,
         coll: Collection,
-        values: Dict[str, EpicsData],
+        values: Union[Dict[str, EpicsData], EpicsDataBatch],
         dest: Optional[Snapshot] = None,
     ) -> Snapshot:
         """
@@ -430,8 +776,9 @@ class Client:
         ----------
         coll : Collection
             The collection being saved
-        values : Dict[str, EpicsData]
-            A dictionary mapping PV names to pre-fetched values
+        values : Union[Dict[str, EpicsData], EpicsDataBatch]
+            A dictionary mapping PV names to pre-fetched values, or a batch of
+            pre-fetched values
 
         Returns
         -------
@@ -449,9 +796,7 @@ class Client:
                 child = self.backend.get_entry(child)
             if isinstance(child, Parameter):
                 if child.readback is not None:
-                    edata = self._value_or_default(
-                        values.get(child.readback.pv_name, None)
-                    )
+                    edata = self._stored_value(values, child.readback.pv_name)
                     readback = Readback(
                         pv_name=child.readback.pv_name,
                         description=child.readback.description,
@@ -463,7 +808,7 @@ class Client:
                     )
                 else:
                     readback = None
-                edata = self._value_or_default(values.get(child.pv_name, None))
+                edata = self._stored_value(values, child.pv_name)
                 if child.read_only:
                     # create a readback and propagate tolerances
                     new_entry = Readback(
@@ -482,7 +827,9 @@ class Client:
                         data=edata.data,
                         status=edata.status,
                         severity=edata.severity,
-                        readback=readback
+                        readback=readback,
+                        put_wait=child.put_wait,
+                        put_timeout=child.put_timeout,
                     )
                 snapshot.children.append(new_entry)
             elif isinstance(child, Collection):
@@ -490,7 +837,7 @@ class Client:
 
         snapshot.meta_pvs = []
         for pv in Collection.meta_pvs:
-            edata = self._value_or_default(values.get(pv, None))
+            edata = self._stored_value(values, pv)
             readback = Readback(
                 pv_name=pv,
                 data=edata.data,
@@ -501,6 +848,16 @@ class Client:
 
         return snapshot
 
+    def _stored_value(
+        self,
+        values: Union[Dict[str, EpicsData], EpicsDataBatch],
+        pv: str
+    ) -> Union[EpicsData, StoredValue]:
+        """Look up the data, status and severity to store for ``pv``"""
+        if isinstance(values, EpicsDataBatch):
+            return values.stored(pv)
+        return self._value_or_default(values.get(pv, None))
+
     def _value_or_default(self, value: Any) -> EpicsData:
         """small helper for ensuring value is an EpicsData instance"""
         if value is None or not isinstance(value, EpicsData):
@@ -4,7 +4,10 @@ from dataclasses import dataclass, fields, is_dataclass
 from enum import Enum, auto
 from typing import Any, Generator, Iterable, List, Optional, Tuple, Union
 
+import numpy as np
+
 from superscore.model import Entry
+from superscore.utils import values_equal
 
 # An attribute access path chain leading to the item of interest
 # simple fields:        (dclass_object: dataclass, field_name: str)
@@ -49,8 +52,8 @@ class DiffItem:
             orig_val_str = type(self.original_value).__name__
             new_val_str = type(self.new_value).__name__
         else:
-            orig_val_str = self.original_value or "(None)"
-            new_val_str = self.new_value or "(None)"
+            orig_val_str = "(None)" if self.original_value is None else self.original_value
+            new_val_str = "(None)" if self.new_value is None else self.new_value
 
         repr_str += f": ({orig_val_str}->{new_val_str})"
 
@@ -172,6 +175,15 @@ def walk_find_diff(
                 path=curr_path + [("__set__", missing_member)],
             )
 
+    # arrays (waveforms) are compared whole, rather than element by element
+    elif isinstance(orig_item, np.ndarray) or isinstance(new_item, np.ndarray):
+        if not values_equal(orig_item, new_item):
+            yield DiffItem(
+                original_value=orig_item,
+                new_value=new_item,
+                path=curr_path,
+            )
+
     # simple equality covers enums
     elif orig_item != new_item:
         yield DiffItem(
@@ -1,3 +1,4 @@
 from ._base_shim import EpicsData  # noqa
+from .batch import EpicsDataBatch  # noqa
 from .core import ControlLayer  # noqa
-from .status import TaskStatus  # noqa
+from .status import StatusGroup, TaskStatus  # noqa
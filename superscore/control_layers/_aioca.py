@@ -1,22 +1,197 @@
 """
 Control layer shim for communicating asynchronously through channel access
 """
+import asyncio
 import logging
-from typing import Any, Callable
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
 
-from aioca import CANothing, caget, camonitor, caput
+import numpy as np
+from aioca import (DBE_PROPERTY, CANothing, Subscription, caget, camonitor,
+                   caput, connect)
 from aioca.types import AugmentedValue
-from epicscorelibs.ca import dbr
+from epicscorelibs.ca import cadef, dbr
 
 from superscore.control_layers._base_shim import EpicsData, _BaseShim
-from superscore.errors import CommunicationError
+from superscore.errors import (CommunicationError, CommunicationTimeoutError,
+                               DisconnectedError)
 from superscore.model import Severity, Status
 
 logger = logging.getLogger(__name__)
 
 
+class CtrlMetadataCache:
+    """
+    Cache of FORMAT_CTRL values (units, precision, limits, enums), keyed by PV.
+
+    Control metadata rarely changes, so it is only re-requested once it is
+    older than ``ttl`` seconds, or has been invalidated.  Entries can also be
+    kept fresh by a DBE_PROPERTY monitor, in which case they do not expire
+    while the monitor's event loop is alive.
+
+    Parameters
+    ----------
+    ttl : Optional[float], optional
+        Time (seconds) after which cached metadata is considered stale, by
+        default 60.  If None, metadata never goes stale.  If 0, nothing is cached.
+    """
+    _cache: Dict[str, Tuple[float, AugmentedValue]]
+    _property_subs: Dict[str, Tuple[asyncio.AbstractEventLoop, Subscription]]
+
+    def __init__(self, ttl: Optional[float] = 60.0):
+        self.ttl = ttl
+        self._cache = {}
+        self._property_subs = {}
+
+    def get(self, address: str) -> Optional[AugmentedValue]:
+        """Return the cached FORMAT_CTRL value for ``address`` if it is fresh"""
+        try:
+            stored_at, value_ctrl = self._cache[address]
+        except KeyError:
+            return None
+
+        if self.is_monitored(address):
+            return value_ctrl
+        if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+            return None
+        return value_ctrl
+
+    def put(self, address: str, value_ctrl: AugmentedValue) -> None:
+        """Store a fresh FORMAT_CTRL value for ``address``"""
+        if self.ttl == 0:
+            return
+        self._cache[address] = (time.monotonic(), value_ctrl)
+
+    def invalidate(self, address: Optional[str] = None) -> None:
+        """
+        Invalidate cached metadata for ``address``, or for every PV if
+        ``address`` is None.  Property monitors are closed.
+        """
+        addresses = list(self._cache) if address is None else [address]
+        for addr in addresses:
+            self._cache.pop(addr, None)
+            self._close_monitor(addr)
+
+    def is_monitored(self, address: str) -> bool:
+        """Return True if ``address`` has a live DBE_PROPERTY monitor"""
+        try:
+            loop, _ = self._property_subs[address]
+        except KeyError:
+            return False
+
+        if loop.is_closed():
+            # monitor died with its event loop, fall back to the TTL
+            self._property_subs.pop(address, None)
+            return False
+        return True
+
+    def monitor(self, address: str) -> None:
+        """
+        Keep metadata for ``address`` fresh with a DBE_PROPERTY monitor.
+        Must be called from within a running event loop.  Monitors only
+        outlive a single request if the loop persists between requests.
+        """
+        if self.is_monitored(address):
+            return
+
+        def update_cache(value_ctrl: AugmentedValue) -> None:
+            self.put(address, value_ctrl)
+
+        sub = camonitor(
+            address, update_cache, events=DBE_PROPERTY, format=dbr.FORMAT_CTRL
+        )
+        self._property_subs[address] = (asyncio.get_running_loop(), sub)
+
+    def _close_monitor(self, address: str) -> None:
+        try:
+            loop, sub = self._property_subs.pop(address)
+        except KeyError:
+            return
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(sub.close)
+
+
 class AiocaShim(_BaseShim):
-    """async compatible EPICS channel access shim layer"""
+    """
+    async compatible EPICS channel access shim layer
+
+    Control metadata is cached per PV (see ``CtrlMetadataCache``), so a get
+    only issues a FORMAT_TIME request when the cached metadata is fresh, and
+    issues FORMAT_TIME and FORMAT_CTRL requests concurrently when it is not.
+
+    Parameters
+    ----------
+    ctrl_ttl : Optional[float], optional
+        Time (seconds) before cached control metadata is re-requested,
+        by default 60.  See ``CtrlMetadataCache``
+    monitor_properties : bool, optional
+        If True, keep cached control metadata fresh with DBE_PROPERTY monitors,
+        by default False.  Only useful with a persistent event loop.
+    connect_timeout : Optional[float], optional
+        Time (seconds) to wait for a channel to connect before raising a
+        DisconnectedError, by default 5
+    """
+    def __init__(
+        self,
+        ctrl_ttl: Optional[float] = 60.0,
+        monitor_properties: bool = False,
+        connect_timeout: Optional[float] = 5.0,
+    ):
+        self.ctrl_cache = CtrlMetadataCache(ttl=ctrl_ttl)
+        self.monitor_properties = monitor_properties
+        self.connect_timeout = connect_timeout
+
+    @staticmethod
+    def _communication_error(operation: str, ex: CANothing) -> CommunicationError:
+        """Convert a CANothing into the matching CommunicationError"""
+        if ex.errorcode == cadef.ECA_TIMEOUT:
+            error_cls = CommunicationTimeoutError
+        elif ex.errorcode == cadef.ECA_DISCONN:
+            error_cls = DisconnectedError
+        else:
+            error_cls = CommunicationError
+        return error_cls(f'CA {operation} failed for {ex}')
+
+    async def connect(self, address: str) -> None:
+        """
+        Connect the channel for ``address`` ahead of later requests.  Channels
+        stay connected for the life of the event loop.
+
+        Raises
+        ------
+        DisconnectedError
+            If the channel does not connect within ``self.connect_timeout``
+        """
+        await self._connect(address)
+
+    def release(self, address: str) -> None:
+        """
+        Drop cached metadata for ``address``, closing its property monitor.
+        aioca has no way to close a single channel, so the channel itself is
+        held until its event loop closes.
+        """
+        self.invalidate_metadata(address)
+
+    async def _connect(self, address: str) -> None:
+        """
+        Wait for the channel for ``address`` to connect.  Returns immediately
+        if it is already connected.
+
+        Raises
+        ------
+        DisconnectedError
+            If the channel does not connect within ``self.connect_timeout``
+        """
+        try:
+            await connect(address, timeout=self.connect_timeout)
+        except CANothing as ex:
+            logger.debug(f"CA connect failed {ex.__repr__()}")
+            raise DisconnectedError(f'CA connect failed for {ex}')
+
+    def invalidate_metadata(self, address: Optional[str] = None) -> None:
+        """Discard cached control metadata for ``address``, or all PVs if None"""
+        self.ctrl_cache.invalidate(address)
+
     async def get(self, address: str) -> EpicsData:
         """
         Get the value at the PV: ``address``.
@@ -35,17 +210,48 @@ class AiocaShim(_BaseShim):
         ------
         CommunicationError
             If the caget operation fails for any reason.
+        DisconnectedError
+            If ``address`` cannot be connected to
+        CommunicationTimeoutError
+            If the caget operation times out
         """
+        await self._connect(address)
+        value_ctrl = self.ctrl_cache.get(address)
         try:
-            value_time = await caget(address, format=dbr.FORMAT_TIME)
-            value_ctrl = await caget(address, format=dbr.FORMAT_CTRL)
+            if value_ctrl is None:
+                value_time, value_ctrl = await asyncio.gather(
+                    self._caget(address, dbr.FORMAT_TIME),
+                    self._caget(address, dbr.FORMAT_CTRL),
+                )
+                self.ctrl_cache.put(address, value_ctrl)
+                if self.monitor_properties:
+                    self.ctrl_cache.monitor(address)
+            else:
+                value_time = await self._caget(address, dbr.FORMAT_TIME)
         except CANothing as ex:
             logger.debug(f"CA get failed {ex.__repr__()}")
-            raise CommunicationError(f'CA get failed for {ex}')
+            raise self._communication_error('get', ex)
 
         return self.value_to_epics_data(value_time, value_ctrl)
 
-    async def put(self, address: str, value: Any) -> None:
+    async def _caget(self, address: str, format: int) -> AugmentedValue:
+        """
+        caget ``address`` with ``format``, timing FORMAT_CTRL and FORMAT_TIME
+        requests separately when statistics are being recorded
+        """
+        if self.stats is None:
+            return await caget(address, format=format)
+        operation = "caget_ctrl" if format == dbr.FORMAT_CTRL else "caget_time"
+        with self.stats.measure(operation, type(self).__name__):
+            return await caget(address, format=format)
+
+    async def put(
+        self,
+        address: str,
+        value: Any,
+        wait: bool = False,
+        timeout: Optional[float] = None,
+    ) -> None:
         """
         Put ``value`` to the PV ``address``.
 
@@ -55,30 +261,72 @@ class AiocaShim(_BaseShim):
             The PV to put ``value`` to.
         value : Any
             Value to put to ``address``.
+        wait : bool, optional
+            If True, make a put-callback request, completing once the record
+            has finished processing, by default False
+        timeout : Optional[float], optional
+            Time (seconds) to wait for the channel to connect and, if ``wait``,
+            for processing to finish.  By default aioca's 5 second timeout, or if
+            ``wait``, ``self.connect_timeout`` to connect and no limit on
+            processing.
 
         Raises
         ------
         CommunicationError
             If the caput operation fails for any reason.
+        CommunicationTimeoutError
+            If the caput operation times out
+        DisconnectedError
+            If ``wait`` without a ``timeout``, and the channel does not connect
+            within ``self.connect_timeout``
         """
+        kwargs = {}
+        if wait and timeout is None:
+            # only processing is unlimited, an unreachable IOC still times out
+            await self._connect(address)
+            kwargs["timeout"] = None
+        elif timeout is not None:
+            kwargs["timeout"] = timeout
         try:
-            await caput(address, value)
+            await caput(address, value, wait=wait, **kwargs)
         except CANothing as ex:
             logger.debug(f"CA put failed {ex.__repr__()}")
-            raise CommunicationError(f'CA put failed for {ex}')
+            raise self._communication_error('put', ex)
 
-    def monitor(self, address: str, callback: Callable) -> None:
+    def monitor(self, address: str, callback: Callable) -> Subscription:
         """
         Subscribe ``callback`` to updates on the PV ``address``.
+        Must be called from within a running event loop.
+
+        Updates are requested with FORMAT_TIME, and control metadata is filled
+        in from the metadata cache, requesting it if necessary.
 
         Parameters
         ----------
         address : str
             The PV to monitor.
         callback : Callable
-            The callback to run on updates to ``address``
+            The callback to run on updates to ``address``, called with an
+            EpicsData
+
+        Returns
+        -------
+        Subscription
+            The aioca subscription, which can be closed to stop monitoring
         """
-        camonitor(address, callback)
+        async def on_update(value_time: AugmentedValue) -> None:
+            value_ctrl = self.ctrl_cache.get(address)
+            if value_ctrl is None:
+                try:
+                    value_ctrl = await self._caget(address, dbr.FORMAT_CTRL)
+                except CANothing as ex:
+                    logger.debug(f"CA get of metadata failed {ex.__repr__()}")
+                else:
+                    self.ctrl_cache.put(address, value_ctrl)
+
+            callback(self.value_to_epics_data(value_time, value_ctrl))
+
+        return camonitor(address, on_update, format=dbr.FORMAT_TIME)
 
     @staticmethod
     def value_to_epics_data(
@@ -112,8 +360,14 @@ class AiocaShim(_BaseShim):
         lower_ctrl_limit = getattr(value_ctrl, "lower_ctrl_limit", None)
         enums = getattr(value_ctrl, "enums", None)
 
+        if isinstance(value_time, np.ndarray):
+            # waveform: view the buffer aioca already decoded, rather than copy it
+            data = value_time.view(np.ndarray)
+        else:
+            data = +value_time  # from aioca docs, +AugmentedValue strips augmentation
+
         return EpicsData(
-            data=+value_time,  # from aioca docs, +AugmentedValue strips augmentation
+            data=data,
             status=status,
             severity=severity,
             timestamp=timestamp,
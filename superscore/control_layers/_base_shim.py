@@ -5,21 +5,63 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Callable, Optional
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
 from superscore.model import Severity, Status
 from superscore.type_hints import AnyEpicsType
-from superscore.utils import utcnow
+from superscore.utils import dataclass_equal, utcnow
+
+if TYPE_CHECKING:
+    from superscore.control_layers.stats import ControlLayerStats
 
 
 class _BaseShim:
+    """
+    Interface between the ControlLayer and a communication library.  The
+    ControlLayer routes each PV to the shim for its protocol, and gives the
+    shim the PV name without its protocol prefix (e.g. "MY:PV" for
+    "ca://MY:PV").  Shims called directly should tolerate the prefix.
+    """
+    # set by the ControlLayer while it records statistics, for shims that
+    # time their own requests
+    stats: Optional[ControlLayerStats] = None
+
     async def get(self, address: str) -> EpicsData:
         raise NotImplementedError
 
-    async def put(self, address: str, value: Any):
+    async def put(
+        self,
+        address: str,
+        value: Any,
+        wait: bool = False,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Put ``value`` to ``address``.  If ``wait`` is True, complete once the
+        put has been processed rather than once it has been sent.  ``timeout``
+        bounds the time (seconds) taken, None leaving it to the shim.
+        Shims only receive ``wait`` and ``timeout`` when they are set.
+        """
         raise NotImplementedError
 
-    def monitor(self, address: str, callback: Callable):
+    async def connect(self, address: str) -> None:
+        """
+        Connect the channel for ``address`` ahead of later requests, raising a
+        CommunicationError if it cannot be reached.  By default, makes a get.
+        """
+        await self.get(address)
+
+    def release(self, address: str) -> None:
+        """
+        Release any resources held for ``address`` once it is no longer in
+        use.  Does nothing by default.
+        """
+
+    def monitor(self, address: str, callback: Callable) -> Any:
+        """
+        Subscribe ``callback`` to updates on ``address``.  ``callback`` is
+        called with an EpicsData.  Returns a handle with a ``close`` method.
+        """
         raise NotImplementedError
 
 
@@ -37,3 +79,6 @@ class EpicsData:
     upper_ctrl_limit: Optional[float] = None
     lower_ctrl_limit: Optional[float] = None
     enums: Optional[list[str]] = None
+
+    # data may be an array, which can't be compared with ==
+    __eq__ = dataclass_equal
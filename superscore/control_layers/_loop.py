@@ -0,0 +1,146 @@
+"""
+Persistent asyncio event loop running in a dedicated thread
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LoopThread:
+    """
+    Owns a single long-lived asyncio event loop, run forever in a daemon thread.
+
+    Coroutines can be submitted from any other thread, and are resolved through
+    ``concurrent.futures.Future`` objects.  Re-using one loop across calls lets
+    aioca re-use its channel cache (which is held per-event-loop), instead of
+    re-connecting every channel each time a new loop is created.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the thread running the loop
+    """
+    _loop: Optional[asyncio.AbstractEventLoop]
+    _thread: Optional[threading.Thread]
+
+    def __init__(self, name: str = "superscore-loop"):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The event loop owned by this thread.  Starts the thread if necessary"""
+        self.start()
+        return self._loop
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def in_loop_thread(self) -> bool:
+        """Return True if called from the thread running the event loop"""
+        return self._thread is not None and threading.get_ident() == self._thread.ident
+
+    def start(self) -> None:
+        """Start the event loop thread, if it is not running already"""
+        with self._lock:
+            if self.is_running:
+                return
+
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+            thread = threading.Thread(
+                target=self._run_loop, args=(loop, started), name=self.name, daemon=True
+            )
+            thread.start()
+            started.wait()
+            self._loop = loop
+            self._thread = thread
+            logger.debug(f"Started persistent event loop in thread {self.name}")
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop, started: threading.Event) -> None:
+        """Thread target.  Run ``loop`` until stopped, then clean up after it"""
+        asyncio.set_event_loop(loop)
+        loop.call_soon(started.set)
+        try:
+            loop.run_forever()
+        finally:
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the event loop and join its thread.  Pending tasks are cancelled.
+
+        Parameters
+        ----------
+        timeout : Optional[float], optional
+            Time to wait for the thread to finish, by default None (wait forever)
+        """
+        with self._lock:
+            if not self.is_running:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            if not self.in_loop_thread():
+                self._thread.join(timeout)
+            self._thread = None
+            self._loop = None
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """
+        Schedule ``coro`` on the event loop from any thread.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            A future that resolves to the result of ``coro``
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        Run ``coro`` on the event loop and block until it completes.
+
+        Parameters
+        ----------
+        coro : Coroutine
+            The coroutine to run
+        timeout : Optional[float], optional
+            Time to wait for a result, by default None (wait forever).  The
+            coroutine is cancelled if the timeout elapses.
+
+        Returns
+        -------
+        Any
+            The result of ``coro``
+
+        Raises
+        ------
+        RuntimeError
+            If called from within the event loop thread, which would deadlock
+        concurrent.futures.TimeoutError
+            If ``timeout`` elapses before ``coro`` completes
+        """
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("Cannot block on the event loop from inside its own thread")
+
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
@@ -0,0 +1,250 @@
+"""
+Control layer shim for communicating asynchronously through PV Access
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from p4p import Value
+from p4p.client.asyncio import Context, Disconnected, RemoteError, Subscription
+
+from superscore.control_layers._base_shim import EpicsData, _BaseShim
+from superscore.errors import (CommunicationError, CommunicationTimeoutError,
+                               DisconnectedError)
+from superscore.model import Severity, Status
+
+logger = logging.getLogger(__name__)
+
+# Only request the fields that make up an EpicsData.  Fields a PV does not
+# have are ignored by the server.
+REQUEST = "field(value,alarm,timeStamp,display,control)"
+
+
+def _strip_protocol(address: str) -> str:
+    """Remove a leading "pva://" from ``address``"""
+    return address.split("://", 1)[-1]
+
+
+class P4PShim(_BaseShim):
+    """
+    async compatible EPICS PV Access shim layer, via p4p
+
+    Every request is made through a single p4p Context, created on first use
+    and shared between event loops, so channels are connected once and re-used
+    by later requests.  Values are requested as raw structures and mapped from
+    the NTScalar, NTScalarArray and NTEnum normative types into EpicsData.
+
+    Parameters
+    ----------
+    timeout : Optional[float], optional
+        Time (seconds) to wait for a get or put, including connecting the
+        channel, before raising a CommunicationTimeoutError, by default 5
+    conf : Optional[dict], optional
+        Configuration for the p4p Context (e.g. EPICS_PVA_ADDR_LIST), by default
+        None, taking configuration from the environment
+    """
+    _context: Optional[Context]
+
+    def __init__(self, timeout: Optional[float] = 5.0, conf: Optional[dict] = None):
+        self.timeout = timeout
+        self.conf = conf
+        self._context = None
+
+    @property
+    def context(self) -> Context:
+        """The shared p4p Context.  Created if necessary"""
+        if self._context is None:
+            self._context = Context(
+                "pva", conf=self.conf, useenv=self.conf is None, nt=False
+            )
+        return self._context
+
+    def close(self) -> None:
+        """Close the p4p Context, disconnecting every channel"""
+        if self._context is not None:
+            self._context.close()
+            self._context = None
+
+    def release(self, address: str) -> None:
+        """Drop the cached channel for ``address``, closing it once unused"""
+        if self._context is not None:
+            self._context.disconnect(_strip_protocol(address))
+
+    @staticmethod
+    def _communication_error(
+        operation: str,
+        address: str,
+        ex: Exception
+    ) -> CommunicationError:
+        """Convert a p4p exception into the matching CommunicationError"""
+        if isinstance(ex, asyncio.TimeoutError):
+            error_cls = CommunicationTimeoutError
+        elif isinstance(ex, Disconnected):
+            error_cls = DisconnectedError
+        else:
+            error_cls = CommunicationError
+        return error_cls(f'PVA {operation} failed for {address}: {ex!r}')
+
+    async def get(self, address: str) -> EpicsData:
+        """
+        Get the value at the PV: ``address``.
+
+        Parameters
+        ----------
+        address : str
+            The PV to get, optionally prefixed with "pva://"
+
+        Returns
+        -------
+        EpicsData
+            The data at ``address``.
+
+        Raises
+        ------
+        CommunicationError
+            If the get operation fails for any reason.
+        DisconnectedError
+            If the channel disconnects during the get
+        CommunicationTimeoutError
+            If the get operation (or connection) times out
+        """
+        try:
+            value = await asyncio.wait_for(
+                self.context.get(_strip_protocol(address), request=REQUEST),
+                self.timeout,
+            )
+        except (asyncio.TimeoutError, Disconnected, RemoteError) as ex:
+            logger.debug(f"PVA get failed {ex!r}")
+            raise self._communication_error('get', address, ex)
+
+        return self.value_to_epics_data(value)
+
+    async def put(
+        self,
+        address: str,
+        value: Any,
+        wait: bool = False,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Put ``value`` to the PV ``address``.  Enum PVs take the index of the
+        new choice.
+
+        Parameters
+        ----------
+        address : str
+            The PV to put ``value`` to, optionally prefixed with "pva://"
+        value : Any
+            Value to put to ``address``.
+        wait : bool, optional
+            If True, ask the server to complete the put once the record has
+            processed, by default False
+        timeout : Optional[float], optional
+            Time (seconds) to wait for the put, by default ``self.timeout``
+
+        Raises
+        ------
+        CommunicationError
+            If the put operation fails for any reason.
+        CommunicationTimeoutError
+            If the put operation times out
+        """
+        try:
+            await asyncio.wait_for(
+                self.context.put(_strip_protocol(address), value, wait=wait or None),
+                self.timeout if timeout is None else timeout,
+            )
+        except (asyncio.TimeoutError, Disconnected, RemoteError) as ex:
+            logger.debug(f"PVA put failed {ex!r}")
+            raise self._communication_error('put', address, ex)
+
+    def monitor(self, address: str, callback: Callable) -> Subscription:
+        """
+        Subscribe ``callback`` to updates on the PV ``address``.
+        Must be called from within a running event loop.
+
+        Parameters
+        ----------
+        address : str
+            The PV to monitor, optionally prefixed with "pva://"
+        callback : Callable
+            The callback to run on updates to ``address``, called with an
+            EpicsData
+
+        Returns
+        -------
+        Subscription
+            The p4p subscription, which can be closed to stop monitoring
+        """
+        async def on_update(value: Value) -> None:
+            callback(self.value_to_epics_data(value))
+
+        return self.context.monitor(
+            _strip_protocol(address), on_update, request=REQUEST
+        )
+
+    @staticmethod
+    def value_to_epics_data(value: Value) -> EpicsData:
+        """
+        Creates an EpicsData instance from a p4p Value holding a normative
+        type (NTScalar, NTScalarArray or NTEnum).
+
+        Enum values are stored by index, with their choices as ``enums``.  The
+        alarm status is taken from the alarm message, which IOCs set to the name
+        of the record's alarm status.
+
+        Parameters
+        ----------
+        value : Value
+            A raw (not unwrapped) p4p Value
+
+        Returns
+        -------
+        EpicsData
+            The filled EpicsData instance
+        """
+        enums = None
+        if value.getID().startswith("epics:nt/NTEnum"):
+            data = value.value.index
+            enums = list(value.value.choices)
+        else:
+            # arrays are already numpy arrays
+            data = value.value
+
+        severity = Severity.NO_ALARM
+        status = Status.NO_ALARM
+        timestamp = None
+        if "alarm" in value:
+            severity = Severity(value.alarm.severity)
+            try:
+                status = Status[value.alarm.message]
+            except KeyError:
+                status = Status.NO_ALARM if severity == Severity.NO_ALARM else Status.UDF
+        if "timeStamp" in value:
+            timestamp = datetime.fromtimestamp(
+                value.timeStamp.secondsPastEpoch + value.timeStamp.nanoseconds * 1e-9,
+                timezone.utc,
+            )
+
+        units = precision = upper_ctrl_limit = lower_ctrl_limit = None
+        if "display" in value:
+            units = value.display.get("units") or None
+            precision = value.display.get("precision")
+        if "control" in value:
+            upper_ctrl_limit = value.control.limitHigh
+            lower_ctrl_limit = value.control.limitLow
+
+        edata = EpicsData(
+            data=data,
+            status=status,
+            severity=severity,
+            units=units,
+            precision=precision,
+            upper_ctrl_limit=upper_ctrl_limit,
+            lower_ctrl_limit=lower_ctrl_limit,
+            enums=enums,
+        )
+        if timestamp is not None:
+            edata.timestamp = timestamp
+        return edata
@@ -0,0 +1,225 @@
+"""
+Bulk gets sharded across a pool of worker processes
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import math
+import multiprocessing
+from typing import (Any, AsyncGenerator, List, NamedTuple, Optional, Sequence,
+                    Tuple, Union)
+
+from superscore.control_layers._base_shim import EpicsData
+from superscore.control_layers.batch import EpicsDataBatch
+from superscore.control_layers.health import ReadOutcome
+from superscore.errors import (CommunicationError, CommunicationTimeoutError,
+                               DisconnectedError)
+from superscore.model import Severity, Status
+
+logger = logging.getLogger(__name__)
+
+# The ControlLayer owned by a worker process, created by _init_worker
+_worker_cl = None
+
+
+class _Failure(NamedTuple):
+    """Compact form of the exception raised while reading a PV"""
+    outcome: str
+    message: str
+
+
+# (data, status, severity, timestamp, units, precision, upper_ctrl_limit,
+#  lower_ctrl_limit, enums), or a _Failure
+CompactResult = Union[Tuple[Any, ...], _Failure]
+
+_OUTCOME_ERRORS = {
+    ReadOutcome.TIMEOUT: CommunicationTimeoutError,
+    ReadOutcome.DISCONNECTED: DisconnectedError,
+    ReadOutcome.ERROR: CommunicationError,
+}
+
+
+def encode_result(result: Union[EpicsData, Exception]) -> CompactResult:
+    """Pack the result of a get into a compact, cheaply pickled form"""
+    if isinstance(result, BaseException):
+        return _Failure(ReadOutcome.from_result(result).name, str(result))
+
+    return (
+        result.data, result.status.value, result.severity.value, result.timestamp,
+        result.units, result.precision, result.upper_ctrl_limit,
+        result.lower_ctrl_limit, result.enums,
+    )
+
+
+def decode_result(compact: CompactResult) -> Union[EpicsData, CommunicationError]:
+    """Unpack a result packed by ``encode_result``"""
+    if isinstance(compact, _Failure):
+        return _OUTCOME_ERRORS[ReadOutcome[compact.outcome]](compact.message)
+
+    (data, status, severity, timestamp, units, precision, upper_ctrl_limit,
+     lower_ctrl_limit, enums) = compact
+    return EpicsData(
+        data=data,
+        status=Status(status),
+        severity=Severity(severity),
+        timestamp=timestamp,
+        units=units,
+        precision=precision,
+        upper_ctrl_limit=upper_ctrl_limit,
+        lower_ctrl_limit=lower_ctrl_limit,
+        enums=enums,
+    )
+
+
+def compact_outcome(compact: CompactResult) -> ReadOutcome:
+    """Classify a result packed by ``encode_result``"""
+    if isinstance(compact, _Failure):
+        return ReadOutcome[compact.outcome]
+    return ReadOutcome.OK
+
+
+def store_compact(batch: EpicsDataBatch, i: int, compact: CompactResult) -> None:
+    """Store a result packed by ``encode_result`` in row ``i`` of ``batch``"""
+    if isinstance(compact, _Failure):
+        batch.set_error(i, decode_result(compact))
+        return
+
+    (data, status, severity, timestamp, units, precision, upper_ctrl_limit,
+     lower_ctrl_limit, enums) = compact
+    batch.set_row(
+        i, data, status, severity, timestamp,
+        (units, precision, upper_ctrl_limit, lower_ctrl_limit,
+         None if enums is None else tuple(enums)),
+    )
+
+
+def _init_worker(
+    shims: List[str],
+    max_in_flight: Optional[int],
+    timeout: Optional[float],
+) -> None:
+    """Worker process initializer.  Create the worker's ControlLayer"""
+    global _worker_cl
+    from superscore.control_layers.core import ControlLayer
+
+    _worker_cl = ControlLayer(
+        shims=shims,
+        persistent_loop=True,
+        max_in_flight=max_in_flight,
+        timeout=timeout,
+    )
+
+
+def _get_shard(addresses: List[str]) -> List[CompactResult]:
+    """Worker process task.  Read a shard of PVs, returning compact results"""
+    return [encode_result(result) for result in _worker_cl.get(addresses)]
+
+
+class ShardedGetter:
+    """
+    Reads large lists of PVs by splitting them into shards, each read by one
+    of a pool of worker processes.  Every worker holds its own ControlLayer
+    (and so its own aioca context), spreading the cost of decoding responses
+    and building ``EpicsData`` across cores.
+
+    Workers are spawned when first needed, and persist until ``close``.
+
+    Parameters
+    ----------
+    workers : int
+        The number of worker processes
+    shims : List[str]
+        The names of the shims each worker should load
+    max_in_flight : Optional[int], optional
+        Maximum number of concurrent gets in each worker, by default None
+    timeout : Optional[float], optional
+        Time (seconds) before a get is abandoned, by default None
+    shard_size : int, optional
+        Maximum number of PVs in each shard, by default 10,000.  Smaller
+        shards return results sooner, at the cost of more round trips.
+    """
+    _executor: Optional[concurrent.futures.ProcessPoolExecutor]
+
+    def __init__(
+        self,
+        workers: int,
+        shims: List[str],
+        max_in_flight: Optional[int] = None,
+        timeout: Optional[float] = None,
+        shard_size: int = 10_000,
+    ):
+        self.workers = workers
+        self.shims = shims
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.shard_size = shard_size
+        self._executor = None
+
+    @property
+    def executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        """The worker process pool.  Starts the pool if necessary"""
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                # aioca's libca context does not survive a fork
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.shims, self.max_in_flight, self.timeout),
+            )
+        return self._executor
+
+    def shard(self, addresses: Sequence[str]) -> List[List[str]]:
+        """Split ``addresses`` into contiguous shards, at least one per worker"""
+        if not addresses:
+            return []
+        size = min(math.ceil(len(addresses) / self.workers), self.shard_size)
+        return [list(addresses[i:i + size]) for i in range(0, len(addresses), size)]
+
+    async def iter_shards(
+        self,
+        addresses: Sequence[str],
+        decode: bool = True,
+    ) -> AsyncGenerator[Tuple[int, List[Any]], None]:
+        """
+        Read ``addresses`` in shards, yielding ``(offset, results)`` as each
+        shard completes.  ``offset`` is the index in ``addresses`` of the first
+        PV in the shard.  If ``decode`` is False, results are left in their
+        compact form (see ``encode_result``).
+
+        Closing the generator early cancels any shards not yet started.
+        """
+        async def read_shard(offset: int, shard: List[str]):
+            future = self.executor.submit(_get_shard, shard)
+            try:
+                compact = await asyncio.wrap_future(future)
+            except Exception as ex:
+                # e.g. a worker process died
+                logger.warning(f"Shard of {len(shard)} PVs failed: {ex}")
+                error = CommunicationError(f"Sharded read failed: {ex}")
+                if not decode:
+                    error = encode_result(error)
+                return offset, [error for _ in shard]
+            if not decode:
+                return offset, compact
+            return offset, [decode_result(result) for result in compact]
+
+        tasks = []
+        offset = 0
+        for shard in self.shard(addresses):
+            tasks.append(asyncio.ensure_future(read_shard(offset, shard)))
+            offset += len(shard)
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def close(self) -> None:
+        """Shut down the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
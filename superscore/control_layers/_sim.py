@@ -0,0 +1,280 @@
+"""
+Control layer shim serving simulated PVs from memory, for testing and
+benchmarking without an IOC
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from superscore.control_layers._base_shim import EpicsData, _BaseShim
+from superscore.errors import CommunicationTimeoutError, DisconnectedError
+from superscore.model import Severity, Status
+from superscore.type_hints import AnyEpicsType
+from superscore.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SimBehavior:
+    """
+    How a simulated PV responds to requests.
+
+    latency - mean time (seconds) taken to answer a get or put
+    latency_jitter - standard deviation (seconds) of the latency, which is
+                     normally distributed and clipped at 0
+    disconnect_rate - probability that a request fails with a DisconnectedError
+    put_delay - extra time (seconds) taken for a put to complete
+    monitor_rate - frequency (Hz) of periodic monitor updates, or None to only
+                   send updates when the value changes
+    monitor_noise - standard deviation of noise added to numeric values on each
+                    periodic monitor update
+    """
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    disconnect_rate: float = 0.0
+    put_delay: float = 0.0
+    monitor_rate: Optional[float] = None
+    monitor_noise: float = 0.0
+
+
+@dataclass
+class SimPV:
+    """A simulated PV: its value, metadata and behavior"""
+    data: Optional[AnyEpicsType] = 0.0
+    status: Status = Status.NO_ALARM
+    severity: Severity = Severity.NO_ALARM
+    units: Optional[str] = None
+    precision: Optional[int] = None
+    upper_ctrl_limit: Optional[float] = None
+    lower_ctrl_limit: Optional[float] = None
+    enums: Optional[List[str]] = None
+    # None to use the shim's default behavior
+    behavior: Optional[SimBehavior] = None
+    monitors: List[Callable[[EpicsData], None]] = field(default_factory=list)
+
+    def to_epics_data(self) -> EpicsData:
+        return EpicsData(
+            data=self.data,
+            status=self.status,
+            severity=self.severity,
+            timestamp=utcnow(),
+            units=self.units,
+            precision=self.precision,
+            upper_ctrl_limit=self.upper_ctrl_limit,
+            lower_ctrl_limit=self.lower_ctrl_limit,
+            enums=self.enums,
+        )
+
+
+class _SimMonitor:
+    """Handle for a monitor on a SimPV, closed to stop updates"""
+    def __init__(self, pv: SimPV, callback: Callable, task: Optional[asyncio.Task]):
+        self.pv = pv
+        self.callback = callback
+        self.task = task
+
+    def close(self) -> None:
+        try:
+            self.pv.monitors.remove(self.callback)
+        except ValueError:
+            pass
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+
+class SimShim(_BaseShim):
+    """
+    Shim serving simulated PVs from an in-memory table, with configurable
+    latency, disconnects, put completion delays and monitor update rates (see
+    ``SimBehavior``).  Addresses take the form "sim://NAME".
+
+    PVs are added with ``add_pv``.  If ``auto_create`` is True, unknown PVs are
+    created on first access with ``default_value``, so any number of PVs can be
+    served without being declared.
+
+    Parameters
+    ----------
+    behavior : Optional[SimBehavior], optional
+        Behavior of PVs that do not specify their own, by default answering
+        immediately and never failing
+    auto_create : bool, optional
+        Whether to create unknown PVs when they are accessed, by default True.
+        If False, accessing an unknown PV raises a DisconnectedError.
+    default_value : AnyEpicsType, optional
+        The value of automatically created PVs, by default 0.0
+    seed : Optional[int], optional
+        Seed for the random number generator, for reproducible runs
+    """
+    pvs: Dict[str, SimPV]
+
+    def __init__(
+        self,
+        behavior: Optional[SimBehavior] = None,
+        auto_create: bool = True,
+        default_value: AnyEpicsType = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.behavior = behavior or SimBehavior()
+        self.auto_create = auto_create
+        self.default_value = default_value
+        self.pvs = {}
+        self._rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def _name(address: str) -> str:
+        """Remove a leading "sim://" from ``address``"""
+        return address.split("://", 1)[-1]
+
+    def add_pv(
+        self,
+        address: str,
+        data: Optional[AnyEpicsType] = 0.0,
+        behavior: Optional[SimBehavior] = None,
+        **kwargs,
+    ) -> SimPV:
+        """
+        Add (or replace) a simulated PV.  Extra keyword arguments set the
+        PV's status, severity and metadata (see ``SimPV``).
+        """
+        pv = SimPV(data=data, behavior=behavior, **kwargs)
+        self.pvs[self._name(address)] = pv
+        return pv
+
+    def remove_pv(self, address: str) -> None:
+        """Remove a simulated PV, if it exists"""
+        self.pvs.pop(self._name(address), None)
+
+    def set_value(self, address: str, data: AnyEpicsType) -> None:
+        """Change the value of a PV from outside, notifying its monitors"""
+        pv = self._pv(address)
+        pv.data = data
+        self._notify(pv)
+
+    def _pv(self, address: str) -> SimPV:
+        name = self._name(address)
+        pv = self.pvs.get(name)
+        if pv is None:
+            if not self.auto_create:
+                raise DisconnectedError(f"Simulated PV does not exist: {address}")
+            pv = self.pvs[name] = SimPV(data=self.default_value)
+        return pv
+
+    async def _respond(self, address: str, pv: SimPV, extra_delay: float = 0.0) -> None:
+        """Wait for the simulated latency, then maybe fail with a disconnect"""
+        behavior = pv.behavior or self.behavior
+        delay = extra_delay + behavior.latency
+        if behavior.latency_jitter:
+            delay += self._rng.normal(0, behavior.latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if behavior.disconnect_rate and self._rng.random() < behavior.disconnect_rate:
+            raise DisconnectedError(f"Simulated disconnect: {address}")
+
+    def _notify(self, pv: SimPV) -> None:
+        if not pv.monitors:
+            return
+        edata = pv.to_epics_data()
+        for callback in list(pv.monitors):
+            self._run_callback(callback, edata)
+
+    @staticmethod
+    def _run_callback(callback: Callable, edata: EpicsData) -> None:
+        try:
+            callback(edata)
+        except Exception as ex:
+            logger.exception(f"Simulated monitor callback failed: {ex}")
+
+    async def connect(self, address: str) -> None:
+        """Connect to the simulated PV ``address``, after its latency"""
+        await self._respond(address, self._pv(address))
+
+    async def get(self, address: str) -> EpicsData:
+        """
+        Get the value of the simulated PV ``address``, after its latency.
+
+        Raises
+        ------
+        DisconnectedError
+            If a disconnect is simulated, or the PV does not exist and
+            ``auto_create`` is False
+        """
+        pv = self._pv(address)
+        await self._respond(address, pv)
+        return pv.to_epics_data()
+
+    async def put(
+        self,
+        address: str,
+        value: Any,
+        wait: bool = False,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Put ``value`` to the simulated PV ``address``, completing after its
+        latency and put delay.  Monitors are notified of the new value.
+        Simulated puts always complete once processed, so ``wait`` has no
+        effect.
+
+        Raises
+        ------
+        DisconnectedError
+            If a disconnect is simulated, or the PV does not exist and
+            ``auto_create`` is False
+        CommunicationTimeoutError
+            If the put takes longer than ``timeout`` seconds
+        """
+        pv = self._pv(address)
+        behavior = pv.behavior or self.behavior
+        try:
+            await asyncio.wait_for(
+                self._respond(address, pv, extra_delay=behavior.put_delay), timeout
+            )
+        except asyncio.TimeoutError:
+            raise CommunicationTimeoutError(
+                f"Simulated put timed out after {timeout}s: {address}"
+            )
+        pv.data = value
+        self._notify(pv)
+
+    def monitor(self, address: str, callback: Callable) -> _SimMonitor:
+        """
+        Subscribe ``callback`` to updates on the simulated PV ``address``.
+        ``callback`` is called with the current value, then whenever the value
+        changes, and periodically if the PV has a ``monitor_rate``.  Must be
+        called from within a running event loop.
+        """
+        pv = self._pv(address)
+        behavior = pv.behavior or self.behavior
+        pv.monitors.append(callback)
+        loop = asyncio.get_running_loop()
+        loop.call_soon(callback, pv.to_epics_data())
+
+        task = None
+        if behavior.monitor_rate:
+            task = loop.create_task(self._periodic_updates(pv, callback, behavior))
+        return _SimMonitor(pv, callback, task)
+
+    async def _periodic_updates(
+        self,
+        pv: SimPV,
+        callback: Callable,
+        behavior: SimBehavior
+    ) -> None:
+        period = 1 / behavior.monitor_rate
+        while True:
+            await asyncio.sleep(period)
+            edata = pv.to_epics_data()
+            if behavior.monitor_noise and isinstance(edata.data, float):
+                edata.data = float(
+                    edata.data + self._rng.normal(0, behavior.monitor_noise)
+                )
+            elif behavior.monitor_noise and isinstance(edata.data, np.ndarray):
+                edata.data = edata.data + self._rng.normal(
+                    0, behavior.monitor_noise, edata.data.shape
+                )
+            self._run_callback(callback, edata)
@@ -0,0 +1,231 @@
+"""
+Columnar results of bulk reads
+"""
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from numbers import Real
+from typing import (Any, Dict, Iterator, List, NamedTuple, Optional, Tuple,
+                    Union)
+
+import numpy as np
+
+from superscore.control_layers._base_shim import EpicsData
+from superscore.control_layers.health import ReadOutcome
+from superscore.model import Severity, Status
+
+# (units, precision, upper_ctrl_limit, lower_ctrl_limit, enums)
+Metadata = Tuple[Optional[str], Optional[int], Optional[float], Optional[float],
+                 Optional[Tuple[str, ...]]]
+
+_NO_METADATA: Metadata = (None, None, None, None, None)
+
+# python types of the values held in the numeric column, by type code
+_NUMERIC_TYPES = (float, int, bool)
+
+# integers beyond this magnitude are not held exactly by a float64
+_MAX_EXACT_INT = 2**53
+
+
+class StoredValue(NamedTuple):
+    """The fields of a read that are stored in an Entry"""
+    data: Any
+    status: Status
+    severity: Severity
+
+
+class EpicsDataBatch(Sequence):
+    """
+    The results of reading many PVs, stored as columns rather than as one
+    ``EpicsData`` per PV.
+
+    Numeric values, status, severity and timestamps are held in NumPy arrays.
+    Non-numeric values (strings, arrays) are held separately, as are exact
+    copies of integers too large for the float64 numeric column (such as
+    64-bit PVA integers).  Metadata (units,
+    precision, limits and enums) is interned, so PVs sharing metadata share a
+    single copy.  Failed reads keep their exception, have no value, and have a
+    status recording why the read failed (see ``ReadOutcome``).
+
+    Indexing a batch returns an ``EpicsData`` (or the exception for a failed
+    read) built on request, so a batch can be used in place of the list
+    returned by ``ControlLayer.get``.
+
+    Parameters
+    ----------
+    addresses : List[str]
+        The PVs read, one per row
+    """
+    addresses: List[str]
+    numeric: np.ndarray
+    numeric_type: np.ndarray
+    is_numeric: np.ndarray
+    status: np.ndarray
+    severity: np.ndarray
+    timestamp: np.ndarray
+    metadata_index: np.ndarray
+    metadata: List[Metadata]
+    objects: Dict[int, Any]
+    errors: Dict[int, BaseException]
+
+    def __init__(self, addresses: List[str]):
+        n_rows = len(addresses)
+        self.addresses = list(addresses)
+        self.numeric = np.full(n_rows, np.nan)
+        self.numeric_type = np.zeros(n_rows, dtype=np.uint8)
+        self.is_numeric = np.zeros(n_rows, dtype=bool)
+        self.status = np.full(n_rows, Status.UDF.value, dtype=np.uint8)
+        self.severity = np.full(n_rows, Severity.INVALID.value, dtype=np.uint8)
+        self.timestamp = np.full(n_rows, np.nan)
+        self.metadata_index = np.zeros(n_rows, dtype=np.int32)
+        self.metadata = [_NO_METADATA]
+        self.objects = {}
+        self.errors = {}
+        self._interned = {_NO_METADATA: 0}
+        self._rows = None
+
+    @classmethod
+    def from_results(
+        cls,
+        addresses: List[str],
+        results: List[Union[EpicsData, BaseException]],
+    ) -> EpicsDataBatch:
+        """Build a batch from the results returned by ``ControlLayer.get``"""
+        batch = cls(addresses)
+        for i, result in enumerate(results):
+            batch.set_result(i, result)
+        return batch
+
+    def set_result(self, i: int, result: Union[EpicsData, BaseException]) -> None:
+        """Store the ``result`` of reading the PV in row ``i``"""
+        if isinstance(result, BaseException):
+            self.set_error(i, result)
+            return
+
+        enums = result.enums
+        self.set_row(
+            i, result.data, result.status.value, result.severity.value,
+            result.timestamp,
+            (result.units, result.precision, result.upper_ctrl_limit,
+             result.lower_ctrl_limit, None if enums is None else tuple(enums)),
+        )
+
+    def set_error(self, i: int, error: BaseException) -> None:
+        """Store the ``error`` raised while reading the PV in row ``i``"""
+        self.errors[i] = error
+        self.status[i] = ReadOutcome.from_result(error).status.value
+
+    def set_row(
+        self,
+        i: int,
+        data: Any,
+        status: int,
+        severity: int,
+        timestamp: Union[float, datetime, None],
+        metadata: Metadata,
+    ) -> None:
+        """Store the fields of a successful read in row ``i``"""
+        if isinstance(data, Real) and not isinstance(data, np.ndarray):
+            self.objects.pop(i, None)
+            self.numeric[i] = data
+            self.is_numeric[i] = True
+            if isinstance(data, (bool, np.bool_)):
+                self.numeric_type[i] = 2
+            elif isinstance(data, (int, np.integer)):
+                self.numeric_type[i] = 1
+                if abs(int(data)) > _MAX_EXACT_INT:
+                    self.objects[i] = int(data)
+        else:
+            self.objects[i] = data
+        self.status[i] = status
+        self.severity[i] = severity
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.timestamp()
+        if timestamp is not None:
+            self.timestamp[i] = timestamp
+
+        index = self._interned.get(metadata)
+        if index is None:
+            index = len(self.metadata)
+            self.metadata.append(metadata)
+            self._interned[metadata] = index
+        self.metadata_index[i] = index
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"Row {i} is out of range for a batch of {len(self)}")
+
+        if i in self.errors:
+            return self.errors[i]
+
+        units, precision, upper, lower, enums = self.metadata[self.metadata_index[i]]
+        timestamp = self.timestamp[i]
+        return EpicsData(
+            data=self.value(i),
+            status=Status(self.status[i]),
+            severity=Severity(self.severity[i]),
+            timestamp=(
+                None if math.isnan(timestamp)
+                else datetime.fromtimestamp(timestamp, timezone.utc)
+            ),
+            units=units,
+            precision=precision,
+            upper_ctrl_limit=upper,
+            lower_ctrl_limit=lower,
+            enums=None if enums is None else list(enums),
+        )
+
+    def __iter__(self) -> Iterator[Union[EpicsData, BaseException]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return (f"<{type(self).__name__} of {len(self)} PVs "
+                f"({len(self.errors)} failed)>")
+
+    @property
+    def ok(self) -> np.ndarray:
+        """Boolean mask of the rows that were read successfully"""
+        mask = np.ones(len(self), dtype=bool)
+        mask[list(self.errors)] = False
+        return mask
+
+    def row(self, address: str) -> int:
+        """Return the row holding ``address``"""
+        if self._rows is None:
+            self._rows = {}
+            for i, row_address in enumerate(self.addresses):
+                self._rows.setdefault(row_address, i)
+        try:
+            return self._rows[address]
+        except KeyError:
+            raise ValueError(f"{address} is not in this batch")
+
+    def value(self, i: int) -> Any:
+        """Return the value read in row ``i``, None if the read failed"""
+        if self.is_numeric[i] and i not in self.objects:
+            return _NUMERIC_TYPES[self.numeric_type[i]](self.numeric[i])
+        return self.objects.get(i)
+
+    def stored(self, address: str) -> StoredValue:
+        """
+        Return the value, status and severity to store for ``address``,
+        without building an EpicsData.  Missing PVs are returned as
+        (None, Status.UDF, Severity.INVALID)
+        """
+        try:
+            i = self.row(address)
+        except ValueError:
+            return StoredValue(None, Status.UDF, Severity.INVALID)
+        return StoredValue(
+            self.value(i), Status(self.status[i]), Severity(self.severity[i])
+        )
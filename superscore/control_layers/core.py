@@ -4,43 +4,223 @@ and dispatches to various shims depending on the context.
 """
 import asyncio
 import logging
+import time
 from collections.abc import Iterable
+from contextlib import nullcontext
 from functools import singledispatchmethod
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import (Any, AsyncGenerator, Callable, ClassVar, ContextManager,
+                    Coroutine, Dict, List, Mapping, Optional, Sequence, Tuple,
+                    Union)
 
 from superscore.control_layers._base_shim import EpicsData
-from superscore.control_layers.status import TaskStatus
-from superscore.errors import CommunicationError
+from superscore.control_layers.batch import EpicsDataBatch
+from superscore.control_layers.health import PVHealthTracker, ReadOutcome
+from superscore.control_layers.stats import ControlLayerStats
+from superscore.control_layers.status import StatusGroup, TaskStatus
+from superscore.control_layers.subscriptions import SubscriptionManager
+from superscore.errors import (CommunicationError, CommunicationTimeoutError,
+                               DisconnectedError)
 
-from ._aioca import AiocaShim
 from ._base_shim import _BaseShim
+from ._loop import LoopThread
+from ._sharded import (ShardedGetter, compact_outcome, encode_result,
+                       store_compact)
+from .registry import SHIMS
 
 logger = logging.getLogger(__name__)
 
-# available communication shim layers
-SHIMS = {
-    'ca': AiocaShim()
-}
+# stands in for a measurement when statistics are disabled
+_NOT_MEASURED = nullcontext()
 
 
 class ControlLayer:
     """
     Control Layer used to communicate with the control system, dispatching to
     whichever shim is relevant.
+
+    By default each synchronous request runs in a fresh event loop.  If
+    ``persistent_loop`` is True, the ControlLayer instead owns a single
+    long-lived event loop in a background thread, and submits requests to it
+    from whichever thread calls.  This lets channels be re-used across calls,
+    and lets requests be made from any thread.
+
+    Gets are bounded by ``max_in_flight`` concurrent requests and a per-PV
+    ``timeout``, bulk puts by ``max_puts_in_flight``.  Puts may wait for the
+    record to finish processing (``wait``), with a per-PV timeout.  PVs that
+    repeatedly time out or disconnect are marked as suspect by ``health`` (a
+    ``PVHealthTracker``), and fail fast with a ``DisconnectedError`` until they
+    are retried.  With a persistent loop, suspect PVs are retried in the
+    background rather than by the caller.
+
+    The synchronous ``get`` and ``put`` wrap an async API (``get_many``,
+    ``put_many``, ``get_as_completed``) that can be awaited from a running
+    event loop.  With a persistent loop, awaited requests are still run in that
+    loop, keeping all channels and monitors in a single loop.
+
+    If ``workers`` is set, gets of at least ``shard_threshold`` PVs are split
+    into shards and read by a pool of worker processes (see ``ShardedGetter``).
+    Workers load the shims named in ``shims``.  Sharding only helps with spare
+    cores, when this process rather than the IOCs limits the read rate, so
+    measure with ``benchmarks/sharded_snapshot.py`` before enabling it.
+
+    Channels can be connected ahead of time with ``connect``, so later
+    requests only pay read latency.  With a persistent loop, channels are kept
+    warm between requests.  If ``warm_period`` is set, the resources held for a
+    PV are released (see ``_BaseShim.release``) once it has gone unused for
+    ``warm_period`` seconds.
+
+    Parameters
+    ----------
+    shims : Optional[List[str]], optional
+        The names of the shims to load, by default all available shims
+    persistent_loop : bool, optional
+        Whether to run requests in a single long-lived event loop,
+        by default False
+    max_in_flight : Optional[int], optional
+        Maximum number of concurrent gets in a bulk request, by default None
+        (unlimited)
+    max_puts_in_flight : Optional[int], optional
+        Maximum number of outstanding puts in a bulk put, by default None
+        (unlimited).  Limits the put-callbacks waiting on IOCs at once.
+    timeout : Optional[float], optional
+        Time (seconds) before a get is abandoned, by default None (left to
+        the shim)
+    workers : Optional[int], optional
+        Number of worker processes to shard large gets across, by default None
+        (all gets are made in this process)
+    shard_threshold : int, optional
+        Minimum number of PVs in a get before it is sharded, by default 10,000
+    warm_period : Optional[float], optional
+        Time (seconds) a PV may go unused before its channel is released, by
+        default None (never released).  Requires a persistent loop.
+    stats : bool, optional
+        Whether to record request latencies and errors in ``self.stats``, by
+        default False.  See ``enable_stats``.
+    stats_interval : Optional[float], optional
+        Time (seconds) between logged summaries of ``self.stats``, by default
+        None (never).  Enables ``stats``, and requires a persistent loop.
     """
-    shims: Dict[str, _BaseShim]
+    loop_thread: Optional[LoopThread]
+    sharded: Optional[ShardedGetter]
+    health: PVHealthTracker
+    stats: Optional[ControlLayerStats]
+    # keys in the [control_layer] config section that are not shim names
+    config_options: ClassVar[List[str]] = [
+        'persistent_loop', 'max_in_flight', 'max_puts_in_flight', 'timeout',
+        'workers', 'shard_threshold', 'warm_period', 'stats_interval',
+    ]
 
-    def __init__(self, *args, shims: Optional[List[str]] = None, **kwargs):
+    def __init__(
+        self,
+        *args,
+        shims: Optional[List[str]] = None,
+        persistent_loop: bool = False,
+        max_in_flight: Optional[int] = None,
+        max_puts_in_flight: Optional[int] = None,
+        timeout: Optional[float] = None,
+        workers: Optional[int] = None,
+        shard_threshold: int = 10_000,
+        warm_period: Optional[float] = None,
+        stats: bool = False,
+        stats_interval: Optional[float] = None,
+        **kwargs
+    ):
+        # shims are only imported and instantiated when first used
+        self.shims = SHIMS.select(shims)
         if shims is None:
-            # load all available shims
-            self.shims = SHIMS.copy()
-            logger.debug('No shims specified, loading all available communication '
+            logger.debug('No shims specified, using all available communication '
                          f'shims: {list(self.shims.keys())}')
         else:
-            self.shims = {key: shim for key, shim in SHIMS.items() if key in shims}
-            logger.debug('Loaded valid shims from the requested list: '
+            logger.debug('Using valid shims from the requested list: '
                          f'{list(self.shims.keys())}')
 
+        self.loop_thread = LoopThread() if persistent_loop else None
+        self.max_in_flight = max_in_flight
+        self.max_puts_in_flight = max_puts_in_flight
+        self.timeout = timeout
+        if workers:
+            self.sharded = ShardedGetter(
+                workers, list(self.shims), max_in_flight=max_in_flight, timeout=timeout
+            )
+        else:
+            self.sharded = None
+        self.shard_threshold = shard_threshold
+        self.health = PVHealthTracker()
+        self.warm_period = warm_period
+        self._last_used = {}
+        self._sweep_handle = None
+        self._probes = set()
+        self._subscriptions = None
+        self.stats = None
+        self._stats_handle = None
+        if stats or stats_interval:
+            self.enable_stats(log_interval=stats_interval)
+
+    def _run(self, coro: Coroutine) -> Any:
+        """
+        Run ``coro`` to completion from synchronous code, either in the
+        persistent event loop or a fresh one.
+        """
+        if self.loop_thread is None:
+            return asyncio.run(coro)
+        return self.loop_thread.run(coro)
+
+    async def _run_async(self, coro: Coroutine) -> Any:
+        """
+        Await ``coro`` from a running event loop.  Runs ``coro`` in the
+        persistent event loop if there is one, else in the current loop.
+        """
+        if self.loop_thread is None or self.loop_thread.in_loop_thread():
+            return await coro
+        return await asyncio.wrap_future(self.loop_thread.submit(coro))
+
+    def close(self) -> None:
+        """
+        Close shared monitors, stop the persistent event loop if running, and
+        shut down any worker processes
+        """
+        if self._subscriptions is not None:
+            self._subscriptions.close()
+        # queued ahead of the loop being stopped
+        self._call_in_loop(self._cancel_timers)
+        if self.sharded is not None:
+            self.sharded.close()
+        if self.loop_thread is not None:
+            self.loop_thread.stop()
+
+    def _call_in_loop(self, func: Callable, *args: Any) -> None:
+        """
+        Call ``func`` in the persistent loop's thread, which owns its timers,
+        or immediately if already there or there is no running persistent loop
+        """
+        loop_thread = self.loop_thread
+        if (
+            loop_thread is None
+            or not loop_thread.is_running
+            or loop_thread.in_loop_thread()
+        ):
+            func(*args)
+        else:
+            loop_thread.loop.call_soon_threadsafe(func, *args)
+
+    def _cancel_timers(self) -> None:
+        """Cancel the idle channel sweep and periodic statistics logging"""
+        if self._sweep_handle is not None:
+            self._sweep_handle.cancel()
+            self._sweep_handle = None
+        self._restart_stats_log(None)
+
+    @property
+    def shims(self) -> Mapping[str, _BaseShim]:
+        """The shims available to this ControlLayer, by protocol name"""
+        return self._shims
+
+    @shims.setter
+    def shims(self, shims: Mapping[str, _BaseShim]) -> None:
+        self._shims = shims
+        # routes point at the previous shims
+        self._routes = {}
+
     def shim_from_pv(self, address: str) -> _BaseShim:
         """
         Determine the correct shim to use for the provided ``address``.
@@ -62,18 +242,44 @@ class ControlLayer:
         ValueError
             If address cannot be recognized or a matching shim cannot be found
         """
+        return self._route(address)[0]
+
+    def _route(self, address: str) -> Tuple[_BaseShim, str]:
+        """
+        Return the shim for ``address``, and the PV name to give it (``address``
+        without its protocol prefix).  Routes are cached per address, so each
+        address is only parsed once.
+
+        Raises
+        ------
+        ValueError
+            If address cannot be recognized or a matching shim cannot be found
+        """
+        try:
+            return self._routes[address]
+        except KeyError:
+            pass
+
         split = address.split("://", 1)
         if len(split) > 1:
             # We got something like pva://mydevice, so use specified comms mode
-            shim = self.shims.get(split[0], None)
+            protocol, name = split
         else:
             # No comms mode specified, use the default
-            shim = list(self.shims.values())[0]
+            protocol = next(iter(self.shims), None)
+            name = address
 
-        if shim is None:
+        if protocol not in self.shims:
             raise ValueError(f"PV is of an unsupported protocol: {address}")
 
-        return shim
+        try:
+            shim = self.shims[protocol]
+        except ImportError as ex:
+            # the shim's communication library is not installed
+            raise ValueError(f"Shim for {protocol} could not be loaded: {ex}")
+
+        route = self._routes[address] = (shim, name)
+        return route
 
     @singledispatchmethod
     def get(self, address: Union[str, Iterable[str]]) -> Union[EpicsData, Iterable[EpicsData]]:
@@ -100,34 +306,414 @@ class ControlLayer:
     def _get_single(self, address: str) -> Union[EpicsData, CommunicationError]:
         """Synchronously get a single ``address``"""
         try:
-            return asyncio.run(self._get_one(address))
+            return self._run(self._get_guarded(address))
         except CommunicationError as e:
             return e
 
     @get.register
-    def _get_list(self, address: Iterable) -> Iterable[Union[EpicsData, CommunicationError]]:
-        """Synchronously get a list of ``address``"""
-        async def gathered_coros():
-            coros = []
-            for p in address:
-                coros.append(self._get_one(p))
-            return await asyncio.gather(*coros, return_exceptions=True)
+    def _get_list(
+        self,
+        address: Iterable,
+        batch: bool = False
+    ) -> Union[List[Union[EpicsData, CommunicationError]], EpicsDataBatch]:
+        """
+        Synchronously get a list of ``address``, with at most ``max_in_flight``
+        requests outstanding at once.  Failed requests return their exception,
+        see ``ReadOutcome.from_result`` to classify them.  If ``batch`` is True,
+        results are returned as a columnar EpicsDataBatch.
+        """
+        return self._run(self._get_many(address, batch=batch))
+
+    async def get_many(
+        self,
+        addresses: Iterable[str],
+        batch: bool = False,
+    ) -> Union[List[Union[EpicsData, CommunicationError]], EpicsDataBatch]:
+        """
+        Get the values of ``addresses`` concurrently, with at most
+        ``max_in_flight`` requests outstanding at once.  Results are returned in
+        the order requested; failed requests return their exception.
+
+        Parameters
+        ----------
+        addresses : Iterable[str]
+            The PVs to get values for
+        batch : bool, optional
+            Whether to return the results as an EpicsDataBatch, by default False
+
+        Returns
+        -------
+        Union[List[Union[EpicsData, CommunicationError]], EpicsDataBatch]
+            The requested data, or the exception raised for each PV
+        """
+        return await self._run_async(self._get_many(addresses, batch=batch))
+
+    async def _get_many(
+        self,
+        addresses: Iterable[str],
+        batch: bool = False,
+    ) -> Union[List[Union[EpicsData, CommunicationError]], EpicsDataBatch]:
+        addresses = list(addresses)
+        if self._should_shard(addresses):
+            if batch:
+                # fill the batch from compact results, skipping EpicsData
+                results = EpicsDataBatch(addresses)
+                async for i, _, compact in self._iter_sharded(addresses, decode=False):
+                    store_compact(results, i, compact)
+                return results
 
-        return asyncio.run(gathered_coros())
+            results = [None for _ in addresses]
+            async for i, _, result in self._iter_sharded(addresses):
+                results[i] = result
+            return results
+
+        semaphore = self._in_flight_semaphore()
+        if batch:
+            # store each result as it arrives, rather than holding every
+            # EpicsData until all have completed
+            results = EpicsDataBatch(addresses)
+
+            async def get_into_row(i: int, address: str) -> None:
+                try:
+                    edata = await self._get_guarded(address, semaphore)
+                except Exception as ex:
+                    results.set_error(i, ex)
+                else:
+                    results.set_result(i, edata)
+
+            await asyncio.gather(
+                *(get_into_row(i, p) for i, p in enumerate(addresses))
+            )
+            return results
+
+        coros = [self._get_guarded(p, semaphore) for p in addresses]
+        return await asyncio.gather(*coros, return_exceptions=True)
+
+    async def get_as_completed(
+        self,
+        addresses: Iterable[str]
+    ) -> AsyncGenerator[Tuple[str, Union[EpicsData, CommunicationError]], None]:
+        """
+        Get the values of ``addresses`` concurrently, yielding
+        ``(address, result)`` pairs as each request completes.  ``result`` is
+        the EpicsData, or the exception raised for ``address``.
+
+        Closing the generator early cancels any outstanding requests.
+
+        Parameters
+        ----------
+        addresses : Iterable[str]
+            The PVs to get values for
+
+        Yields
+        ------
+        Tuple[str, Union[EpicsData, CommunicationError]]
+            Each address and its result, in order of completion
+        """
+        if self.loop_thread is None or self.loop_thread.in_loop_thread():
+            results = self._get_as_completed(addresses)
+            try:
+                async for item in results:
+                    yield item
+            finally:
+                await results.aclose()
+            return
+
+        # Run the requests in the persistent loop, passing results back to the
+        # calling loop through a queue.
+        caller_loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        finished = object()
+
+        async def produce():
+            results = self._get_as_completed(addresses)
+            try:
+                async for item in results:
+                    caller_loop.call_soon_threadsafe(queue.put_nowait, item)
+            finally:
+                await results.aclose()
+                caller_loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+        future = self.loop_thread.submit(produce())
+        try:
+            while (item := await queue.get()) is not finished:
+                yield item
+        finally:
+            future.cancel()
+
+    async def _get_as_completed(
+        self,
+        addresses: Iterable[str]
+    ) -> AsyncGenerator[Tuple[str, Union[EpicsData, CommunicationError]], None]:
+        addresses = list(addresses)
+        if self._should_shard(addresses):
+            results = self._iter_sharded(addresses)
+            try:
+                async for _, address, result in results:
+                    yield address, result
+            finally:
+                await results.aclose()
+            return
+
+        semaphore = self._in_flight_semaphore()
+
+        async def get_pair(address: str):
+            try:
+                return address, await self._get_guarded(address, semaphore)
+            except Exception as ex:
+                return address, ex
+
+        tasks = [asyncio.ensure_future(get_pair(p)) for p in addresses]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _should_shard(self, addresses: List[str]) -> bool:
+        """Return True if ``addresses`` should be read by worker processes"""
+        return self.sharded is not None and len(addresses) >= self.shard_threshold
+
+    async def _iter_sharded(
+        self,
+        addresses: List[str],
+        decode: bool = True,
+    ) -> AsyncGenerator[Tuple[int, str, Any], None]:
+        """
+        Read ``addresses`` through the worker processes, yielding
+        ``(index, address, result)`` as shards complete.  Suspect PVs fail fast
+        unless due for a retry, and outcomes are recorded with ``self.health``.
+        If ``decode`` is False, results are left in their compact form.
+        """
+        requested = []
+        for i, address in enumerate(addresses):
+            if self.health.is_suspect(address) and not self.health.should_retry(address):
+                error = DisconnectedError(f"{address} is marked as unreachable")
+                yield i, address, error if decode else encode_result(error)
+            else:
+                requested.append((i, address))
+
+        shards = self.sharded.iter_shards(
+            [address for _, address in requested], decode=decode
+        )
+        outcome_of = ReadOutcome.from_result if decode else compact_outcome
+        try:
+            async for offset, results in shards:
+                shard = requested[offset:offset + len(results)]
+                for (i, address), result in zip(shard, results):
+                    self.health.record(address, outcome_of(result))
+                    self.health.finish_retry(address)
+                    yield i, address, result
+        finally:
+            await shards.aclose()
+
+    def _in_flight_semaphore(self) -> Optional[asyncio.Semaphore]:
+        """Return a semaphore enforcing ``max_in_flight`` for one bulk request"""
+        if self.max_in_flight:
+            return asyncio.Semaphore(self.max_in_flight)
+        return None
+
+    async def _get_guarded(
+        self,
+        address: str,
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> EpicsData:
+        """
+        Get ``address``, failing fast if it is suspect, and enforcing the
+        in-flight limit (via ``semaphore``) and timeout.  Records the outcome
+        with ``self.health``.
+
+        Raises
+        ------
+        DisconnectedError
+            If ``address`` is suspect, or cannot be connected to
+        CommunicationTimeoutError
+            If the request does not complete within ``self.timeout``
+        """
+        if self.health.is_suspect(address):
+            if self.loop_thread is not None:
+                # Probe in the background, the loop outlives this request
+                self._start_probe(address)
+                raise DisconnectedError(f"{address} is marked as unreachable")
+            elif not self.health.should_retry(address):
+                raise DisconnectedError(f"{address} is marked as unreachable")
+
+        try:
+            if semaphore is None:
+                return await self._get_recorded(address)
+            async with semaphore:
+                return await self._get_recorded(address)
+        finally:
+            self.health.finish_retry(address)
+
+    async def _get_recorded(self, address: str) -> EpicsData:
+        """Get ``address`` within ``self.timeout``, recording the outcome"""
+        with self._measure("get", address):
+            try:
+                result = await asyncio.wait_for(self._get_one(address), self.timeout)
+            except asyncio.TimeoutError:
+                self.health.record(address, ReadOutcome.TIMEOUT)
+                raise CommunicationTimeoutError(
+                    f"Get timed out after {self.timeout}s: {address}"
+                )
+            except Exception as ex:
+                self.health.record(address, ReadOutcome.from_result(ex))
+                raise
+
+        self.health.record(address, ReadOutcome.OK)
+        return result
+
+    def _start_probe(self, address: str) -> None:
+        """
+        Retry a suspect ``address`` in a background task, if it is due.
+        Must be called from within the persistent event loop.
+        """
+        if not self.health.should_retry(address):
+            return
+
+        async def probe():
+            try:
+                await self._get_recorded(address)
+            except Exception as ex:
+                logger.debug(f"Probe of suspect PV {address} failed: {ex}")
+            finally:
+                self.health.finish_retry(address)
+
+        task = asyncio.get_running_loop().create_task(probe())
+        # hold a reference to the task until it finishes
+        self._probes.add(task)
+        task.add_done_callback(self._probes.discard)
 
     async def _get_one(self, address: str):
         """
         Base async get function.  Use this to construct higher-level get methods
         """
-        shim = self.shim_from_pv(address)
-        return await shim.get(address)
+        shim, name = self._route(address)
+        self._touch(address)
+        return await shim.get(name)
+
+    def connect(self, address: Union[str, Iterable[str]]) -> Dict[str, Exception]:
+        """
+        Connect the channels for ``address`` in parallel, ahead of later gets
+        and puts.  Channels only stay connected between requests if this
+        ControlLayer has a persistent loop.
+
+        Parameters
+        ----------
+        address : Union[str, Iterable[str]]
+            The PV(s) to connect
+
+        Returns
+        -------
+        Dict[str, Exception]
+            The error raised for each PV that could not be reached.  Empty if
+            every PV connected.
+        """
+        if isinstance(address, str):
+            address = [address]
+        return self._run(self._connect_many(list(address)))
+
+    async def connect_many(self, addresses: Sequence[str]) -> Dict[str, Exception]:
+        """
+        Awaitable version of ``connect``.  Connect the channels for
+        ``addresses`` in parallel, returning the error raised for each PV that
+        could not be reached.
+        """
+        return await self._run_async(self._connect_many(addresses))
+
+    async def _connect_many(self, addresses: Sequence[str]) -> Dict[str, Exception]:
+        semaphore = self._in_flight_semaphore()
+        results = await asyncio.gather(
+            *(self._connect_guarded(address, semaphore) for address in addresses),
+            return_exceptions=True,
+        )
+        unreachable = {
+            address: result for address, result in zip(addresses, results)
+            if isinstance(result, Exception)
+        }
+        if unreachable:
+            logger.debug(f"Could not connect {len(unreachable)} of "
+                         f"{len(addresses)} PVs")
+        return unreachable
+
+    async def _connect_guarded(
+        self,
+        address: str,
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> None:
+        """
+        Connect ``address``, enforcing the in-flight limit (via ``semaphore``)
+        and timeout, and recording the outcome with ``self.health``.
+        """
+        async def connect_one():
+            shim, name = self._route(address)
+            self._touch(address)
+            with self._measure("connect", address):
+                try:
+                    await asyncio.wait_for(shim.connect(name), self.timeout)
+                except asyncio.TimeoutError:
+                    raise CommunicationTimeoutError(
+                        f"Connect timed out after {self.timeout}s: {address}"
+                    )
+
+        try:
+            if semaphore is None:
+                await connect_one()
+            else:
+                async with semaphore:
+                    await connect_one()
+        except Exception as ex:
+            self.health.record(address, ReadOutcome.from_result(ex))
+            raise
+        self.health.record(address, ReadOutcome.OK)
+
+    def _touch(self, address: str) -> None:
+        """
+        Record that ``address`` was just used, scheduling a sweep for idle
+        channels if needed.  Must be called from within the event loop.
+        """
+        if self.warm_period is None or self.loop_thread is None:
+            return
+        self._last_used[address] = time.monotonic()
+        if self._sweep_handle is None:
+            self._sweep_handle = asyncio.get_running_loop().call_later(
+                self.warm_period, self._release_idle
+            )
+
+    def _release_idle(self) -> None:
+        """Release channels unused for ``warm_period``, unless monitored"""
+        self._sweep_handle = None
+        now = time.monotonic()
+        monitored = set()
+        if self._subscriptions is not None:
+            monitored = set(self._subscriptions.addresses)
+
+        for address, last_used in list(self._last_used.items()):
+            if address in monitored:
+                self._last_used[address] = now
+            elif now - last_used >= self.warm_period:
+                del self._last_used[address]
+                try:
+                    shim, name = self._route(address)
+                    shim.release(name)
+                except Exception as ex:
+                    logger.debug(f"Failed to release {address}: {ex}")
+
+        if self._last_used:
+            next_expiry = min(self._last_used.values()) + self.warm_period
+            self._sweep_handle = asyncio.get_running_loop().call_later(
+                max(next_expiry - now, 0), self._release_idle
+            )
 
     @singledispatchmethod
     def put(
         self,
         address: Union[str, list[str]],
         value: Union[Any, list[Any]],
-        cb: Optional[Union[Callable, list[Callable]]] = None
+        cb: Optional[Union[Callable, list[Callable]]] = None,
+        wait: Union[bool, list[bool]] = False,
+        timeout: Union[Optional[float], list[Optional[float]]] = None,
     ) -> Union[TaskStatus, list[TaskStatus]]:
         """
         Put ``value`` to ``address``
@@ -143,6 +729,12 @@ class ControlLayer:
             Callbacks to run on completion of the put task.
             Callbacks will be called with the associated TaskStatus as its
             sole argument
+        wait : Union[bool, list[bool]], optional
+            Whether each put completes once the record has processed, rather
+            than once sent, by default False.  See ``put_many``.
+        timeout : Union[Optional[float], list[Optional[float]]], optional
+            Time (seconds) before each put fails, by default None (left to the
+            shim).  See ``put_many``.
 
         Returns
         -------
@@ -158,67 +750,349 @@ class ControlLayer:
         self,
         address: str,
         value: Any,
-        cb: Optional[Callable] = None
+        cb: Optional[Callable] = None,
+        wait: bool = False,
+        timeout: Optional[float] = None,
     ) -> TaskStatus:
         """Synchronously put ``value`` to ``address``, running ``cb`` on completion"""
-        async def status_coro():
-            status = self._put_one(address, value)
-            if cb is not None:
-                status.add_callback(cb)
-            await asyncio.gather(status, return_exceptions=True)
-            return status
-
-        return asyncio.run(status_coro())
+        cbs = None if cb is None else [cb]
+        return self._run(
+            self._put_many([address], [value], cbs, wait=wait, timeout=timeout)
+        )[0]
 
     @put.register
     def _put_list(
         self,
         address: list,
         value: list,
-        cb: Optional[list[Callable]] = None
-    ) -> list[TaskStatus]:
+        cb: Optional[list[Callable]] = None,
+        group: bool = False,
+        progress: Optional[Callable[[StatusGroup], None]] = None,
+        wait: Union[bool, list[bool]] = False,
+        timeout: Union[Optional[float], list[Optional[float]]] = None,
+    ) -> Union[list[TaskStatus], StatusGroup]:
         """
         Synchronously put ``value`` to ``address``, running ``cb`` on completion.
-        All arguments must be of equal length.
+        All arguments must be of equal length.  If ``group`` is True, the puts
+        are tracked by a single StatusGroup, see ``put_many``.
+        """
+        self._check_put_lengths(address, value, cb, wait, timeout)
+        return self._run(
+            self._put_many(address, value, cb, group, progress, wait, timeout)
+        )
+
+    async def put_many(
+        self,
+        addresses: Sequence[str],
+        values: Sequence[Any],
+        cb: Optional[Sequence[Callable]] = None,
+        group: bool = False,
+        progress: Optional[Callable[[StatusGroup], None]] = None,
+        wait: Union[bool, Sequence[bool]] = False,
+        timeout: Union[Optional[float], Sequence[Optional[float]]] = None,
+    ) -> Union[List[TaskStatus], StatusGroup]:
+        """
+        Put ``values`` to ``addresses`` concurrently, and wait for every put to
+        complete.  All arguments must be of equal length.  At most
+        ``max_puts_in_flight`` puts are outstanding at once.
+
+        For large restores, set ``group`` to track every put with one
+        StatusGroup rather than a TaskStatus each.
+
+        Parameters
+        ----------
+        addresses : Sequence[str]
+            The PVs to put ``values`` to
+        values : Sequence[Any]
+            The values to put
+        cb : Optional[Sequence[Callable]], optional
+            Callbacks to run on completion of each put task, by default None.
+            Callbacks will be called with the associated TaskStatus as its
+            sole argument.  Not supported if ``group`` is True.
+        group : bool, optional
+            Whether to return a StatusGroup, by default False
+        progress : Optional[Callable[[StatusGroup], None]], optional
+            Progress callback for the StatusGroup, if ``group`` is True
+        wait : Union[bool, Sequence[bool]], optional
+            Whether puts complete once the record has processed (a CA
+            put-callback), rather than once sent, by default False.  Either one
+            value for every put, or one per put.
+        timeout : Union[Optional[float], Sequence[Optional[float]]], optional
+            Time (seconds) before a put fails with a CommunicationTimeoutError,
+            by default None (left to the shim).  Either one value for every put,
+            or one per put.
+
+        Returns
+        -------
+        Union[List[TaskStatus], StatusGroup]
+            The finished TaskStatus object for each put, or their StatusGroup
+
+        Raises
+        ------
+        ValueError
+            If the arguments are of different lengths, or per-put callbacks are
+            requested with ``group``
         """
+        self._check_put_lengths(addresses, values, cb, wait, timeout)
+        return await self._run_async(
+            self._put_many(addresses, values, cb, group, progress, wait, timeout)
+        )
+
+    async def _put_many(
+        self,
+        addresses: Sequence[str],
+        values: Sequence[Any],
+        cb: Optional[Sequence[Callable]] = None,
+        group: bool = False,
+        progress: Optional[Callable[[StatusGroup], None]] = None,
+        wait: Union[bool, Sequence[bool]] = False,
+        timeout: Union[Optional[float], Sequence[Optional[float]]] = None,
+    ) -> Union[List[TaskStatus], StatusGroup]:
+        waits = self._per_put(wait, len(addresses))
+        timeouts = self._per_put(timeout, len(addresses))
+        semaphore = None
+        if self.max_puts_in_flight:
+            semaphore = asyncio.Semaphore(self.max_puts_in_flight)
+
+        if group:
+            if cb is not None:
+                raise ValueError("Per-put callbacks are not supported for a "
+                                 "StatusGroup, use its progress callbacks")
+            status_group = StatusGroup(
+                self._put_value(p, val, w, t, semaphore)
+                for p, val, w, t in zip(addresses, values, waits, timeouts)
+            )
+            if progress is not None:
+                status_group.add_progress_callback(progress)
+            await status_group
+            return status_group
+
+        statuses = []
         if cb is None:
-            cb_length = len(address)
+            callbacks = [None for _ in range(len(addresses))]
+        else:
+            callbacks = cb
+
+        for p, val, c, w, t in zip(addresses, values, callbacks, waits, timeouts):
+            status = self._put_one(p, val, w, t, semaphore)
+            if c is not None:
+                status.add_callback(c)
+
+            statuses.append(status)
+        await asyncio.gather(*statuses, return_exceptions=True)
+        return statuses
+
+    @staticmethod
+    def _check_put_lengths(
+        addresses: Sequence[str],
+        values: Sequence[Any],
+        cb: Optional[Sequence[Callable]] = None,
+        wait: Union[bool, Sequence[bool]] = False,
+        timeout: Union[Optional[float], Sequence[Optional[float]]] = None,
+    ) -> None:
+        """Raise a ValueError if the arguments for a bulk put differ in length"""
+        if cb is None:
+            cb_length = len(addresses)
         else:
             cb_length = len(cb)
 
-        if not (len(address) == len(value) == cb_length):
+        if not (len(addresses) == len(values) == cb_length):
             raise ValueError(
                 'Arguments are of different length: '
-                f'addresses({len(address)}), values({len(value)}), cbs({len(cb)})'
+                f'addresses({len(addresses)}), values({len(values)}), '
+                f'cbs({cb_length})'
             )
+        for name, option in (('wait', wait), ('timeout', timeout)):
+            if isinstance(option, (list, tuple)) and len(option) != len(addresses):
+                raise ValueError(
+                    f'Arguments are of different length: addresses({len(addresses)}), '
+                    f'{name}({len(option)})'
+                )
+
+    @staticmethod
+    def _per_put(option: Any, n_puts: int) -> list:
+        """Expand a put option given once for every put into one per put"""
+        if isinstance(option, (list, tuple)):
+            return list(option)
+        return [option] * n_puts
+
+    @TaskStatus.wrap
+    async def _put_one(
+        self,
+        address: str,
+        value: Any,
+        wait: bool = False,
+        timeout: Optional[float] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ):
+        """
+        Base async put function.  Use this to construct higher-level put methods
+        """
+        await self._put_value(address, value, wait, timeout, semaphore)
+
+    async def _put_value(
+        self,
+        address: str,
+        value: Any,
+        wait: bool = False,
+        timeout: Optional[float] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> None:
+        """
+        Put ``value`` to ``address``, without wrapping in a TaskStatus.  Waits
+        for a slot in ``semaphore`` (see ``max_puts_in_flight``) first.
+
+        Raises
+        ------
+        CommunicationTimeoutError
+            If the put does not complete within ``timeout``
+        """
+        if semaphore is None:
+            return await self._put_timed(address, value, wait, timeout)
+        async with semaphore:
+            return await self._put_timed(address, value, wait, timeout)
+
+    async def _put_timed(
+        self,
+        address: str,
+        value: Any,
+        wait: bool,
+        timeout: Optional[float],
+    ) -> None:
+        shim, name = self._route(address)
+        self._touch(address)
+        with self._measure("put", address):
+            if not wait and timeout is None:
+                # shims are only given the options they need to support
+                await shim.put(name, value)
+                return
+            try:
+                await asyncio.wait_for(
+                    shim.put(name, value, wait=wait, timeout=timeout), timeout
+                )
+            except asyncio.TimeoutError:
+                raise CommunicationTimeoutError(
+                    f"Put timed out after {timeout}s: {address}"
+                )
+
+    def enable_stats(self, log_interval: Optional[float] = None) -> ControlLayerStats:
+        """
+        Start recording request latencies and errors in ``self.stats``.  If
+        ``log_interval`` is given, a summary is logged every ``log_interval``
+        seconds, which requires a persistent loop.  Gets made by worker
+        processes (see ``workers``) are not recorded.
 
-        async def status_coros():
-            statuses = []
-            if cb is None:
-                callbacks = [None for _ in range(len(address))]
+        Parameters
+        ----------
+        log_interval : Optional[float], optional
+            Time (seconds) between logged summaries, by default None (never)
+
+        Returns
+        -------
+        ControlLayerStats
+            The statistics being recorded
+        """
+        if self.stats is None:
+            self.stats = ControlLayerStats()
+        for shim in self._loaded_shims():
+            shim.stats = self.stats
+
+        if log_interval:
+            if self.loop_thread is None:
+                logger.warning("Statistics can only be logged periodically with "
+                               "a persistent loop")
             else:
-                callbacks = cb
+                self.loop_thread.start()
+        self._call_in_loop(self._restart_stats_log, log_interval)
+        return self.stats
 
-            for p, val, c in zip(address, value, callbacks):
-                status = self._put_one(p, val)
-                if c is not None:
-                    status.add_callback(c)
+    def disable_stats(self) -> None:
+        """Stop recording request statistics"""
+        self.stats = None
+        self._call_in_loop(self._restart_stats_log, None)
+        for shim in self._loaded_shims():
+            shim.stats = None
 
-                statuses.append(status)
-            await asyncio.gather(*statuses, return_exceptions=True)
-            return statuses
+    def _loaded_shims(self) -> List[_BaseShim]:
+        """The shims that have been instantiated, without loading the others"""
+        registry = getattr(self.shims, "registry", None)
+        return [
+            self.shims[name] for name in self.shims
+            if registry is None or registry.is_loaded(name)
+        ]
 
-        return asyncio.run(status_coros())
+    def _measure(self, operation: str, address: str) -> ContextManager:
+        """
+        Context manager timing a request for ``address`` in ``self.stats``.
+        Does nothing if statistics are disabled.
+        """
+        stats = self.stats
+        if stats is None:
+            return _NOT_MEASURED
+        shim = self._route(address)[0]
+        # so shims loaded since stats were enabled record their own requests
+        shim.stats = stats
+        return stats.measure(operation, type(shim).__name__)
 
-    @TaskStatus.wrap
-    async def _put_one(self, address: str, value: Any):
+    def _restart_stats_log(self, interval: Optional[float]) -> None:
         """
-        Base async put function.  Use this to construct higher-level put methods
+        Replace any periodic logging of ``self.stats`` with logging every
+        ``interval`` seconds, or none if None.  Call in the persistent loop
         """
-        shim = self.shim_from_pv(address)
-        await shim.put(address, value)
+        if self._stats_handle is not None:
+            self._stats_handle.cancel()
+            self._stats_handle = None
+        if interval and self.loop_thread is not None:
+            self._schedule_stats_log(interval)
+
+    def _schedule_stats_log(self, interval: float) -> None:
+        """Log ``self.stats`` in ``interval`` seconds.  Call in the persistent loop"""
+        self._stats_handle = asyncio.get_running_loop().call_later(
+            interval, self._log_stats, interval
+        )
+
+    def _log_stats(self, interval: float) -> None:
+        if self.stats is None:
+            return
+        self.stats.log()
+        self._schedule_stats_log(interval)
+
+    def subscribe(self, address: str, cb: Callable) -> Any:
+        """
+        Subscribes a callback (``cb``) to the provide address (``address``).
+        ``cb`` is called with an EpicsData for each update.
+
+        With a persistent loop the monitor is opened in that loop, otherwise
+        this must be called from within a running event loop.  Most consumers
+        should share monitors through ``self.subscriptions`` instead.
+
+        Returns
+        -------
+        Any
+            A handle for the monitor, to be passed to ``unsubscribe``
+        """
+        shim, name = self._route(address)
+        if self.loop_thread is None or self.loop_thread.in_loop_thread():
+            return shim.monitor(name, cb)
+
+        async def open_monitor():
+            return shim.monitor(name, cb)
+
+        return self.loop_thread.run(open_monitor())
+
+    def unsubscribe(self, handle: Any) -> None:
+        """Close the monitor ``handle`` returned by ``subscribe``"""
+        close = getattr(handle, 'close', None)
+        if close is None:
+            return
+        if self.loop_thread is None or self.loop_thread.in_loop_thread():
+            close()
+        elif self.loop_thread.is_running:
+            self.loop_thread.loop.call_soon_threadsafe(close)
 
-    def subscribe(self, address: str, cb: Callable):
-        """Subscribes a callback (``cb``) to the provide address (``address``)"""
-        shim = self.shim_from_pv(address)
-        shim.monitor(address, cb)
+    @property
+    def subscriptions(self) -> SubscriptionManager:
+        """The SubscriptionManager sharing monitors opened by this ControlLayer"""
+        if self._subscriptions is None:
+            self._subscriptions = SubscriptionManager(self)
+        return self._subscriptions
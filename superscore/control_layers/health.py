@@ -0,0 +1,146 @@
+"""
+Per-PV request outcomes and tracking of unreachable PVs
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Any, Dict, List, Optional
+
+from superscore.errors import CommunicationTimeoutError, DisconnectedError
+from superscore.model import Status
+
+
+class ReadOutcome(Enum):
+    """The outcome of a request for a single PV"""
+    OK = auto()
+    TIMEOUT = auto()
+    DISCONNECTED = auto()
+    ERROR = auto()
+
+    @classmethod
+    def from_result(cls, result: Any) -> ReadOutcome:
+        """
+        Classify a single result returned by ``ControlLayer.get``, which is
+        either data or the exception raised while requesting it.
+        """
+        if isinstance(result, CommunicationTimeoutError):
+            return cls.TIMEOUT
+        elif isinstance(result, DisconnectedError):
+            return cls.DISCONNECTED
+        elif isinstance(result, BaseException):
+            return cls.ERROR
+        return cls.OK
+
+    @property
+    def status(self) -> Status:
+        """The alarm status to record for a value that could not be read"""
+        return _OUTCOME_STATUS[self]
+
+
+_OUTCOME_STATUS = {
+    ReadOutcome.OK: Status.NO_ALARM,
+    ReadOutcome.TIMEOUT: Status.TIMEOUT,
+    ReadOutcome.DISCONNECTED: Status.COMM,
+    ReadOutcome.ERROR: Status.UDF,
+}
+
+
+@dataclass
+class _PVHealth:
+    failures: int = 0
+    last_attempt: float = 0.0
+    probing: bool = False
+
+
+class PVHealthTracker:
+    """
+    Circuit breaker tracking PVs that repeatedly fail to respond.
+
+    After ``failure_threshold`` consecutive timeouts or disconnections a PV is
+    marked as "suspect".  Requests for suspect PVs should fail fast instead of
+    waiting on the control system.  Once ``retry_interval`` seconds have passed
+    since the last attempt, the PV may be retried (probed); a successful
+    request clears its suspect status.
+
+    Parameters
+    ----------
+    failure_threshold : int, optional
+        Consecutive failures before a PV is suspect, by default 3.
+        A threshold of 0 disables the breaker.
+    retry_interval : float, optional
+        Seconds between retries of a suspect PV, by default 30
+
+    The tracker is shared by the loop thread and the callers of the control
+    layer, and may be used from any thread.
+    """
+    _health: Dict[str, _PVHealth]
+
+    def __init__(self, failure_threshold: int = 3, retry_interval: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.retry_interval = retry_interval
+        self._health = {}
+        self._lock = threading.Lock()
+
+    def record(self, address: str, outcome: ReadOutcome) -> None:
+        """Record the ``outcome`` of a request made for ``address``"""
+        with self._lock:
+            if outcome in (ReadOutcome.TIMEOUT, ReadOutcome.DISCONNECTED):
+                health = self._health.setdefault(address, _PVHealth())
+                health.failures += 1
+                health.last_attempt = time.monotonic()
+            elif outcome == ReadOutcome.OK:
+                self._health.pop(address, None)
+
+    def is_suspect(self, address: str) -> bool:
+        """Return True if ``address`` has failed too many times in a row"""
+        with self._lock:
+            return self._is_suspect(self._health.get(address))
+
+    def _is_suspect(self, health: Optional[_PVHealth]) -> bool:
+        if self.failure_threshold <= 0:
+            return False
+        return health is not None and health.failures >= self.failure_threshold
+
+    def should_retry(self, address: str) -> bool:
+        """
+        Return True if a suspect ``address`` is due to be retried.  Marks the
+        PV as being probed, so only one caller is told to retry at a time.
+        """
+        with self._lock:
+            health = self._health.get(address)
+            if health is None:
+                return True
+            if health.probing:
+                return False
+            if time.monotonic() - health.last_attempt < self.retry_interval:
+                return False
+
+            health.probing = True
+            return True
+
+    def finish_retry(self, address: str) -> None:
+        """Mark the retry of ``address`` as finished"""
+        with self._lock:
+            health = self._health.get(address)
+            if health is not None:
+                health.probing = False
+
+    @property
+    def suspects(self) -> List[str]:
+        """The PVs currently marked as suspect"""
+        with self._lock:
+            return [
+                address for address, health in self._health.items()
+                if self._is_suspect(health)
+            ]
+
+    def clear(self, address: Optional[str] = None) -> None:
+        """Forget the history of ``address``, or of all PVs if None"""
+        with self._lock:
+            if address is None:
+                self._health.clear()
+            else:
+                self._health.pop(address, None)
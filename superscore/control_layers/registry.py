@@ -0,0 +1,157 @@
+"""
+Registry of communication shims, imported and instantiated on first use
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+import threading
+from collections.abc import Mapping
+from importlib.metadata import entry_points
+from typing import Callable, Dict, Iterable, Iterator, Optional, Union
+
+from superscore.control_layers._base_shim import _BaseShim
+
+logger = logging.getLogger(__name__)
+
+# Third-party packages can provide shims by declaring entry points in this group,
+# named by protocol and pointing at a _BaseShim subclass (or factory), e.g.:
+#   [project.entry-points."superscore.shims"]
+#   pva = "my_package.shims:PVAShim"
+ENTRY_POINT_GROUP = "superscore.shims"
+
+# A callable returning a shim, or its "module:attribute" import path
+ShimFactory = Union[Callable[[], _BaseShim], str]
+
+
+def _resolve(factory: ShimFactory) -> Callable[[], _BaseShim]:
+    """Import ``factory`` if it is given as a "module:attribute" path"""
+    if not isinstance(factory, str):
+        return factory
+    module_name, _, attr = factory.partition(":")
+    obj = importlib.import_module(module_name)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+class ShimRegistry(Mapping):
+    """
+    A mapping of protocol names (e.g. "ca") to shims.  Shims are registered
+    by factory, and are imported and instantiated when first looked up, so
+    importing superscore does not load any control system libraries.  Each
+    shim is instantiated once and shared by every ControlLayer.
+
+    Shims registered by ``register`` come first, in the order registered,
+    followed by shims found in the ``superscore.shims`` entry point group.
+    """
+    _factories: Dict[str, ShimFactory]
+    _instances: Dict[str, _BaseShim]
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._entry_points_loaded = False
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: ShimFactory) -> None:
+        """
+        Register a shim for protocol ``name``, replacing any shim previously
+        registered under that name.
+
+        Parameters
+        ----------
+        name : str
+            The protocol name, as used in addresses like "name://PV:NAME"
+        factory : ShimFactory
+            A callable returning the shim, or its "module:attribute" path
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def _load_entry_points(self) -> None:
+        """Register shims advertised by installed packages, once"""
+        with self._lock:
+            if self._entry_points_loaded:
+                return
+            self._entry_points_loaded = True
+            try:
+                eps = entry_points(group=ENTRY_POINT_GROUP)
+            except TypeError:
+                # python 3.9 returns a dict of every group
+                eps = entry_points().get(ENTRY_POINT_GROUP, [])
+            for ep in eps:
+                if ep.name in self._factories:
+                    logger.debug(f"Shim {ep.name} is already registered, "
+                                 f"ignoring entry point {ep.value}")
+                    continue
+                self._factories[ep.name] = ep.value
+
+    def __getitem__(self, name: str) -> _BaseShim:
+        with self._lock:
+            shim = self._instances.get(name)
+            if shim is not None:
+                return shim
+            self._load_entry_points()
+            factory = self._factories[name]
+            logger.debug(f"Loading communication shim: {name}")
+            shim = _resolve(factory)()
+            self._instances[name] = shim
+            return shim
+
+    def __iter__(self) -> Iterator[str]:
+        self._load_entry_points()
+        return iter(list(self._factories))
+
+    def __len__(self) -> int:
+        self._load_entry_points()
+        return len(self._factories)
+
+    def __contains__(self, name: object) -> bool:
+        self._load_entry_points()
+        return name in self._factories
+
+    def is_loaded(self, name: str) -> bool:
+        """Return True if the shim for ``name`` has been instantiated"""
+        return name in self._instances
+
+    def select(self, names: Optional[Iterable[str]] = None) -> ShimSelection:
+        """
+        Return a view of the shims in ``names`` (all shims if None), in
+        registry order.  Shims are still only loaded when looked up.  Unknown
+        names are ignored.
+        """
+        return ShimSelection(self, names)
+
+
+class ShimSelection(Mapping):
+    """A lazily-loaded subset of the shims in a ShimRegistry"""
+    def __init__(self, registry: ShimRegistry, names: Optional[Iterable[str]] = None):
+        self.registry = registry
+        if names is None:
+            self.names = list(registry)
+        else:
+            names = set(names)
+            self.names = [name for name in registry if name in names]
+
+    def __getitem__(self, name: str) -> _BaseShim:
+        if name not in self.names:
+            raise KeyError(name)
+        return self.registry[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.names}>"
+
+
+# available communication shim layers
+SHIMS = ShimRegistry()
+SHIMS.register("ca", "superscore.control_layers._aioca:AiocaShim")
+SHIMS.register("pva", "superscore.control_layers._p4p:P4PShim")
+SHIMS.register("sim", "superscore.control_layers._sim:SimShim")
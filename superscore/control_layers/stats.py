@@ -0,0 +1,235 @@
+"""
+Latency histograms and error counters for control layer requests
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """
+    Histogram of latencies with logarithmically spaced buckets, in the style of
+    HdrHistogram.  Every doubling of latency is split into ``buckets_per_octave``
+    buckets, so percentiles are accurate to a fixed relative error (about 2% for
+    16 buckets) from microseconds to minutes, in a fixed amount of memory.
+
+    Parameters
+    ----------
+    lowest : float, optional
+        Smallest latency (seconds) to distinguish, by default 1 µs.  Smaller
+        latencies are counted in the lowest bucket.
+    highest : float, optional
+        Largest latency (seconds) to distinguish, by default 1000.  Larger
+        latencies are counted in the highest bucket.
+    buckets_per_octave : int, optional
+        Number of buckets per doubling of latency, by default 16
+    """
+    counts: np.ndarray
+
+    def __init__(
+        self,
+        lowest: float = 1e-6,
+        highest: float = 1e3,
+        buckets_per_octave: int = 16,
+    ):
+        self.lowest = lowest
+        self.highest = highest
+        self.buckets_per_octave = buckets_per_octave
+        n_buckets = math.ceil(math.log2(highest / lowest) * buckets_per_octave) + 1
+        self.counts = np.zeros(n_buckets, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        if value <= self.lowest:
+            return 0
+        index = int(math.log2(value / self.lowest) * self.buckets_per_octave)
+        return min(index, len(self.counts) - 1)
+
+    def _bucket_value(self, index: int) -> float:
+        """The (geometric) middle of bucket ``index``"""
+        return self.lowest * 2 ** ((index + 0.5) / self.buckets_per_octave)
+
+    def record(self, value: float) -> None:
+        """Record a single latency, in seconds"""
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: LatencyHistogram) -> None:
+        """Add the latencies recorded by ``other``, which must match in shape"""
+        if len(other.counts) != len(self.counts):
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Return the latency at or below which ``percent`` percent of recorded
+        latencies fall, to within the bucket resolution.  None if empty.
+        """
+        if not self.count:
+            return None
+        rank = max(math.ceil(percent / 100 * self.count), 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(max(self._bucket_value(index), self.min), self.max)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarize the histogram as count, mean, extremes and percentiles"""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p99.9": self.percentile(99.9),
+        }
+
+
+class ControlLayerStats:
+    """
+    Instrumentation for control layer requests: a LatencyHistogram per
+    operation (e.g. "get", "put", "connect") and shim, counters of errors by
+    type, and the number of requests in flight.
+
+    Safe to record from several threads.  Use ``snapshot`` or ``to_json`` to
+    report the statistics, and ``reset`` to start again.
+    """
+    latency: Dict[Tuple[str, str], LatencyHistogram]
+    errors: Counter
+    in_flight: Counter
+    peak_in_flight: Counter
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard everything recorded so far"""
+        with self._lock:
+            self.latency = {}
+            self.errors = Counter()
+            self.in_flight = Counter()
+            self.peak_in_flight = Counter()
+            self.since = datetime.now(timezone.utc)
+
+    def record(
+        self,
+        operation: str,
+        shim: str,
+        elapsed: float,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """
+        Record a request that took ``elapsed`` seconds, and the error it raised
+        if it failed
+
+        Parameters
+        ----------
+        operation : str
+            The kind of request, e.g. "get"
+        shim : str
+            The shim that served the request
+        elapsed : float
+            Time (seconds) taken by the request
+        error : Optional[BaseException], optional
+            The error raised by the request, by default None
+        """
+        with self._lock:
+            histogram = self.latency.get((operation, shim))
+            if histogram is None:
+                histogram = self.latency[(operation, shim)] = LatencyHistogram()
+            histogram.record(elapsed)
+            if error is not None:
+                self.errors[(operation, shim, type(error).__name__)] += 1
+
+    @contextmanager
+    def measure(self, operation: str, shim: str) -> Iterator[None]:
+        """
+        Time the body of the ``with`` block as one ``operation`` request,
+        counting it as in flight until it finishes.  Errors are recorded and
+        re-raised.  Cancelled requests are not recorded.
+        """
+        with self._lock:
+            self.in_flight[operation] += 1
+            self.peak_in_flight[operation] = max(
+                self.peak_in_flight[operation], self.in_flight[operation]
+            )
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as ex:
+            self.record(operation, shim, time.perf_counter() - start, ex)
+            raise
+        else:
+            self.record(operation, shim, time.perf_counter() - start)
+        finally:
+            with self._lock:
+                self.in_flight[operation] -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the statistics as a JSON-serializable dictionary"""
+        with self._lock:
+            operations = []
+            for (operation, shim), histogram in sorted(self.latency.items()):
+                errors = {
+                    error: count
+                    for (op, sh, error), count in self.errors.items()
+                    if (op, sh) == (operation, shim)
+                }
+                operations.append({
+                    "operation": operation,
+                    "shim": shim,
+                    **histogram.to_dict(),
+                    "errors": errors,
+                })
+            return {
+                "since": self.since.isoformat(),
+                "operations": operations,
+                "in_flight": dict(self.in_flight),
+                "peak_in_flight": dict(self.peak_in_flight),
+            }
+
+    def to_json(self, **kwargs) -> str:
+        """Return ``snapshot`` as a JSON string.  Keyword arguments go to json.dumps"""
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def log(self, level: int = logging.INFO) -> None:
+        """Log a one line summary per operation and shim"""
+        for op in self.snapshot()["operations"]:
+            errors = sum(op["errors"].values())
+            logger.log(
+                level,
+                f"{op['operation']} ({op['shim']}): {op['count']} requests, "
+                f"p50 {_ms(op['p50'])}, p99 {_ms(op['p99'])}, max {_ms(op['max'])}, "
+                f"{errors} errors"
+            )
+
+
+def _ms(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.1f}ms"
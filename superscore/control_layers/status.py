@@ -1,8 +1,15 @@
 from __future__ import annotations
 
 import asyncio
+import concurrent.futures
 import functools
-from typing import Awaitable, Callable, Optional, Type, TypeVar, cast
+import logging
+import threading
+import time
+from typing import (Awaitable, Callable, Dict, Iterable, Optional, Type,
+                    TypeVar, cast)
+
+logger = logging.getLogger(__name__)
 
 TS = TypeVar("TS", bound="TaskStatus")
 
@@ -13,7 +20,9 @@ class TaskStatus:
     callbacks. This must be created inside of a coroutine, but can be returned to
     synchronous scope for examining the task.
 
-    Awaiting this status is similar to awaiting the wrapped task.
+    Awaiting this status is similar to awaiting the wrapped task.  The status
+    records the event loop running its task, so ``wait`` and ``cancel`` can be
+    used from any thread.
 
     Largely vendored from bluesky/ophyd-async
     """
@@ -23,20 +32,28 @@ class TaskStatus:
             self.task = awaitable
         else:
             self.task = asyncio.create_task(awaitable)
-        self.task.add_done_callback(self._run_callbacks)
+        self.loop = self.task.get_loop()
+        self._lock = threading.Lock()
         self._callbacks: list[Callable] = []
+        self._callbacks_run = False
+        self.task.add_done_callback(self._run_callbacks)
 
     def __await__(self):
         return self.task.__await__()
 
     def add_callback(self, callback: Callable):
-        if self.done:
-            callback(self)
-        else:
-            self._callbacks.append(callback)
+        with self._lock:
+            if not self._callbacks_run:
+                self._callbacks.append(callback)
+                return
+        callback(self)
 
     def _run_callbacks(self, task: asyncio.Task):
-        for callback in self._callbacks:
+        with self._lock:
+            self._callbacks_run = True
+            callbacks = self._callbacks
+            self._callbacks = []
+        for callback in callbacks:
             callback(self)
 
     def exception(self) -> Optional[BaseException]:
@@ -59,12 +76,31 @@ class TaskStatus:
             and self.task.exception() is None
         )
 
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def cancel(self) -> None:
+        """Request cancellation of the task.  Can be called from any thread"""
+        if self.task.done():
+            return
+        if self._in_loop_thread() or not self.loop.is_running():
+            self.task.cancel()
+        else:
+            self.loop.call_soon_threadsafe(self.task.cancel)
+
     def wait(self, timeout=None) -> None:
         """
         Block until the coroutine finishes.  Raises asyncio.TimeoutError if
-        the timeout elapses before the task is completed
+        the timeout elapses before the task is completed, cancelling the task.
+        Raises the task's exception if it failed.
 
-        To be called in a synchronous context, if the status has not been awaited
+        To be called in a synchronous context, from any thread other than the
+        one running the task's event loop.  If that loop is running in another
+        thread (e.g. a ControlLayer's persistent loop) this blocks until the
+        loop finishes the task, otherwise the loop is run until then.
 
         Parameters
         ----------
@@ -74,11 +110,31 @@ class TaskStatus:
         Raises
         ------
         asyncio.TimeoutError
+        RuntimeError
+            If called from the task's running event loop, or the loop has
+            closed without finishing the task
         """
-        # ensure task runs in the event loop it was assigned to originally
-        asyncio.get_event_loop().run_until_complete(
-            asyncio.wait_for(self.task, timeout)
-        )
+        if self.task.done():
+            self.task.result()
+            return
+
+        if self._in_loop_thread():
+            raise RuntimeError(
+                "TaskStatus.wait would block its own event loop, await it instead"
+            )
+        elif self.loop.is_closed():
+            raise RuntimeError("The event loop running this task has closed")
+        elif self.loop.is_running():
+            future = asyncio.run_coroutine_threadsafe(
+                asyncio.wait_for(self.task, timeout), self.loop
+            )
+            try:
+                future.result()
+            except concurrent.futures.CancelledError:
+                raise asyncio.CancelledError()
+        else:
+            # ensure task runs in the event loop it was assigned to originally
+            self.loop.run_until_complete(asyncio.wait_for(self.task, timeout))
 
     def __repr__(self) -> str:
         if self.done:
@@ -101,3 +157,176 @@ class TaskStatus:
             return cls(f(*args, **kwargs))
 
         return cast(Callable[..., TS], wrap_f)
+
+
+class StatusGroup:
+    """
+    Aggregate status of many tasks, such as the puts of a large restore.  This
+    must be created inside of a coroutine, but can be returned to synchronous
+    scope, or to another thread, for examining the tasks.
+
+    Counts of finished, succeeded and failed tasks are kept as each task
+    finishes, so checking on the group does not walk its tasks.  Only the
+    exceptions of failed tasks are kept, by task index.  Callbacks are run once
+    for the whole group, rather than once per task:
+
+    - completion callbacks (``add_callback``) run once every task has finished
+    - progress callbacks (``add_progress_callback``) run as tasks finish, at
+      most once per ``progress_interval`` seconds, and always on completion
+
+    Callbacks are called with the StatusGroup as their sole argument, from the
+    event loop running the tasks.  Awaiting this status waits for every task,
+    without raising their exceptions.
+
+    Parameters
+    ----------
+    awaitables : Iterable[Awaitable]
+        The coroutines or tasks to track
+    progress_interval : float, optional
+        Minimum time (seconds) between progress callbacks, by default 0.1
+    """
+    errors: Dict[int, BaseException]
+
+    def __init__(self, awaitables: Iterable[Awaitable], progress_interval: float = 0.1):
+        self.progress_interval = progress_interval
+        self.errors = {}
+        self.n_done = 0
+        self.n_succeeded = 0
+        self.n_failed = 0
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._callbacks: list[Callable] = []
+        self._progress_callbacks: list[Callable] = []
+        self._last_progress = 0.0
+        self._loop = asyncio.get_running_loop()
+
+        self.tasks: list[asyncio.Task] = []
+        for i, awaitable in enumerate(awaitables):
+            if isinstance(awaitable, asyncio.Task):
+                task = awaitable
+            else:
+                task = self._loop.create_task(awaitable)
+            task.add_done_callback(functools.partial(self._task_done, i))
+            self.tasks.append(task)
+        if not self.tasks:
+            self._finished.set()
+
+    def __await__(self):
+        return self._wait_async().__await__()
+
+    async def _wait_async(self) -> None:
+        if self.tasks:
+            await asyncio.wait(self.tasks)
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    @property
+    def total(self) -> int:
+        """The number of tasks in the group"""
+        return len(self.tasks)
+
+    @property
+    def done(self) -> bool:
+        """True if every task has finished"""
+        return self._finished.is_set()
+
+    @property
+    def success(self) -> bool:
+        """True if every task has finished without raising"""
+        return self.done and self.n_failed == 0
+
+    @property
+    def progress(self) -> float:
+        """The fraction of tasks that have finished"""
+        return self.n_done / self.total if self.tasks else 1.0
+
+    def exception(self, index: int) -> Optional[BaseException]:
+        """Return the exception raised by task ``index``, if it failed"""
+        return self.errors.get(index)
+
+    def add_callback(self, callback: Callable) -> None:
+        """Run ``callback`` once every task has finished"""
+        with self._lock:
+            if not self.done:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def add_progress_callback(self, callback: Callable) -> None:
+        """Run ``callback`` periodically as tasks finish"""
+        with self._lock:
+            self._progress_callbacks.append(callback)
+
+    def _task_done(self, index: int, task: asyncio.Task) -> None:
+        if task.cancelled():
+            error = asyncio.CancelledError()
+        else:
+            error = task.exception()
+
+        with self._lock:
+            self.n_done += 1
+            if error is None:
+                self.n_succeeded += 1
+            else:
+                self.n_failed += 1
+                self.errors[index] = error
+            finished = self.n_done == self.total
+            now = time.monotonic()
+            report = finished or now - self._last_progress >= self.progress_interval
+            if report:
+                self._last_progress = now
+            progress_callbacks = list(self._progress_callbacks) if report else []
+            callbacks = self._callbacks if finished else []
+
+        for callback in progress_callbacks:
+            self._run_callback(callback)
+        if finished:
+            self._finished.set()
+            for callback in callbacks:
+                self._run_callback(callback)
+
+    def _run_callback(self, callback: Callable) -> None:
+        try:
+            callback(self)
+        except Exception as ex:
+            logger.exception(f"StatusGroup callback failed: {ex}")
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """
+        Block until every task finishes.  Can be called from any thread other
+        than the one running the tasks' event loop, where the group should be
+        awaited instead.  The tasks keep running if the timeout elapses.
+
+        Parameters
+        ----------
+        timeout : number, optional
+            timeout in seconds, by default None
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            If the timeout elapses before every task finishes
+        RuntimeError
+            If called from the event loop running the tasks, before they finish
+        """
+        if self.done:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            raise RuntimeError(
+                "StatusGroup.wait would block its own event loop, await it instead"
+            )
+        if not self._finished.wait(timeout):
+            raise asyncio.TimeoutError(
+                f"{self.total - self.n_done} of {self.total} tasks still pending"
+            )
+
+    def __repr__(self) -> str:
+        return (f"<{type(self).__name__}, {self.n_done}/{self.total} done, "
+                f"{self.n_failed} failed>")
+
+    __str__ = __repr__
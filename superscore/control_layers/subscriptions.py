@@ -0,0 +1,261 @@
+"""
+Shared, reference-counted PV monitors built on ``ControlLayer.subscribe``
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from dataclasses import dataclass, field
+from functools import partial
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterable, List,
+                    Optional, Tuple)
+
+from superscore.control_layers._base_shim import EpicsData
+
+if TYPE_CHECKING:
+    from superscore.control_layers.core import ControlLayer
+
+logger = logging.getLogger(__name__)
+
+# monitors opened by subscribe_many before yielding to the event loop
+OPEN_CHUNK_SIZE = 100
+
+# Called with the PV name and its new EpicsData
+SubscriptionCallback = Callable[[str, EpicsData], None]
+
+
+@dataclass
+class _PVSubscription:
+    handle: Any = None
+    callbacks: List[SubscriptionCallback] = field(default_factory=list)
+    latest: Optional[EpicsData] = None
+
+
+class SubscriptionManager:
+    """
+    Shares one monitor per PV between any number of consumers.
+
+    The first consumer of a PV opens a monitor through the ControlLayer, and
+    the last consumer to leave closes it.  Each update is stored as the PV's
+    latest value and fanned out to every consumer, so consumers only hear about
+    PVs that change rather than polling all of them.  Consumers that subscribe
+    to an already-monitored PV are immediately given its latest value.
+
+    Callbacks are run in the thread delivering monitor updates (the
+    ControlLayer's event loop thread), and must not block.
+
+    Parameters
+    ----------
+    control_layer : ControlLayer
+        The ControlLayer to open monitors through.  Monitors can only outlive
+        a single request if it has a persistent event loop.
+    """
+    _subs: Dict[str, _PVSubscription]
+
+    def __init__(self, control_layer: ControlLayer):
+        self.control_layer = control_layer
+        self._subs = {}
+        self._lock = threading.RLock()
+
+    def subscribe(self, address: str, callback: SubscriptionCallback) -> None:
+        """
+        Register ``callback`` for updates to ``address``, opening a monitor if
+        this is the first consumer of ``address``.
+
+        Parameters
+        ----------
+        address : str
+            The PV to monitor
+        callback : SubscriptionCallback
+            Called with (address, EpicsData) for each update
+        """
+        with self._lock:
+            sub = self._subs.get(address)
+            opening = sub is None
+            if opening:
+                sub = _PVSubscription()
+                self._subs[address] = sub
+            sub.callbacks.append(callback)
+            latest = sub.latest
+
+        if opening:
+            self._open(address, sub)
+        elif latest is not None:
+            self._run_callback(callback, address, latest)
+
+    def subscribe_many(
+        self,
+        addresses: Iterable[str],
+        callback: SubscriptionCallback,
+    ) -> concurrent.futures.Future:
+        """
+        Register ``callback`` for updates to each of ``addresses``, without
+        waiting for new monitors to open.
+
+        Monitors for PVs without consumers are opened by a single coroutine
+        submitted to the persistent event loop, so the caller (e.g. the Qt
+        thread) does not block on a round trip to the loop for each PV.  PVs
+        that cannot be monitored are logged and dropped.
+
+        Parameters
+        ----------
+        addresses : Iterable[str]
+            The PVs to monitor
+        callback : SubscriptionCallback
+            Called with (address, EpicsData) for each update
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Resolves once every new monitor has been opened, to a dictionary
+            mapping each PV that could not be monitored to its exception
+        """
+        opening = []
+        latest = []
+        with self._lock:
+            for address in addresses:
+                sub = self._subs.get(address)
+                if sub is None:
+                    sub = _PVSubscription()
+                    self._subs[address] = sub
+                    opening.append((address, sub))
+                elif sub.latest is not None:
+                    latest.append((address, sub.latest))
+                sub.callbacks.append(callback)
+
+        for address, data in latest:
+            self._run_callback(callback, address, data)
+
+        loop_thread = self.control_layer.loop_thread
+        if opening and loop_thread is not None:
+            return loop_thread.submit(self._open_many(opening))
+
+        # without a persistent loop, monitors are opened in the running loop
+        # (as with subscribe)
+        future = concurrent.futures.Future()
+        future.set_result(self._open_each(opening))
+        return future
+
+    async def _open_many(
+        self,
+        opening: List[Tuple[str, _PVSubscription]],
+    ) -> Dict[str, Exception]:
+        """
+        Open the monitors for ``opening`` in chunks, yielding to the event loop
+        between chunks so updates for open monitors are not held up
+        """
+        failed = {}
+        for start in range(0, len(opening), OPEN_CHUNK_SIZE):
+            if start:
+                await asyncio.sleep(0)
+            failed.update(self._open_each(opening[start:start + OPEN_CHUNK_SIZE]))
+        return failed
+
+    def _open_each(
+        self,
+        opening: List[Tuple[str, _PVSubscription]],
+    ) -> Dict[str, Exception]:
+        """Open each of the monitors in ``opening``, returning any failures"""
+        failed = {}
+        for address, sub in opening:
+            try:
+                self._open(address, sub)
+            except Exception as ex:
+                logger.warning(f"Unable to monitor {address}: {ex}")
+                failed[address] = ex
+        return failed
+
+    def _open(self, address: str, sub: _PVSubscription) -> None:
+        """
+        Open the monitor for the new subscription ``sub``.  Called without the
+        lock held, as the event loop may need it to deliver updates for other
+        PVs before the monitor can be opened.
+        """
+        try:
+            handle = self.control_layer.subscribe(
+                address, partial(self._on_update, address)
+            )
+        except Exception:
+            with self._lock:
+                if self._subs.get(address) is sub:
+                    del self._subs[address]
+            raise
+
+        with self._lock:
+            if self._subs.get(address) is sub:
+                sub.handle = handle
+                handle = None
+        if handle is not None:
+            # every consumer left while the monitor was being opened
+            self.control_layer.unsubscribe(handle)
+            return
+        logger.debug(f"Opened shared monitor for {address}")
+
+    def unsubscribe(self, address: str, callback: SubscriptionCallback) -> None:
+        """
+        Remove ``callback`` from the consumers of ``address``, closing the
+        monitor if no consumers remain.
+        """
+        with self._lock:
+            sub = self._subs.get(address)
+            if sub is None:
+                return
+            try:
+                sub.callbacks.remove(callback)
+            except ValueError:
+                return
+
+            if not sub.callbacks:
+                del self._subs[address]
+                self.control_layer.unsubscribe(sub.handle)
+                logger.debug(f"Closed shared monitor for {address}")
+
+    def latest(self, address: str) -> Optional[EpicsData]:
+        """Return the most recent value received for ``address``, if any"""
+        with self._lock:
+            sub = self._subs.get(address)
+            return None if sub is None else sub.latest
+
+    def consumer_count(self, address: str) -> int:
+        """Return the number of consumers subscribed to ``address``"""
+        with self._lock:
+            sub = self._subs.get(address)
+            return 0 if sub is None else len(sub.callbacks)
+
+    @property
+    def addresses(self) -> List[str]:
+        """The PVs currently being monitored"""
+        with self._lock:
+            return list(self._subs)
+
+    def close(self) -> None:
+        """Close every monitor and drop all consumers"""
+        with self._lock:
+            subs, self._subs = self._subs, {}
+        for sub in subs.values():
+            self.control_layer.unsubscribe(sub.handle)
+
+    def _on_update(self, address: str, data: EpicsData) -> None:
+        """Store the latest value for ``address`` and fan it out to consumers"""
+        with self._lock:
+            sub = self._subs.get(address)
+            if sub is None:
+                return
+            sub.latest = data
+            callbacks = list(sub.callbacks)
+
+        for callback in callbacks:
+            self._run_callback(callback, address, data)
+
+    @staticmethod
+    def _run_callback(
+        callback: SubscriptionCallback,
+        address: str,
+        data: EpicsData
+    ) -> None:
+        try:
+            callback(address, data)
+        except Exception as ex:
+            logger.exception(f"Subscription callback for {address} failed: {ex}")
@@ -19,3 +19,13 @@ class EntryNotFoundError(BackendError):
 class CommunicationError(Exception):
     """Raised when communication with the control system fails"""
     pass
+
+
+class CommunicationTimeoutError(CommunicationError):
+    """Raised when a control system request does not complete in time"""
+    pass
+
+
+class DisconnectedError(CommunicationError):
+    """Raised when a PV cannot be connected to, or is known to be unreachable"""
+    pass
@@ -13,7 +13,7 @@ import apischema
 
 from superscore.serialization import as_tagged_union
 from superscore.type_hints import AnyEpicsType
-from superscore.utils import utcnow
+from superscore.utils import dataclass_equal, utcnow
 
 logger = logging.getLogger(__name__)
 _root_uuid = _root_uuid = UUID("a28cd77d-cc92-46cc-90cb-758f0f36f041")
@@ -100,12 +100,21 @@ class Entry:
 
 @dataclass
 class Parameter(Entry):
-    """An Entry that stores a PV name"""
+    """
+    An Entry that stores a PV name
+
+    put_wait - when restoring, wait for the record to finish processing (a CA
+               put-callback) rather than only for the put to be sent
+    put_timeout - time (seconds) after which a restoring put is considered to
+                  have failed
+    """
     pv_name: str = ""
     abs_tolerance: Optional[float] = None
     rel_tolerance: Optional[float] = None
     readback: Optional[Parameter] = None
     read_only: bool = False
+    put_wait: bool = False
+    put_timeout: Optional[float] = None
 
     def validate(self, toplevel: bool = True) -> bool:
         readback_is_valid = self.readback is None or self.readback.validate(toplevel=False)
@@ -114,12 +123,22 @@ class Parameter(Entry):
 
 @dataclass
 class Setpoint(Entry):
-    """A Value that can be written to the EPICS environment"""
+    """
+    A Value that can be written to the EPICS environment
+
+    put_wait - wait for the record to finish processing when written
+    put_timeout - time (seconds) after which writing the value has failed
+    """
     pv_name: str = ""
     data: Optional[AnyEpicsType] = None
     status: Status = Status.UDF
     severity: Severity = Severity.INVALID
     readback: Optional[Readback] = None
+    put_wait: bool = False
+    put_timeout: Optional[float] = None
+
+    # data may be an array, which can't be compared with ==
+    __eq__ = dataclass_equal
 
     @classmethod
     def from_parameter(
@@ -136,6 +155,8 @@ class Setpoint(Entry):
             status=status,
             severity=severity,
             readback=origin.readback,
+            put_wait=origin.put_wait,
+            put_timeout=origin.put_timeout,
         )
 
     def validate(self, toplevel: bool = True) -> bool:
@@ -163,6 +184,8 @@ class Readback(Entry):
     rel_tolerance: Optional[float] = None
     timeout: Optional[float] = None
 
+    __eq__ = dataclass_equal
+
     @classmethod
     def from_parameter(
         cls,
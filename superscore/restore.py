@@ -0,0 +1,412 @@
+"""
+Restoring Snapshots, verifying that readbacks converge on the restored values
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence
+
+from superscore.control_layers._base_shim import EpicsData
+from superscore.model import Readback, Setpoint
+from superscore.utils import values_close
+
+if TYPE_CHECKING:
+    from superscore.control_layers import ControlLayer
+    from superscore.control_layers.status import TaskStatus
+
+logger = logging.getLogger(__name__)
+
+
+class Convergence(Enum):
+    """How a restored PV resolved"""
+    # the readback came within tolerance of the restored value
+    CONVERGED = auto()
+    # the readback was read, but was still out of tolerance at its timeout
+    OUT_OF_TOLERANCE = auto()
+    # no readback value was received before the timeout
+    TIMED_OUT = auto()
+    # the put itself failed
+    PUT_FAILED = auto()
+    # the put succeeded, and there is no readback to verify against
+    NO_READBACK = auto()
+    # the put was not attempted, because the restore was aborted
+    SKIPPED = auto()
+
+    @property
+    def ok(self) -> bool:
+        """True if the PV was restored, and converged if it could be verified"""
+        return self in (Convergence.CONVERGED, Convergence.NO_READBACK)
+
+
+@dataclass
+class PVRestoreResult:
+    """The outcome of restoring a single Setpoint"""
+    setpoint: Setpoint
+    readback: Optional[Readback]
+    outcome: Convergence
+    # the last value received from the readback
+    readback_value: Any = None
+    # time (seconds) from the end of the put until the PV resolved
+    elapsed: float = 0.0
+    error: Optional[BaseException] = None
+    # name of the RestorePhase the PV was restored in
+    phase: str = ""
+
+    @property
+    def pv_name(self) -> str:
+        return self.setpoint.pv_name
+
+
+@dataclass
+class RestoreReport:
+    """The outcome of restoring a group of Setpoints"""
+    results: List[PVRestoreResult] = field(default_factory=list)
+    elapsed: float = 0.0
+    # True if the restore stopped early after a failure
+    aborted: bool = False
+
+    @property
+    def success(self) -> bool:
+        """True if every put succeeded and every readback converged"""
+        return all(result.outcome.ok for result in self.results)
+
+    @property
+    def failed(self) -> List[PVRestoreResult]:
+        """Results for the PVs that failed to restore or converge"""
+        return [
+            result for result in self.results
+            if not result.outcome.ok and result.outcome != Convergence.SKIPPED
+        ]
+
+    def counts(self) -> Dict[Convergence, int]:
+        """Return the number of PVs resolved with each outcome"""
+        counts = {outcome: 0 for outcome in Convergence}
+        for result in self.results:
+            counts[result.outcome] += 1
+        return counts
+
+    def __str__(self) -> str:
+        counts = ", ".join(
+            f"{count} {outcome.name.lower()}"
+            for outcome, count in self.counts().items() if count
+        )
+        aborted = " (aborted)" if self.aborted else ""
+        return (f"Restored {len(self.results)} PVs in {self.elapsed:.1f}s{aborted} "
+                f"({counts or 'nothing to restore'})")
+
+
+@dataclass
+class RestorePhase:
+    """
+    A group of Setpoints restored together.  Puts within a phase are made
+    concurrently, and a phase only starts once the previous phase has finished.
+
+    readbacks - the Readback to verify for each Setpoint, or None
+    """
+    name: str = ""
+    setpoints: List[Setpoint] = field(default_factory=list)
+    readbacks: List[Optional[Readback]] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if not self.readbacks:
+            self.readbacks = [setpoint.readback for setpoint in self.setpoints]
+        if len(self.readbacks) != len(self.setpoints):
+            raise ValueError(
+                f"Phase {self.name!r} has {len(self.setpoints)} setpoints but "
+                f"{len(self.readbacks)} readbacks"
+            )
+
+
+@dataclass
+class RestorePlan:
+    """
+    An ordered sequence of RestorePhases, and the limits to restore them with.
+    Usually built from a Snapshot by ``Client.plan_restore``.
+
+    max_rate - the most puts started per second, or None for no limit
+    max_in_flight - the most puts outstanding at once, or None for no limit
+    abort_on_failure - if True, stop starting puts once any PV fails to restore
+                       or converge.  Puts already started are allowed to finish,
+                       later PVs are reported as SKIPPED.
+    """
+    phases: List[RestorePhase] = field(default_factory=list)
+    max_rate: Optional[float] = None
+    max_in_flight: Optional[int] = None
+    abort_on_failure: bool = True
+
+    def __len__(self) -> int:
+        return sum(len(phase.setpoints) for phase in self.phases)
+
+
+# Called with the number of PVs resolved so far, the total number of PVs, and
+# the newly resolved PV
+ProgressCallback = Callable[[int, int, PVRestoreResult], None]
+
+
+class _RateLimiter:
+    """Spaces calls to ``wait`` at least 1 / ``rate`` seconds apart"""
+    def __init__(self, rate: float):
+        self.period = 1 / rate
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        start = max(now, self._next)
+        self._next = start + self.period
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class RestoreEngine:
+    """
+    Applies Setpoints, then verifies that each associated Readback converges
+    on the restored value.
+
+    Once a put completes, its readback is monitored until it comes within
+    tolerance (``Readback.abs_tolerance`` and ``Readback.rel_tolerance``, as in
+    ``np.isclose``), or until ``Readback.timeout`` elapses.  Readbacks are
+    verified concurrently, so a phase takes about as long as its slowest
+    readback.
+
+    Parameters
+    ----------
+    control_layer : ControlLayer
+        The ControlLayer to make puts and open monitors through
+    default_timeout : float, optional
+        Time (seconds) to wait for readbacks that have no timeout of their own,
+        by default 10
+    """
+    def __init__(self, control_layer: ControlLayer, default_timeout: float = 10.0):
+        self.control_layer = control_layer
+        self.default_timeout = default_timeout
+
+    def restore(
+        self,
+        setpoints: Sequence[Setpoint],
+        readbacks: Optional[Sequence[Optional[Readback]]] = None,
+    ) -> RestoreReport:
+        """
+        Apply ``setpoints`` concurrently and verify their readbacks, blocking
+        until every PV has resolved.  See ``restore_async``.
+        """
+        return self.execute(self._single_phase(setpoints, readbacks))
+
+    async def restore_async(
+        self,
+        setpoints: Sequence[Setpoint],
+        readbacks: Optional[Sequence[Optional[Readback]]] = None,
+    ) -> RestoreReport:
+        """
+        Apply ``setpoints`` concurrently and verify their readbacks.
+
+        Parameters
+        ----------
+        setpoints : Sequence[Setpoint]
+            The values to restore
+        readbacks : Optional[Sequence[Optional[Readback]]], optional
+            The readback to verify for each Setpoint, by default each
+            Setpoint's own ``readback``
+
+        Returns
+        -------
+        RestoreReport
+            How each PV resolved
+        """
+        return await self.execute_async(self._single_phase(setpoints, readbacks))
+
+    @staticmethod
+    def _single_phase(
+        setpoints: Sequence[Setpoint],
+        readbacks: Optional[Sequence[Optional[Readback]]] = None,
+    ) -> RestorePlan:
+        phase = RestorePhase(setpoints=list(setpoints), readbacks=list(readbacks or []))
+        return RestorePlan(phases=[phase], abort_on_failure=False)
+
+    def execute(
+        self,
+        plan: RestorePlan,
+        progress: Optional[ProgressCallback] = None,
+    ) -> RestoreReport:
+        """
+        Restore each phase of ``plan`` in order, blocking until done.  See
+        ``execute_async``.
+        """
+        return self.control_layer._run(self._execute(plan, progress))
+
+    async def execute_async(
+        self,
+        plan: RestorePlan,
+        progress: Optional[ProgressCallback] = None,
+    ) -> RestoreReport:
+        """
+        Restore each phase of ``plan`` in order, within the plan's rate and
+        in-flight limits.
+
+        Parameters
+        ----------
+        plan : RestorePlan
+            The phases to restore, and the limits to restore them with
+        progress : Optional[ProgressCallback], optional
+            Called as each PV resolves with the number of PVs resolved so far,
+            the total number of PVs and the PV's PVRestoreResult.  Called from
+            the ControlLayer's event loop, so must not block.
+
+        Returns
+        -------
+        RestoreReport
+            How each PV resolved, in plan order
+        """
+        return await self.control_layer._run_async(self._execute(plan, progress))
+
+    async def _execute(
+        self,
+        plan: RestorePlan,
+        progress: Optional[ProgressCallback] = None,
+    ) -> RestoreReport:
+        start = time.monotonic()
+        total = len(plan)
+        semaphore = None
+        if plan.max_in_flight:
+            semaphore = asyncio.Semaphore(plan.max_in_flight)
+        limiter = _RateLimiter(plan.max_rate) if plan.max_rate else None
+        abort = asyncio.Event()
+        results: List[PVRestoreResult] = []
+
+        def resolve(result: PVRestoreResult) -> PVRestoreResult:
+            if plan.abort_on_failure and not result.outcome.ok:
+                abort.set()
+            results.append(result)
+            if progress is not None:
+                try:
+                    progress(len(results), total, result)
+                except Exception as ex:
+                    logger.exception(f"Restore progress callback failed: {ex}")
+            return result
+
+        async def restore_one(setpoint, readback, phase_name) -> PVRestoreResult:
+            if semaphore is not None:
+                await semaphore.acquire()
+            try:
+                if limiter is not None and not abort.is_set():
+                    await limiter.wait()
+                if abort.is_set():
+                    return resolve(PVRestoreResult(
+                        setpoint, readback, Convergence.SKIPPED, phase=phase_name
+                    ))
+                status, = await self.control_layer.put_many(
+                    [setpoint.pv_name], [setpoint.data],
+                    wait=setpoint.put_wait, timeout=setpoint.put_timeout,
+                )
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+            return resolve(
+                await self._check_put(setpoint, readback, status, phase_name)
+            )
+
+        ordered: List[PVRestoreResult] = []
+        for phase in plan.phases:
+            if abort.is_set():
+                phase_results = [
+                    resolve(PVRestoreResult(
+                        setpoint, readback, Convergence.SKIPPED, phase=phase.name
+                    ))
+                    for setpoint, readback in zip(phase.setpoints, phase.readbacks)
+                ]
+            else:
+                logger.debug(f"Restoring phase {phase.name!r} "
+                             f"({len(phase.setpoints)} PVs)")
+                phase_results = await asyncio.gather(*(
+                    restore_one(setpoint, readback, phase.name)
+                    for setpoint, readback in zip(phase.setpoints, phase.readbacks)
+                ))
+            ordered.extend(phase_results)
+
+        report = RestoreReport(
+            results=ordered,
+            elapsed=time.monotonic() - start,
+            aborted=abort.is_set(),
+        )
+        logger.info(str(report))
+        return report
+
+    async def _check_put(
+        self,
+        setpoint: Setpoint,
+        readback: Optional[Readback],
+        status: TaskStatus,
+        phase_name: str = "",
+    ) -> PVRestoreResult:
+        """Record a failed put, or verify the readback of a successful one"""
+        error = status.exception()
+        if error is not None:
+            logger.debug(f"Failed to put {setpoint.pv_name} = {setpoint.data}: {error}")
+            return PVRestoreResult(
+                setpoint, readback, Convergence.PUT_FAILED, error=error,
+                phase=phase_name,
+            )
+
+        if readback is None or not readback.pv_name:
+            result = PVRestoreResult(setpoint, readback, Convergence.NO_READBACK)
+        else:
+            result = await self.verify(setpoint, readback)
+        result.phase = phase_name
+        return result
+
+    async def verify(self, setpoint: Setpoint, readback: Readback) -> PVRestoreResult:
+        """
+        Monitor ``readback`` until it is within tolerance of ``setpoint``'s
+        value, or its timeout elapses.  Must be awaited in the ControlLayer's
+        event loop.
+        """
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        converged = loop.create_future()
+        latest: List[EpicsData] = []
+
+        def on_update(edata: EpicsData) -> None:
+            latest[:] = [edata]
+            if converged.done():
+                return
+            if values_close(
+                edata.data, setpoint.data,
+                rel_tolerance=readback.rel_tolerance,
+                abs_tolerance=readback.abs_tolerance,
+            ):
+                converged.set_result(edata)
+
+        timeout = readback.timeout
+        if timeout is None:
+            timeout = self.default_timeout
+
+        handle = None
+        try:
+            handle = self.control_layer.subscribe(readback.pv_name, on_update)
+            edata = await asyncio.wait_for(converged, timeout)
+        except asyncio.TimeoutError:
+            outcome = Convergence.OUT_OF_TOLERANCE if latest else Convergence.TIMED_OUT
+            value = latest[0].data if latest else None
+            logger.debug(f"{readback.pv_name} did not converge on {setpoint.data} "
+                         f"within {timeout}s (last value: {value})")
+            return PVRestoreResult(
+                setpoint, readback, outcome, readback_value=value,
+                elapsed=time.monotonic() - start,
+            )
+        except Exception as ex:
+            logger.debug(f"Failed to monitor {readback.pv_name}: {ex}")
+            return PVRestoreResult(
+                setpoint, readback, Convergence.TIMED_OUT, error=ex,
+                elapsed=time.monotonic() - start,
+            )
+        finally:
+            if handle is not None:
+                self.control_layer.unsubscribe(handle)
+
+        return PVRestoreResult(
+            setpoint, readback, Convergence.CONVERGED, readback_value=edata.data,
+            elapsed=time.monotonic() - start,
+        )
@@ -2,12 +2,15 @@
 Serialization helpers for apischema.
 """
 # Largely based on issue discussions regarding tagged unions.
+import base64
 from collections import defaultdict
 from collections.abc import Callable, Iterator
+from dataclasses import dataclass
 from types import new_class
 from typing import (Any, Dict, Generic, List, Tuple, TypeVar, get_origin,
                     get_type_hints)
 
+import numpy as np
 from apischema import deserializer, serializer, type_name
 from apischema.conversions import Conversion
 from apischema.metadata import conversion
@@ -135,3 +138,34 @@ def as_tagged_union(cls: Cls) -> Cls:
     deserializer(lazy=deserialization, target=cls)
     serializer(lazy=serialization, source=cls)
     return cls
+
+
+@dataclass
+class EncodedArray:
+    """
+    A NumPy array in serialized form: its raw buffer as a base64 block, rather
+    than a (much larger, much slower) list of numbers.
+    """
+    dtype: str
+    shape: List[int]
+    data: str
+
+
+@serializer
+def encode_array(array: np.ndarray) -> EncodedArray:
+    if array.dtype.hasobject:
+        # object arrays have no raw buffer, e.g. arrays of strings
+        array = array.astype(str)
+    array = np.ascontiguousarray(array)
+    return EncodedArray(
+        dtype=array.dtype.str,
+        shape=list(array.shape),
+        data=base64.b64encode(memoryview(array).cast("B")).decode("ascii"),
+    )
+
+
+@deserializer
+def decode_array(encoded: EncodedArray) -> np.ndarray:
+    # frombuffer on a bytearray gives a writable array without another copy
+    buffer = bytearray(base64.b64decode(encoded.data))
+    return np.frombuffer(buffer, dtype=np.dtype(encoded.dtype)).reshape(encoded.shape)
@@ -10,6 +10,7 @@ import pytest
 
 from superscore.backends.core import _Backend
 from superscore.backends.filestore import FilestoreBackend
+from superscore.backends.sqlite import SqliteBackend
 from superscore.backends.test import TestBackend
 from superscore.client import Client
 from superscore.control_layers._base_shim import _BaseShim
@@ -76,6 +77,14 @@ def dummy_cl() -> ControlLayer:
     return cl
 
 
+@pytest.fixture(scope='function')
+def dummy_persistent_cl() -> ControlLayer:
+    cl = ControlLayer(persistent_loop=True)
+    cl.shims = {protocol: DummyShim() for protocol in ['ca', 'pva']}
+    yield cl
+    cl.close()
+
+
 @pytest.fixture(scope='function')
 def mock_backend() -> _Backend:
     mock_bk = MagicMock(spec=_Backend)
@@ -99,6 +108,51 @@ def linac_ioc(linac_backend):
         yield ioc
 
 
+@pytest.fixture
+def pva_server():
+    """
+    Serve a few PVA PVs from a local, isolated p4p server.  Yields a P4PShim
+    configured to reach the server, and the served SharedPVs by name.
+    """
+    pytest.importorskip("p4p")
+    from p4p.nt import NTEnum, NTScalar
+    from p4p.server import Server
+    from p4p.server.thread import SharedPV
+
+    from superscore.control_layers._p4p import P4PShim
+
+    pvs = {
+        "PVATEST:FLOAT": SharedPV(
+            nt=NTScalar("d", display=True, control=True, form=True),
+            initial={
+                "value": 1.5,
+                "alarm.severity": 1,
+                "alarm.message": "HIGH",
+                "display.units": "mm",
+                "display.precision": 3,
+                "control.limitHigh": 10.0,
+                "control.limitLow": -10.0,
+            },
+        ),
+        "PVATEST:ENUM": SharedPV(nt=NTEnum(), initial={"index": 1, "choices": ["OFF", "ON"]}),
+        "PVATEST:WAVEFORM": SharedPV(nt=NTScalar("ai"), initial=[1, 2, 3]),
+        "PVATEST:STR": SharedPV(nt=NTScalar("s"), initial="text"),
+    }
+    for i in range(200):
+        pvs[f"PVATEST:MANY{i}"] = SharedPV(nt=NTScalar("d"), initial=float(i))
+
+    for pv in pvs.values():
+        @pv.put
+        def put(pv, op):
+            pv.post(op.value())
+            op.done()
+
+    with Server(providers=[pvs], isolate=True) as server:
+        shim = P4PShim(conf=server.conf())
+        yield shim, pvs
+        shim.close()
+
+
 def nest_depth(entry: Union[Nestable, EntryItem]) -> int:
     """
     Return the depth of nesting in ``entry``.
@@ -235,6 +289,8 @@ def test_backend(
         if backend_cls is FilestoreBackend:
             tmp_fp = tmp_path / 'tmp_filestore.json'
             backend = backend_cls(path=tmp_fp)
+        elif backend_cls is SqliteBackend:
+            backend = backend_cls(path=tmp_path / 'tmp_sqlite.db')
         else:
             backend = backend_cls()
 
@@ -1,6 +1,7 @@
 from multiprocessing import Process
 from typing import Iterable, Mapping
 
+from aioca import purge_channel_caches
 from caproto.server import PVGroup, pvproperty
 from caproto.server import run as run_ioc
 from epicscorelibs.ca import dbr
@@ -25,7 +26,13 @@ class TempIOC(PVGroup):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        pass
+        process = getattr(self, "running_process", None)
+        if process is not None:
+            # close channels first, as aioca's connection callbacks fail for
+            # channels opened in event loops that have since closed
+            purge_channel_caches()
+            process.terminate()
+            process.join()
 
 
 class IOCFactory:
@@ -1,14 +1,25 @@
+import gc
+import json
+import os
+import threading
+import time
+import weakref
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
 from enum import Flag, auto
 from uuid import UUID
 
 import pytest
 
+from superscore.backends import sqlite
 from superscore.backends.core import SearchTerm, _Backend
 from superscore.backends.filestore import FilestoreBackend
+from superscore.backends.index import EntryIndex
+from superscore.backends.sqlite import SqliteBackend
 from superscore.backends.test import TestBackend
 from superscore.errors import (BackendError, EntryExistsError,
                                EntryNotFoundError)
-from superscore.model import Collection, Parameter, Snapshot
+from superscore.model import Collection, Parameter, Setpoint, Snapshot
 from superscore.tests.conftest import setup_test_stack
 
 
@@ -52,7 +63,7 @@ class TestTestBackend:
             linac_backend.delete_entry(unsynced)
 
 
-@setup_test_stack(backend_type=[FilestoreBackend, TestBackend])
+@setup_test_stack(backend_type=[FilestoreBackend, TestBackend, SqliteBackend])
 def test_save_entry(test_backend: _Backend):
     new_entry = Parameter()
 
@@ -66,7 +77,7 @@ def test_save_entry(test_backend: _Backend):
 
 
 @setup_test_stack(
-    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend]
+    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend, SqliteBackend]
 )
 def test_delete_entry(test_backend: _Backend):
     entry = test_backend.root.entries[0]
@@ -77,7 +88,7 @@ def test_delete_entry(test_backend: _Backend):
 
 
 @setup_test_stack(
-    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend]
+    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend, SqliteBackend]
 )
 def test_search_entry(test_backend: _Backend):
     # Given an entry we know is in the backend
@@ -124,7 +135,7 @@ def test_search_entry(test_backend: _Backend):
 
 
 @setup_test_stack(
-    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend]
+    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend, SqliteBackend]
 )
 def test_fuzzy_search(test_backend: _Backend):
     results = list(test_backend.search(
@@ -144,7 +155,7 @@ def test_fuzzy_search(test_backend: _Backend):
 
 
 @setup_test_stack(
-    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend]
+    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend, SqliteBackend]
 )
 def test_tag_search(test_backend: _Backend):
     results = list(test_backend.search(
@@ -173,7 +184,7 @@ def test_tag_search(test_backend: _Backend):
 
 
 @setup_test_stack(
-    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend]
+    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend, SqliteBackend]
 )
 def test_search_error(test_backend: _Backend):
     with pytest.raises(TypeError):
@@ -189,7 +200,7 @@ def test_search_error(test_backend: _Backend):
 
 
 @setup_test_stack(
-    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend]
+    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend, SqliteBackend]
 )
 def test_update_entry(test_backend: _Backend):
     # grab an entry from the database and modify it.
@@ -213,6 +224,99 @@ def test_update_entry(test_backend: _Backend):
         test_backend.update_entry(p1)
 
 
+@setup_test_stack(
+    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend, SqliteBackend]
+)
+def test_transaction(test_backend: _Backend):
+    n_entries = len(list(test_backend.search()))
+    existing = test_backend.root.entries[0]
+    new_entries = [Parameter(pv_name=f"NEW:PV{i}") for i in range(3)]
+
+    # a failed batch is rolled back as a whole
+    with pytest.raises(EntryExistsError):
+        test_backend.save_entries(new_entries + [existing])
+    assert len(list(test_backend.search())) == n_entries
+    with pytest.raises(EntryNotFoundError):
+        test_backend.get_entry(new_entries[0].uuid)
+
+    with pytest.raises(RuntimeError):
+        with test_backend.transaction():
+            test_backend.delete_entry(existing)
+            with test_backend.transaction():
+                test_backend.save_entry(new_entries[0])
+            # entries saved earlier in the transaction can be found
+            assert test_backend.get_entry(new_entries[0].uuid) is not None
+            raise RuntimeError("abort")
+    assert test_backend.get_entry(existing.uuid) is not None
+    assert len(list(test_backend.search())) == n_entries
+
+    test_backend.save_entries(new_entries)
+    test_backend.delete_entries([existing])
+    for entry in new_entries:
+        assert test_backend.get_entry(entry.uuid) == entry
+    with pytest.raises(EntryNotFoundError):
+        test_backend.get_entry(existing.uuid)
+
+
+@setup_test_stack(
+    sources=["db/filestore.json"], backend_type=[FilestoreBackend, SqliteBackend]
+)
+def test_transaction_threads(test_backend: _Backend):
+    existing = test_backend.root.entries[0]
+    entry_a, entry_b = Parameter(pv_name="PV:A"), Parameter(pv_name="PV:B")
+    a_open = threading.Event()
+    errors = []
+
+    def transaction_a():
+        with test_backend.transaction():
+            test_backend.save_entry(entry_a)
+            a_open.set()
+            # give the other thread time to try joining this transaction
+            time.sleep(0.2)
+
+    def transaction_b():
+        a_open.wait()
+        try:
+            with test_backend.transaction():
+                test_backend.save_entry(entry_b)
+                test_backend.save_entry(existing)
+        except EntryExistsError as ex:
+            errors.append(ex)
+        errors.append(test_backend._transaction_depth)
+
+    threads = [
+        threading.Thread(target=transaction_a),
+        threading.Thread(target=transaction_b),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # the other thread's transaction is separate, and rolled back on its own
+    assert isinstance(errors[0], EntryExistsError)
+    assert errors[1] == 0
+    assert test_backend._transaction_depth == 0
+    assert test_backend.get_entry(entry_a.uuid) == entry_a
+    with pytest.raises(EntryNotFoundError):
+        test_backend.get_entry(entry_b.uuid)
+
+
+def test_filestore_transaction_single_write(tmp_path, monkeypatch):
+    backend = FilestoreBackend(str(tmp_path / "db.json"))
+    backend.save_entry(Parameter())
+    stores = []
+    monkeypatch.setattr(backend, "store", lambda: stores.append(1))
+
+    entries = [Parameter(pv_name=f"PV{i}") for i in range(10)]
+    backend.save_entries(entries)
+    assert stores == [1]
+
+    with pytest.raises(BackendError):
+        backend.update_entries([entries[0], Parameter()])
+    assert stores == [1]
+
+
 # TODO: Assess if _gather_reachable should be upstreamed to _Backend
 @setup_test_stack(
     sources=["linac_data"], backend_type=FilestoreBackend,
@@ -228,3 +332,328 @@ def test_gather_reachable(test_backend: _Backend):
     reachable = test_backend._gather_reachable(entry)
     assert len(reachable) == 3
     assert UUID("927ef6cb-e45f-4175-aa5f-6c6eec1f3ae4") in reachable
+
+
+def test_filestore_dirty_tracking(tmp_path):
+    path = tmp_path / "db.json"
+    backend = FilestoreBackend(str(path))
+    param = Parameter(pv_name="SOME:PV")
+    collection = Collection(children=[param])
+    backend.save_entry(collection)
+    assert not backend.dirty
+    mtime = path.stat().st_mtime_ns
+
+    # reads are served from memory without rewriting the file
+    found = backend.get_entry(collection.uuid)
+    assert found.children == [param.uuid]
+    assert list(backend.search(SearchTerm("pv_name", "eq", "SOME:PV"))) == [param]
+    assert backend.root.entries[0].children == [param]
+    assert path.stat().st_mtime_ns == mtime
+
+    # returned entries are copies, so filling them leaves the cache alone
+    found.children = [param]
+    assert backend.get_entry(collection.uuid).children == [param.uuid]
+
+    found.description = "updated"
+    backend.update_entry(found)
+    assert found.children == [param]
+    reloaded = FilestoreBackend(str(path))
+    assert reloaded.get_entry(collection.uuid).description == "updated"
+    assert reloaded.get_entry(param.uuid) == param
+
+
+def test_filestore_save_copies(tmp_path):
+    backend = FilestoreBackend(str(tmp_path / "db.json"))
+    param = Parameter(pv_name="OLD:PV")
+    collection = Collection(children=[param])
+    backend.save_entry(collection)
+
+    # editing saved entries without update_entry changes nothing
+    param.pv_name = "NEW:PV"
+    collection.description = "edited"
+    assert backend.get_entry(param.uuid).pv_name == "OLD:PV"
+    assert backend.get_entry(collection.uuid).description == ""
+    results = list(backend.search(SearchTerm("pv_name", "eq", "OLD:PV")))
+    assert [entry.pv_name for entry in results] == ["OLD:PV"]
+    assert not list(backend.search(SearchTerm("pv_name", "eq", "NEW:PV")))
+
+
+def test_filestore_write_behind(tmp_path):
+    path = tmp_path / "db.json"
+    backend = FilestoreBackend(str(path), write_behind="true")
+    entries = [Parameter(pv_name=f"PV{i}") for i in range(3)]
+    for entry in entries:
+        backend.save_entry(entry)
+    backend.delete_entry(entries[0])
+    assert backend.dirty
+    assert FilestoreBackend(str(path)).root.entries == []
+
+    backend.flush()
+    assert not backend.dirty
+    assert FilestoreBackend(str(path)).root.entries == entries[1:]
+    # nothing left behind by the atomic writes
+    assert os.listdir(tmp_path) == ["db.json"]
+
+    timed = FilestoreBackend(str(path), write_behind=True, flush_interval=0.05)
+    timed.save_entry(entries[0])
+    assert timed.dirty
+    deadline = time.monotonic() + 2
+    while timed.dirty and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not timed.dirty
+    assert len(FilestoreBackend(str(path)).root.entries) == 3
+    timed.close()
+
+
+def test_filestore_write_behind_collected(tmp_path):
+    path = tmp_path / "db.json"
+    backend = FilestoreBackend(str(path), write_behind=True)
+    backend.save_entry(Parameter(pv_name="SOME:PV"))
+    ref = weakref.ref(backend)
+    # the exit hook must not keep the backend alive, and collection flushes it
+    del backend
+    gc.collect()
+    assert ref() is None
+    entries = FilestoreBackend(str(path)).root.entries
+    assert [entry.pv_name for entry in entries] == ["SOME:PV"]
+
+
+def test_filestore_search_ancestor_locked(tmp_path):
+    backend = FilestoreBackend(str(tmp_path / "db.json"))
+    child = Parameter(pv_name="SOME:PV")
+    parent = Collection(children=[child])
+    backend.save_entry(parent)
+
+    # the tree is walked while writers are locked out
+    locked = []
+    gather_reachable = backend._gather_reachable
+
+    def check_locked(ancestor):
+        def try_lock():
+            acquired = backend._lock.acquire(blocking=False)
+            if acquired:
+                backend._lock.release()
+            locked.append(not acquired)
+
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+        return gather_reachable(ancestor)
+
+    backend._gather_reachable = check_locked
+    results = backend.search(SearchTerm("ancestor", "eq", parent.uuid))
+    assert {entry.uuid for entry in results} == {parent.uuid, child.uuid}
+    assert locked == [True]
+
+
+def test_filestore_journal(tmp_path, caplog):
+    path = tmp_path / "db.json"
+    journal_path = tmp_path / "db.json.journal"
+    backend = FilestoreBackend(str(path), journal=True)
+    param = Parameter(pv_name="SOME:PV")
+    collection = Collection(children=[param])
+    backend.save_entry(collection)
+    base = path.read_text()
+
+    extra = Parameter(pv_name="EXTRA:PV")
+    with backend.transaction():
+        backend.save_entry(extra)
+        backend.update_entry(replace(param, description="updated"))
+    backend.delete_entry(extra)
+    # saves only append to the journal
+    assert path.read_text() == base
+    assert [json.loads(line)["op"] for line in journal_path.read_text().splitlines()] \
+        == ["save", "save", "update", "delete"]
+
+    # a record torn by a crash is skipped
+    with open(journal_path, "a") as fd:
+        fd.write('{"op": "del')
+    reloaded = FilestoreBackend(str(path), journal=True)
+    assert reloaded.get_entry(param.uuid).description == "updated"
+    assert reloaded.get_entry(collection.uuid).children == [param.uuid]
+    with pytest.raises(EntryNotFoundError):
+        reloaded.get_entry(extra.uuid)
+    assert "torn journal record" in caplog.text
+    # later records start on a new line
+    reloaded.save_entry(extra)
+    assert FilestoreBackend(str(path), journal=True).get_entry(extra.uuid) == extra
+
+    # a compaction interrupted before dropping the journal replays harmlessly
+    journal = journal_path.read_text()
+    reloaded.compact()
+    assert not journal_path.exists()
+    journal_path.write_text(journal)
+    for backend in (reloaded, FilestoreBackend(str(path), journal=True)):
+        assert backend.get_entry(param.uuid).description == "updated"
+        assert backend.get_entry(extra.uuid) == extra
+        assert len(list(backend.search())) == 3
+
+
+def test_filestore_journal_compaction(tmp_path):
+    path = tmp_path / "db.json"
+    backend = FilestoreBackend(str(path), journal=True, compact_threshold="2000")
+    entries = [Parameter(pv_name=f"PV{i}") for i in range(20)]
+    for entry in entries:
+        backend.save_entry(entry)
+    backend.close()
+
+    # compacted in the background once the journal passed 2000 bytes
+    assert path.stat().st_size > 2000
+    journal_path = tmp_path / "db.json.journal"
+    assert not journal_path.exists() or journal_path.stat().st_size < 2000
+    assert FilestoreBackend(str(path), journal=True).root.entries == entries
+    assert FilestoreBackend(str(path)).get_entry(entries[0].uuid) == entries[0]
+
+
+def test_sqlite_backend(tmp_path):
+    path = tmp_path / "db.sqlite"
+    backend = SqliteBackend(str(path))
+    setpoint = Setpoint(pv_name="SOME:PV", data=2)
+    inner = Snapshot(title="inner", children=[setpoint])
+    outer = Snapshot(title="outer", children=[inner, Setpoint(pv_name="OTHER:PV")])
+    backend.save_entry(outer)
+    # the caller's entries are not flattened
+    assert outer.children[0] is inner
+    backend.close()
+
+    backend = SqliteBackend(str(path))
+    assert [entry.title for entry in backend.root.entries] == ["outer"]
+    assert backend.root.entries[0].children[0] == inner
+    assert backend.get_entry(inner.uuid).children == [setpoint.uuid]
+    assert list(backend.search(SearchTerm("pv_name", "eq", "SOME:PV"))) == [setpoint]
+    results = backend.search(
+        SearchTerm("ancestor", "eq", inner.uuid),
+        SearchTerm("entry_type", "eq", Setpoint),
+        SearchTerm("data", "lt", 3),
+    )
+    assert list(results) == [setpoint]
+    assert len(list(backend.search(SearchTerm("ancestor", "eq", outer.uuid)))) == 4
+
+    # indexed columns are searched through their indexes
+    backend.save_entries([Setpoint(pv_name=f"PV{i}") for i in range(500)])
+    sql, params = backend._term_to_sql("pv_name", "in", ("SOME:PV", "OTHER:PV"))
+    plan = backend._conn.execute(
+        f"EXPLAIN QUERY PLAN SELECT uuid FROM entries WHERE {sql}", params
+    ).fetchall()
+    assert "entries_pv_name" in str(plan)
+    assert backend._term_to_sql("data", "eq", 2) is None
+
+
+class SqliteTag(Flag):
+    BEAM = auto()
+
+
+def test_sqlite_backend_mutations(tmp_path, monkeypatch):
+    backend = SqliteBackend(str(tmp_path / "db.sqlite"))
+    setpoints = [Setpoint(pv_name=f"PV{i}") for i in range(3)]
+    snapshot = Snapshot(title="snap", children=[setpoints[1]], tags={SqliteTag.BEAM})
+    backend.save_entries([*setpoints, snapshot])
+
+    # updated entries keep their place
+    backend.update_entry(replace(setpoints[0], pv_name="RENAMED"))
+    assert [entry.uuid for entry in backend.root.entries] == [
+        entry.uuid for entry in (*setpoints, snapshot)
+    ]
+    assert backend.root.entries[0].pv_name == "RENAMED"
+
+    # deleted children leave no links behind
+    backend.delete_entry(setpoints[1])
+    links = backend._conn.execute(
+        "SELECT * FROM links WHERE child = ?", (str(setpoints[1].uuid),)
+    ).fetchall()
+    assert links == []
+
+    # tags are only read back for registered types, nothing is imported
+    monkeypatch.setattr(sqlite, "_tag_types", {})
+    assert backend.get_entry(snapshot.uuid).tags == set()
+    backend._conn.execute(
+        "INSERT INTO tags VALUES (?, ?)", (str(snapshot.uuid), "os:system:1")
+    )
+    assert backend.get_entry(snapshot.uuid).tags == set()
+    sqlite.register_tag_type(SqliteTag)
+    assert backend.get_entry(snapshot.uuid).tags == {SqliteTag.BEAM}
+    backend.close()
+
+
+def test_entry_index():
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    entries = [
+        Setpoint(pv_name=f"PV{i % 3}", creation_time=start + timedelta(hours=i))
+        for i in range(6)
+    ]
+    snapshot = Snapshot(title="snap", tags={1, 2}, creation_time=start)
+    index = EntryIndex(entries + [snapshot])
+
+    assert index.lookup("pv_name", "eq", "PV1") == {entries[1].uuid, entries[4].uuid}
+    assert index.lookup("pv_name", "in", ("PV0", "PV9")) == {
+        entries[0].uuid, entries[3].uuid
+    }
+    assert index.lookup("title", "eq", "snap") == {snapshot.uuid}
+    assert index.lookup("uuid", "eq", snapshot.uuid) == {snapshot.uuid}
+    assert index.lookup("entry_type", "eq", Snapshot) == {snapshot.uuid}
+    assert index.lookup("tags", "gt", {1}) == {snapshot.uuid}
+    assert index.lookup("tags", "gt", {3}) == set()
+    # range terms are inclusive, as in _Backend.compare
+    later = start + timedelta(hours=4)
+    assert index.lookup("creation_time", "gt", later) == {
+        entries[4].uuid, entries[5].uuid
+    }
+    assert len(index.lookup("creation_time", "lt", later)) == 6
+    # left to a scan
+    assert index.lookup("pv_name", "like", "PV") is None
+    assert index.lookup("data", "eq", 2) is None
+
+    # re-indexing and removal update every index
+    entries[0].pv_name = "PV1"
+    entries[0].creation_time = start + timedelta(days=1)
+    index.add(entries[0])
+    index.remove(entries[4].uuid)
+    assert index.lookup("pv_name", "eq", "PV1") == {entries[0].uuid, entries[1].uuid}
+    assert index.lookup("creation_time", "gt", later) == {
+        entries[0].uuid, entries[5].uuid
+    }
+    candidates, remaining = index.plan([
+        ("pv_name", "eq", "PV1"), ("data", "eq", 2)
+    ])
+    assert index.ordered(candidates) == [entries[0].uuid, entries[1].uuid]
+    assert remaining == [("data", "eq", 2)]
+
+    # naive datetimes can't be compared with aware ones, left to a scan
+    index.add(Setpoint(creation_time=datetime(2024, 1, 1)))
+    assert index.lookup("creation_time", "gt", later) is None
+
+
+@setup_test_stack(
+    sources=["db/filestore.json"], backend_type=[FilestoreBackend, TestBackend]
+)
+def test_search_index_consistency(test_backend: _Backend):
+    def scan(*search_terms):
+        # search every entry, without the indexes
+        return [
+            entry.uuid for entry in test_backend.search()
+            if all(
+                getattr(entry, attr, None) is not None
+                and _Backend.compare(op, getattr(entry, attr), target)
+                for attr, op, target in search_terms
+            )
+        ]
+
+    new = Setpoint(pv_name="NEW:PV", data=5)
+    test_backend.save_entry(new)
+    new.pv_name = "MOVED:PV"
+    test_backend.update_entry(new)
+    test_backend.delete_entry(test_backend.root.entries[0])
+
+    for search_terms in (
+        [SearchTerm("pv_name", "eq", "NEW:PV")],
+        [SearchTerm("pv_name", "eq", "MOVED:PV")],
+        [SearchTerm("pv_name", "in", ("MOVED:PV", "MY:PREFIX:mtr1.ACCL"))],
+        [SearchTerm("creation_time", "lt", new.creation_time)],
+        [SearchTerm("creation_time", "gt", new.creation_time)],
+        [SearchTerm("pv_name", "eq", "MOVED:PV"), SearchTerm("data", "eq", 5)],
+    ):
+        results = [entry.uuid for entry in test_backend.search(*search_terms)]
+        assert results == scan(*search_terms)
+    assert [
+        entry.uuid for entry in test_backend.search(SearchTerm("pv_name", "eq", "MOVED:PV"))
+    ] == [new.uuid]
@@ -1,9 +1,26 @@
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import EntryPoint
+from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
+import numpy as np
 import pytest
 
-from superscore.control_layers.status import TaskStatus
-from superscore.errors import CommunicationError
+from superscore.control_layers import (ControlLayer, EpicsData, EpicsDataBatch,
+                                       _sharded, health, registry)
+from superscore.control_layers.health import PVHealthTracker, ReadOutcome
+from superscore.control_layers.stats import LatencyHistogram
+from superscore.control_layers.status import StatusGroup, TaskStatus
+from superscore.errors import (CommunicationError, CommunicationTimeoutError,
+                               DisconnectedError)
+from superscore.model import Severity, Status
+from superscore.tests.conftest import DummyShim
 
 
 def test_get(dummy_cl):
@@ -18,6 +35,28 @@ def test_get(dummy_cl):
     assert dummy_cl.get(['a', 'b', 'c']) == ["ca_value" for i in range(3)]
 
 
+def test_routing(dummy_cl):
+    mock_ca_get = AsyncMock(return_value='ca_value')
+    dummy_cl.shims['ca'].get = mock_ca_get
+    mock_pva_put = AsyncMock()
+    dummy_cl.shims['pva'].put = mock_pva_put
+
+    # shims are given PV names without the protocol prefix
+    dummy_cl.get(["ca://SOME:PV", "OTHER:PV"])
+    assert [c.args for c in mock_ca_get.call_args_list] == [("SOME:PV",), ("OTHER:PV",)]
+    dummy_cl.put("pva://SOME:PV", 1)
+    mock_pva_put.assert_awaited_once_with("SOME:PV", 1)
+
+    # routes are cached until the shims change
+    assert dummy_cl._routes["ca://SOME:PV"] == (dummy_cl.shims['ca'], "SOME:PV")
+    assert dummy_cl.shim_from_pv("pva://SOME:PV") is dummy_cl.shims['pva']
+    dummy_cl.shims = {'pva': DummyShim()}
+    assert not dummy_cl._routes
+    assert dummy_cl.shim_from_pv("SOME:PV") is dummy_cl.shims['pva']
+    with pytest.raises(ValueError):
+        dummy_cl.shim_from_pv("ca://SOME:PV")
+
+
 def test_get_communication_error(dummy_cl):
     mock_get = AsyncMock(side_effect=CommunicationError("Example error"))
     dummy_cl.shims['ca'].get = mock_get
@@ -61,3 +100,584 @@ def test_put_callback(dummy_cl):
     assert result.exception() is None
     assert result.success is True
     assert len(cbs) == 1
+
+
+def test_persistent_loop_reused(dummy_persistent_cl):
+    loops = []
+
+    async def record_loop(*args, **kwargs):
+        loops.append(asyncio.get_running_loop())
+        return 'ca_value'
+
+    dummy_persistent_cl.shims['ca'].get = record_loop
+    assert dummy_persistent_cl.get("SOME_PREFIX") == "ca_value"
+    assert dummy_persistent_cl.get(['a', 'b']) == ["ca_value", "ca_value"]
+
+    status = dummy_persistent_cl.put("SOME_PREFIX", 1)
+    assert status.success
+
+    # every request ran in the same, still-running loop
+    assert len(set(loops)) == 1
+    assert loops[0] is dummy_persistent_cl.loop_thread.loop
+    assert loops[0].is_running()
+
+
+def test_persistent_loop_threads(dummy_persistent_cl):
+    dummy_persistent_cl.shims['ca'].get = AsyncMock(return_value='ca_value')
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(dummy_persistent_cl.get, ['a', 'b', 'c', 'd']))
+
+    assert results == ['ca_value' for _ in range(4)]
+
+
+def test_persistent_loop_close(dummy_persistent_cl):
+    loop_thread = dummy_persistent_cl.loop_thread
+    assert dummy_persistent_cl.get("SOME_PREFIX") is None
+    assert loop_thread.is_running
+
+    dummy_persistent_cl.close()
+    assert not loop_thread.is_running
+
+
+def test_get_timeout(dummy_cl):
+    async def slow_get(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    dummy_cl.shims['ca'].get = slow_get
+    dummy_cl.timeout = 0.01
+    result = dummy_cl.get("SLOW:PV")
+    assert isinstance(result, CommunicationTimeoutError)
+    assert ReadOutcome.from_result(result) == ReadOutcome.TIMEOUT
+
+
+def test_get_max_in_flight(dummy_cl):
+    in_flight = []
+    max_seen = []
+
+    async def counting_get(*args, **kwargs):
+        in_flight.append(1)
+        max_seen.append(len(in_flight))
+        await asyncio.sleep(0.001)
+        in_flight.pop()
+        return 'ca_value'
+
+    dummy_cl.shims['ca'].get = counting_get
+    dummy_cl.max_in_flight = 3
+    results = dummy_cl.get([f"PV{i}" for i in range(20)])
+    assert results == ['ca_value' for _ in range(20)]
+    assert max(max_seen) == 3
+
+
+def test_suspect_fast_fail(dummy_cl):
+    mock_get = AsyncMock(side_effect=DisconnectedError("dead"))
+    dummy_cl.shims['ca'].get = mock_get
+    dummy_cl.health.failure_threshold = 2
+
+    results = dummy_cl.get(["DEAD:PV", "DEAD:PV"])
+    assert all(ReadOutcome.from_result(r) == ReadOutcome.DISCONNECTED for r in results)
+    assert dummy_cl.health.suspects == ["DEAD:PV"]
+    assert mock_get.call_count == 2
+
+    # suspect PVs fail without making a request
+    assert isinstance(dummy_cl.get("DEAD:PV"), DisconnectedError)
+    assert mock_get.call_count == 2
+
+    # once the retry interval has passed, the PV is retried and can recover
+    dummy_cl.health.retry_interval = 0
+    mock_get.side_effect = None
+    mock_get.return_value = 'ca_value'
+    assert dummy_cl.get("DEAD:PV") == 'ca_value'
+    assert dummy_cl.health.suspects == []
+
+
+def test_health_tracker_single_probe(monkeypatch):
+    tracker = PVHealthTracker(failure_threshold=1, retry_interval=0)
+    tracker.record("DEAD:PV", ReadOutcome.TIMEOUT)
+
+    # widen the window between checking and marking the probe
+    def slow_monotonic():
+        time.sleep(0.01)
+        return time.monotonic()
+
+    monkeypatch.setattr(health, "time", SimpleNamespace(monotonic=slow_monotonic))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        retries = list(executor.map(tracker.should_retry, ["DEAD:PV"] * 8))
+    assert retries.count(True) == 1
+
+    tracker.finish_retry("DEAD:PV")
+    assert tracker.should_retry("DEAD:PV")
+
+
+def test_suspect_background_probe(dummy_persistent_cl):
+    mock_get = AsyncMock(side_effect=DisconnectedError("dead"))
+    dummy_persistent_cl.shims['ca'].get = mock_get
+    dummy_persistent_cl.health.failure_threshold = 1
+    dummy_persistent_cl.health.retry_interval = 0
+
+    assert isinstance(dummy_persistent_cl.get("DEAD:PV"), DisconnectedError)
+    mock_get.side_effect = None
+    mock_get.return_value = 'ca_value'
+
+    # the caller fails fast, while the PV is probed in the background
+    assert isinstance(dummy_persistent_cl.get("DEAD:PV"), DisconnectedError)
+    deadline = time.monotonic() + 1
+    while dummy_persistent_cl.health.suspects and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert dummy_persistent_cl.get("DEAD:PV") == 'ca_value'
+
+
+async def test_get_many(dummy_cl):
+    mock_get = AsyncMock(side_effect=lambda address: f'{address}_value')
+    dummy_cl.shims['ca'].get = mock_get
+    assert await dummy_cl.get_many(['a', 'b']) == ['a_value', 'b_value']
+
+    statuses = await dummy_cl.put_many(['a', 'b'], [1, 2])
+    assert all(status.done and status.success for status in statuses)
+    with pytest.raises(ValueError):
+        await dummy_cl.put_many(['a', 'b'], [1])
+
+
+def test_put_group(dummy_cl):
+    async def put(address, value):
+        if address == 'bad':
+            raise CommunicationError("bad PV")
+
+    dummy_cl.shims['ca'].put = put
+    progress = []
+    group = dummy_cl.put(
+        ['a', 'bad', 'c'], [1, 2, 3], group=True, progress=progress.append
+    )
+    assert isinstance(group, StatusGroup)
+    assert group.done
+    assert (group.n_succeeded, group.n_failed) == (2, 1)
+    assert isinstance(group.exception(1), CommunicationError)
+    assert progress[-1] is group
+    with pytest.raises(ValueError):
+        dummy_cl.put(['a'], [1], cb=[print], group=True)
+
+
+async def test_get_as_completed(dummy_cl):
+    async def get(address):
+        if address == 'bad':
+            raise CommunicationError("bad PV")
+        await asyncio.sleep(0.1 if address == 'slow' else 0)
+        return f'{address}_value'
+
+    dummy_cl.shims['ca'].get = get
+    results = [
+        item async for item in dummy_cl.get_as_completed(['slow', 'fast', 'bad'])
+    ]
+    # results are yielded in order of completion
+    assert [address for address, _ in results[:2]] in (
+        ['fast', 'bad'], ['bad', 'fast']
+    )
+    assert results[2] == ('slow', 'slow_value')
+    assert isinstance(dict(results)['bad'], CommunicationError)
+
+
+def test_async_persistent_loop(dummy_persistent_cl):
+    """Awaited requests from another loop run in the persistent loop"""
+    loops = []
+
+    async def get(address):
+        loops.append(asyncio.get_running_loop())
+        return f'{address}_value'
+
+    dummy_persistent_cl.shims['ca'].get = get
+
+    async def service():
+        values = await dummy_persistent_cl.get_many(['a', 'b'])
+        streamed = [
+            item async for item in dummy_persistent_cl.get_as_completed(['c'])
+        ]
+        return values, streamed, asyncio.get_running_loop()
+
+    values, streamed, service_loop = asyncio.run(service())
+    assert values == ['a_value', 'b_value']
+    assert streamed == [('c', 'c_value')]
+    assert set(loops) == {dummy_persistent_cl.loop_thread.loop}
+    assert service_loop not in loops
+
+
+def test_get_batch(dummy_cl):
+    values = {
+        'float': EpicsData(data=2.0, status=Status.NO_ALARM,
+                           severity=Severity.NO_ALARM, units='mm', precision=3),
+        'int': EpicsData(data=2, status=Status.NO_ALARM,
+                         severity=Severity.NO_ALARM, units='mm', precision=3),
+        'enum': EpicsData(data=1, enums=['OUT', 'IN']),
+        'str': EpicsData(data='text'),
+    }
+
+    async def get(address):
+        if address == 'bad':
+            raise CommunicationTimeoutError("slow PV")
+        return values[address]
+
+    dummy_cl.shims['ca'].get = get
+    addresses = ['float', 'int', 'enum', 'str', 'bad']
+    batch = dummy_cl.get(addresses, batch=True)
+    assert isinstance(batch, EpicsDataBatch)
+    assert len(batch) == 5
+    assert batch.is_numeric.tolist() == [True, True, True, False, False]
+    assert batch.ok.tolist() == [True, True, True, True, False]
+    # PVs with the same metadata share it
+    assert batch.metadata_index[0] == batch.metadata_index[1]
+    assert len(batch.metadata) == 3
+
+    # rows are rebuilt as EpicsData on request, preserving types
+    for address, edata in zip(addresses, batch):
+        if address == 'bad':
+            assert isinstance(edata, CommunicationTimeoutError)
+            continue
+        assert edata.data == values[address].data
+        assert type(edata.data) is type(values[address].data)
+        assert edata.status == values[address].status
+        assert edata.enums == values[address].enums
+
+    assert batch.stored('int') == (2, Status.NO_ALARM, Severity.NO_ALARM)
+    assert batch.stored('bad') == (None, Status.TIMEOUT, Severity.INVALID)
+    assert batch.stored('missing') == (None, Status.UDF, Severity.INVALID)
+
+
+def test_batch_large_ints():
+    values = [2**53 + 1, -(2**63), np.uint64(2**64 - 1), 2**53, 7]
+    batch = EpicsDataBatch([f"PV{i}" for i in range(len(values))])
+    for i, value in enumerate(values):
+        batch.set_row(i, value, 0, 0, None, (None, None, None, None, None))
+
+    # 64-bit integers are read back exactly, not rounded through float64
+    assert [batch.value(i) for i in range(len(values))] == [int(v) for v in values]
+    assert all(type(batch.value(i)) is int for i in range(len(values)))
+    assert batch.is_numeric.all()
+    assert batch[0].data == 2**53 + 1
+
+
+def test_sharded_get(dummy_cl, monkeypatch):
+    async def get(address):
+        if address == 'bad':
+            raise DisconnectedError("bad PV")
+        return EpicsData(data=address, status=Status.HIHI, severity=Severity.MAJOR)
+
+    dummy_cl.shims['ca'].get = get
+    # read shards with dummy_cl, in threads rather than worker processes
+    monkeypatch.setattr(_sharded, '_worker_cl', dummy_cl)
+    cl = ControlLayer(workers=2, shard_threshold=3)
+    cl.sharded._executor = ThreadPoolExecutor(2)
+    cl.sharded.shard_size = 2
+
+    addresses = ['a', 'b', 'bad', 'c', 'd']
+    assert cl.sharded.shard(addresses) == [['a', 'b'], ['bad', 'c'], ['d']]
+    results = cl.get(addresses)
+    assert [r.data for r in results if isinstance(r, EpicsData)] == ['a', 'b', 'c', 'd']
+    assert results[0].status == Status.HIHI
+    assert results[0].severity == Severity.MAJOR
+    assert isinstance(results[2], DisconnectedError)
+    assert cl.health._health['bad'].failures == 1
+
+    # batches are filled directly from the compact results
+    batch = cl.get(addresses, batch=True)
+    assert [batch.value(i) for i in range(5)] == ['a', 'b', None, 'c', 'd']
+    assert batch.stored('a') == ('a', Status.HIHI, Severity.MAJOR)
+    assert batch.stored('bad') == (None, Status.COMM, Severity.INVALID)
+
+    # short requests are not sharded
+    cl.sharded.close()
+    assert cl.get(['a', 'b']) is not None
+    cl.close()
+
+
+class FakeMonitor:
+    def __init__(self, callback):
+        self.callback = callback
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_subscription_manager(dummy_persistent_cl):
+    monitors = []
+
+    def monitor(address, callback):
+        monitors.append(FakeMonitor(callback))
+        return monitors[-1]
+
+    dummy_persistent_cl.shims['ca'].monitor = monitor
+    subscriptions = dummy_persistent_cl.subscriptions
+    updates_a, updates_b = [], []
+
+    def cb_a(address, data):
+        updates_a.append((address, data))
+
+    def cb_b(address, data):
+        updates_b.append((address, data))
+
+    # consumers of the same PV share a single monitor
+    subscriptions.subscribe("SOME:PV", cb_a)
+    subscriptions.subscribe("SOME:PV", cb_b)
+    assert len(monitors) == 1
+    assert subscriptions.consumer_count("SOME:PV") == 2
+
+    # updates fan out to every consumer
+    data = EpicsData(data=1)
+    monitors[0].callback(data)
+    assert updates_a == updates_b == [("SOME:PV", data)]
+    assert subscriptions.latest("SOME:PV") == data
+
+    # late consumers are given the latest value
+    updates_c = []
+    subscriptions.subscribe("SOME:PV", lambda *args: updates_c.append(args))
+    assert updates_c == [("SOME:PV", data)]
+    assert len(monitors) == 1
+
+    # the monitor is only closed once every consumer has left
+    subscriptions.unsubscribe("SOME:PV", cb_a)
+    subscriptions.unsubscribe("SOME:PV", cb_b)
+    assert not monitors[0].closed
+    subscriptions.close()
+    time.sleep(0.05)
+    assert monitors[0].closed
+    assert subscriptions.addresses == []
+
+
+def test_subscription_manager_update_while_opening(dummy_persistent_cl):
+    monitors = {}
+    data = EpicsData(data=1)
+
+    def monitor(address, callback):
+        if monitors:
+            # an open monitor updates while the next is being opened
+            next(iter(monitors.values())).callback(data)
+        monitors[address] = FakeMonitor(callback)
+        return monitors[address]
+
+    dummy_persistent_cl.shims['ca'].monitor = monitor
+    subscriptions = dummy_persistent_cl.subscriptions
+    updates = []
+
+    def subscribe_all():
+        for address in ("PV:A", "PV:B"):
+            subscriptions.subscribe(address, lambda *args: updates.append(args))
+
+    thread = threading.Thread(target=subscribe_all, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert updates == [("PV:A", data)]
+    assert subscriptions.addresses == ["PV:A", "PV:B"]
+    subscriptions.close()
+
+
+def test_subscription_manager_last_consumer(dummy_persistent_cl):
+    monitors = []
+
+    def monitor(address, callback):
+        monitors.append(FakeMonitor(callback))
+        return monitors[-1]
+
+    dummy_persistent_cl.shims['ca'].monitor = monitor
+    subscriptions = dummy_persistent_cl.subscriptions
+
+    def callback(address, data):
+        return
+
+    subscriptions.subscribe("SOME:PV", callback)
+    subscriptions.unsubscribe("SOME:PV", callback)
+    deadline = time.monotonic() + 1
+    while not monitors[0].closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert monitors[0].closed
+    assert subscriptions.consumer_count("SOME:PV") == 0
+
+    # a new consumer opens a new monitor
+    subscriptions.subscribe("SOME:PV", callback)
+    assert len(monitors) == 2
+
+
+def test_subscription_manager_subscribe_many(dummy_persistent_cl):
+    monitors = {}
+    release = threading.Event()
+
+    def monitor(address, callback):
+        release.wait(5)
+        if address == "BAD:PV":
+            raise ValueError("no such PV")
+        monitors[address] = FakeMonitor(callback)
+        return monitors[address]
+
+    dummy_persistent_cl.shims['ca'].monitor = monitor
+    subscriptions = dummy_persistent_cl.subscriptions
+    updates = []
+    addresses = [f"PV:{i}" for i in range(250)] + ["BAD:PV"]
+
+    # returns without waiting for the event loop to open the monitors
+    future = subscriptions.subscribe_many(addresses, lambda *args: updates.append(args))
+    assert not future.done()
+    assert subscriptions.consumer_count("PV:0") == 1
+    release.set()
+
+    failed = future.result(timeout=5)
+    assert list(failed) == ["BAD:PV"]
+    assert isinstance(failed["BAD:PV"], ValueError)
+    assert len(monitors) == 250
+    assert "BAD:PV" not in subscriptions.addresses
+
+    # PVs already monitored are shared, and given their latest value
+    data = EpicsData(data=1)
+    monitors["PV:0"].callback(data)
+    later = []
+    future = subscriptions.subscribe_many(["PV:0"], lambda *args: later.append(args))
+    assert future.result(timeout=1) == {}
+    assert later == [("PV:0", data)]
+    assert len(monitors) == 250
+    subscriptions.close()
+
+
+def test_shim_registry(monkeypatch):
+    shim_registry = registry.ShimRegistry()
+    created = []
+
+    def factory():
+        created.append(1)
+        return DummyShim()
+
+    shim_registry.register("ca", factory)
+    entry_point = EntryPoint(
+        "sim", "superscore.tests.conftest:DummyShim", registry.ENTRY_POINT_GROUP
+    )
+    monkeypatch.setattr(
+        registry, "entry_points", lambda group=None: [entry_point]
+    )
+
+    assert list(shim_registry) == ["ca", "sim"]
+    assert not created
+    assert not shim_registry.is_loaded("ca")
+
+    # shims are only built when looked up, then shared
+    selection = shim_registry.select(["sim", "ca", "unknown"])
+    assert list(selection) == ["ca", "sim"]
+    assert selection["ca"] is shim_registry["ca"]
+    assert created == [1]
+    assert isinstance(selection["sim"], DummyShim)
+    with pytest.raises(KeyError):
+        shim_registry.select(["ca"])["sim"]
+
+
+def test_import_does_not_load_ca():
+    """Backend-only use of superscore must not load the CA libraries"""
+    code = (
+        "import superscore.client, superscore.backends.filestore\n"
+        "from superscore.control_layers import ControlLayer\n"
+        "ControlLayer()\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    )
+    imported = [line.split("|")[-1].strip() for line in proc.stderr.splitlines()]
+    assert "superscore.client" in imported
+    for module in ("aioca", "epicscorelibs", "superscore.control_layers._aioca"):
+        assert module not in imported
+
+
+def test_connect(dummy_cl):
+    async def connect(address):
+        if "BAD" in address:
+            raise DisconnectedError(address)
+
+    dummy_cl.shims['ca'].connect = connect
+    unreachable = dummy_cl.connect(["GOOD:1", "BAD:1", "GOOD:2"])
+    assert list(unreachable) == ["BAD:1"]
+    assert isinstance(unreachable["BAD:1"], DisconnectedError)
+    assert dummy_cl.connect("GOOD:1") == {}
+    assert dummy_cl.health._health["BAD:1"].failures == 1
+    assert "GOOD:1" not in dummy_cl.health._health
+
+
+def test_connect_warm_period(dummy_persistent_cl):
+    released = []
+    dummy_persistent_cl.shims['ca'].release = released.append
+    dummy_persistent_cl.warm_period = 0.4
+
+    dummy_persistent_cl.connect(["PV:1", "PV:2"])
+    time.sleep(0.2)
+    # using a PV keeps it warm
+    dummy_persistent_cl.get("PV:2")
+    time.sleep(0.3)
+    assert released == ["PV:1"]
+    time.sleep(0.4)
+    assert released == ["PV:1", "PV:2"]
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    for latency in np.linspace(0.001, 0.1, 1000):
+        histogram.record(latency)
+    histogram.record(5.0)
+
+    assert histogram.count == 1001
+    assert histogram.max == 5.0
+    assert histogram.percentile(50) == pytest.approx(0.05, rel=0.05)
+    assert histogram.percentile(99) == pytest.approx(0.099, rel=0.05)
+    assert histogram.percentile(100) == 5.0
+
+
+def test_stats(dummy_cl):
+    async def get(address):
+        if address == 'slow':
+            await asyncio.sleep(1)
+        elif address == 'bad':
+            raise DisconnectedError("bad PV")
+        return 'value'
+
+    dummy_cl.shims['ca'].get = get
+    dummy_cl.timeout = 0.05
+    dummy_cl.health.failure_threshold = 0
+    dummy_cl.get(['a', 'b', 'bad', 'slow'])
+    # disabled by default
+    assert dummy_cl.stats is None
+
+    stats = dummy_cl.enable_stats()
+    assert dummy_cl.shims['ca'].stats is stats
+    dummy_cl.get(['a', 'b', 'bad', 'slow', 'pva://c'])
+    dummy_cl.put(['a', 'b'], [1, 2])
+
+    snapshot = json.loads(stats.to_json())
+    operations = {
+        (op['operation'], op['shim']): op for op in snapshot['operations']
+    }
+    get_stats = operations[('get', 'DummyShim')]
+    assert get_stats['count'] == 5
+    assert get_stats['errors'] == {
+        'DisconnectedError': 1, 'CommunicationTimeoutError': 1
+    }
+    assert get_stats['max'] >= 0.05
+    assert operations[('put', 'DummyShim')]['count'] == 2
+    assert snapshot['peak_in_flight']['get'] == 5
+    assert snapshot['in_flight']['get'] == 0
+
+    dummy_cl.disable_stats()
+    assert dummy_cl.shims['ca'].stats is None
+    dummy_cl.get('a')
+    assert stats.latency[('get', 'DummyShim')].count == 5
+
+
+def test_stats_logging(dummy_persistent_cl, monkeypatch):
+    stats = dummy_persistent_cl.enable_stats()
+    logged = []
+    monkeypatch.setattr(stats, "log", lambda: logged.append(time.monotonic()))
+
+    # enabling again replaces the periodic logging rather than adding to it
+    dummy_persistent_cl.enable_stats(log_interval=0.1)
+    dummy_persistent_cl.enable_stats(log_interval=0.1)
+    time.sleep(0.35)
+    assert 2 <= len(logged) <= 4
+
+    dummy_persistent_cl.disable_stats()
+    n_logged = len(logged)
+    time.sleep(0.25)
+    assert len(logged) == n_logged
+    assert dummy_persistent_cl._stats_handle is None
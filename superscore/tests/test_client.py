@@ -1,4 +1,7 @@
+import asyncio
+import configparser
 import os
+from enum import Flag, auto
 from pathlib import Path
 from unittest.mock import patch
 from uuid import UUID, uuid4
@@ -9,10 +12,14 @@ from superscore.backends.core import SearchTerm
 from superscore.backends.filestore import FilestoreBackend
 from superscore.backends.test import TestBackend
 from superscore.client import Client
-from superscore.control_layers import EpicsData
-from superscore.errors import CommunicationError, EntryNotFoundError
+from superscore.control_layers import ControlLayer, EpicsData
+from superscore.control_layers._sim import SimBehavior, SimShim
+from superscore.control_layers.status import StatusGroup
+from superscore.errors import (CommunicationError, CommunicationTimeoutError,
+                               DisconnectedError, EntryNotFoundError)
 from superscore.model import (Collection, Entry, Nestable, Parameter, Readback,
-                              Root, Setpoint, Snapshot)
+                              Root, Setpoint, Snapshot, Status)
+from superscore.restore import Convergence, RestorePhase, RestorePlan
 from superscore.tests.conftest import (MockTaskStatus, nest_depth,
                                        setup_test_stack)
 
@@ -65,8 +72,9 @@ def test_apply(
     sample_database_fixture: Root,
     setpoint_with_readback_fixture: Setpoint
 ):
-    put_mock = test_client.cl.put
-    put_mock.return_value = MockTaskStatus()
+    test_client.cl._run.side_effect = asyncio.run
+    put_mock = test_client.cl.put_many
+    put_mock.side_effect = lambda pvs, values: [MockTaskStatus() for _ in pvs]
     snap = sample_database_fixture.entries[3]
     test_client.apply(snap)
     assert put_mock.call_count == 1
@@ -117,6 +125,238 @@ def test_snap_exception(get_mock, test_client: Client, sample_database_fixture:
     assert snapshot.children[2].data is None
 
 
+@patch('superscore.control_layers.core.ControlLayer._get_one')
+@setup_test_stack(mock_cl=False)
+def test_snap_failure_status(get_mock, test_client: Client, sample_database_fixture: Root):
+    coll = sample_database_fixture.entries[2]
+    get_mock.side_effect = [CommunicationTimeoutError, DisconnectedError,
+                            CommunicationError]
+    snapshot = test_client.snap(coll)
+    assert [child.data for child in snapshot.children] == [None, None, None]
+    assert [child.status for child in snapshot.children] == [
+        Status.TIMEOUT, Status.COMM, Status.UDF
+    ]
+
+
+@patch('superscore.control_layers.core.ControlLayer._get_one')
+@setup_test_stack(mock_cl=False)
+async def test_snap_async(get_mock, test_client: Client, sample_database_fixture: Root):
+    coll = sample_database_fixture.entries[2]
+    get_mock.side_effect = [EpicsData(i) for i in range(3)]
+    snapshot = await test_client.snap_async(coll)
+    assert get_mock.call_count == 3
+    assert [child.data for child in snapshot.children] == [0, 1, 2]
+
+
+def test_prepare():
+    shim = SimShim(auto_create=False)
+    shim.add_pv("sim://GOOD", 1.0)
+    cl = ControlLayer(shims=["sim"])
+    cl.shims = {"sim": shim}
+    client = Client(backend=TestBackend(), control_layer=cl)
+
+    coll = Collection(children=[
+        Parameter(pv_name="sim://GOOD"),
+        Parameter(pv_name="sim://MISSING"),
+    ])
+    unreachable = client.prepare(coll)
+    # meta PVs are connected too
+    assert set(unreachable) == {"sim://MISSING", *Collection.meta_pvs}
+    assert isinstance(unreachable["sim://MISSING"], DisconnectedError)
+
+
+def test_restore():
+    shim = SimShim(auto_create=False)
+    cl = ControlLayer(shims=["sim"], persistent_loop=True)
+    cl.shims = {"sim": shim}
+    client = Client(backend=TestBackend(), control_layer=cl)
+
+    # readbacks that follow their setpoints, within tolerance
+    shim.add_pv("sim://FOLLOW:SP", 0.0)
+    shim.add_pv("sim://FOLLOW:RB", 0.0)
+    shim.pvs["FOLLOW:SP"].monitors.append(
+        lambda edata: shim.set_value("sim://FOLLOW:RB", edata.data + 0.05)
+    )
+    # readback that never moves
+    shim.add_pv("sim://STUCK:SP", 0.0)
+    shim.add_pv("sim://STUCK:RB", 0.0)
+    # readback that can't be reached, and a setpoint that can't be written
+    shim.add_pv("sim://LOST:SP", 0.0)
+
+    def setpoint(name: str, data: float, **kwargs) -> Setpoint:
+        readback = Readback(pv_name=f"sim://{name}:RB", **kwargs)
+        return Setpoint(pv_name=f"sim://{name}:SP", data=data, readback=readback)
+
+    snapshot = Snapshot(children=[
+        setpoint("FOLLOW", 5.0, abs_tolerance=0.1, timeout=1.0),
+        setpoint("STUCK", 5.0, abs_tolerance=0.1, timeout=0.2),
+        setpoint("LOST", 5.0, timeout=0.2),
+        Setpoint(pv_name="sim://MISSING:SP", data=1.0),
+        Setpoint(pv_name="sim://FOLLOW:SP", data=5.0),
+    ])
+    try:
+        report = client.restore(snapshot)
+    finally:
+        cl.close()
+
+    results = report.results
+    assert [result.outcome for result in results] == [
+        Convergence.CONVERGED,
+        Convergence.OUT_OF_TOLERANCE,
+        Convergence.TIMED_OUT,
+        Convergence.PUT_FAILED,
+        Convergence.NO_READBACK,
+    ]
+    assert results[0].readback_value == pytest.approx(5.05)
+    assert results[1].readback_value == 0.0
+    assert isinstance(results[3].error, DisconnectedError)
+    assert not report.success
+    assert len(report.failed) == 3
+    # readbacks are verified concurrently
+    assert report.elapsed < 0.4
+
+
+def test_apply_progress():
+    shim = SimShim()
+    cl = ControlLayer(shims=["sim"])
+    cl.shims = {"sim": shim}
+    client = Client(backend=TestBackend(), control_layer=cl)
+    snapshot = Snapshot(children=[
+        Setpoint(pv_name=f"sim://PV{i}", data=i) for i in range(50)
+    ])
+
+    progress = []
+    group = client.apply(snapshot, progress=lambda grp: progress.append(grp.n_done))
+    assert isinstance(group, StatusGroup)
+    assert group.success and group.n_succeeded == 50
+    assert progress[-1] == 50
+    assert shim.pvs["PV49"].data == 49
+
+
+def test_apply_put_completion():
+    shim = SimShim(behavior=SimBehavior(put_delay=0.1))
+    cl = ControlLayer(shims=["sim"])
+    cl.shims = {"sim": shim}
+    client = Client(backend=TestBackend(), control_layer=cl)
+    coll = Collection(children=[
+        Parameter(pv_name="sim://PATIENT", put_wait=True, put_timeout=1.0),
+        Parameter(pv_name="sim://HASTY", put_wait=True, put_timeout=0.01),
+        Parameter(pv_name="sim://PLAIN"),
+    ])
+    snapshot = client.snap(coll)
+    assert [(sp.put_wait, sp.put_timeout) for sp in snapshot.children] == [
+        (True, 1.0), (True, 0.01), (False, None)
+    ]
+
+    statuses = client.apply(snapshot)
+    assert [status.success for status in statuses] == [True, False, True]
+    assert isinstance(statuses[1].exception(), CommunicationTimeoutError)
+
+
+def test_plan_restore():
+    class Tag(Flag):
+        MAGNETS = auto()
+        RF = auto()
+
+    def setpoint(name: str) -> Setpoint:
+        return Setpoint(pv_name=f"sim://{name}", data=1.0)
+
+    shared = setpoint("SHARED")
+    snapshot = Snapshot(title="root", children=[
+        setpoint("LOOSE"),
+        Snapshot(title="rf", tags={Tag.RF}, children=[setpoint("RF"), shared]),
+        Snapshot(title="magnets", tags={Tag.MAGNETS}, children=[
+            setpoint("QUAD"), shared,
+        ]),
+    ])
+    client = Client(backend=TestBackend())
+
+    plan = client.plan_restore(snapshot, max_rate=10)
+    assert [phase.name for phase in plan.phases] == ["root", "rf", "magnets"]
+    assert [sp.pv_name for sp in plan.phases[2].setpoints] == ["sim://QUAD"]
+    assert plan.max_rate == 10
+    assert len(plan) == 4
+
+    plan = client.plan_restore(snapshot, tag_order=[Tag.MAGNETS, Tag.RF])
+    assert [phase.name for phase in plan.phases] == ["MAGNETS", "RF", "root"]
+    assert [sp.pv_name for sp in plan.phases[0].setpoints] == [
+        "sim://QUAD", "sim://SHARED"
+    ]
+    assert [sp.pv_name for sp in plan.phases[1].setpoints] == ["sim://RF"]
+
+
+def test_restore_plan_limits():
+    shim = SimShim(behavior=SimBehavior(latency=0.05), auto_create=False)
+    cl = ControlLayer(shims=["sim"], persistent_loop=True)
+    cl.shims = {"sim": shim}
+    client = Client(backend=TestBackend(), control_layer=cl)
+
+    in_flight = []
+    put = shim.put
+
+    async def counting_put(address, value):
+        in_flight.append(address)
+        assert len(in_flight) <= 2
+        await put(address, value)
+        in_flight.remove(address)
+
+    shim.put = counting_put
+    for i in range(6):
+        shim.add_pv(f"sim://A{i}")
+    shim.add_pv("sim://B0")
+    progress = []
+
+    plan = RestorePlan(
+        phases=[
+            RestorePhase("a", [Setpoint(pv_name=f"sim://A{i}", data=i) for i in range(6)]),
+            RestorePhase("bad", [Setpoint(pv_name="sim://MISSING", data=1)]),
+            RestorePhase("b", [Setpoint(pv_name="sim://B0", data=1)]),
+        ],
+        max_rate=40,
+        max_in_flight=2,
+    )
+    try:
+        report = client.restore(
+            plan, progress=lambda done, total, result: progress.append((done, total))
+        )
+    finally:
+        cl.close()
+
+    assert [result.outcome for result in report.results] == [
+        *[Convergence.NO_READBACK] * 6, Convergence.PUT_FAILED, Convergence.SKIPPED,
+    ]
+    assert [shim.pvs[f"A{i}"].data for i in range(6)] == list(range(6))
+    assert shim.pvs["B0"].data == 0.0
+    assert report.aborted
+    assert len(report.failed) == 1
+    # 7 puts started 1/40 s apart
+    assert report.elapsed >= 0.15
+    assert progress == [(done, 8) for done in range(1, 9)]
+
+
+async def test_apply_async(
+    test_client: Client,
+    sample_database_fixture: Root,
+    setpoint_with_readback_fixture: Setpoint
+):
+    put_mock = test_client.cl.put_many
+    put_mock.side_effect = lambda pvs, values: [MockTaskStatus() for _ in pvs]
+    snap = sample_database_fixture.entries[3]
+    await test_client.apply_async(snap)
+    assert put_mock.call_count == 1
+    call_args = put_mock.call_args[0]
+    assert len(call_args[0]) == len(call_args[1]) == 3
+
+    put_mock.reset_mock()
+    statuses = await test_client.apply_async(snap, sequential=True)
+    assert put_mock.call_count == 3
+    assert len(statuses) == 3
+
+    put_mock.reset_mock()
+    await test_client.apply_async(setpoint_with_readback_fixture)
+    assert put_mock.call_count == 1
+
+
 @patch('superscore.control_layers.core.ControlLayer._get_one')
 @setup_test_stack(mock_cl=False)
 def test_snap_RO(get_mock, test_client: Client, sample_database_fixture: Root):
@@ -144,6 +384,31 @@ def test_from_cfg(sscore_cfg: str):
     client = Client.from_config()
     assert isinstance(client.backend, FilestoreBackend)
     assert 'ca' in client.cl.shims
+    assert client.cl.loop_thread is None
+
+
+def test_from_cfg_persistent_loop():
+    cfg_parser = configparser.ConfigParser()
+    cfg_parser.read(SAMPLE_CFG)
+    cfg_parser["control_layer"]["persistent_loop"] = "true"
+    client = Client.from_parsed_config(cfg_parser, SAMPLE_CFG)
+
+    assert 'persistent_loop' not in client.cl.shims
+    assert client.cl.loop_thread is not None
+    client.cl.close()
+
+
+def test_from_cfg_workers():
+    cfg_parser = configparser.ConfigParser()
+    cfg_parser.read(SAMPLE_CFG)
+    cfg_parser["control_layer"]["workers"] = "4"
+    cfg_parser["control_layer"]["shard_threshold"] = "100"
+    client = Client.from_parsed_config(cfg_parser, SAMPLE_CFG)
+
+    assert 'workers' not in client.cl.shims
+    assert client.cl.sharded.workers == 4
+    assert client.cl.sharded.shims == list(client.cl.shims)
+    assert client.cl.shard_threshold == 100
 
 
 def test_find_config(sscore_cfg: str):
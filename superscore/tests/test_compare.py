@@ -2,6 +2,7 @@ from datetime import datetime
 from typing import List
 from uuid import UUID
 
+import numpy as np
 import pytest
 
 from superscore.backends.core import SearchTerm
@@ -48,6 +49,26 @@ def simplify_diff(diff: DiffItem) -> DiffItem:
                     path=simplify_path(diff.path))
 
 
+def test_waveform_diff():
+    orig = Setpoint(data=np.zeros(5))
+
+    def setpoint(data) -> Setpoint:
+        return Setpoint(uuid=orig.uuid, creation_time=orig.creation_time, data=data)
+
+    assert list(walk_find_diff(orig, setpoint(np.zeros(5)))) == []
+
+    changed = setpoint(np.array([0.0, 0, 1, 0, 0]))
+    diffs = list(walk_find_diff(orig, changed))
+    assert len(diffs) == 1
+    assert diffs[0].path == [(orig, "data")]
+    assert diffs[0].new_value is changed.data
+
+    for other in (setpoint(np.zeros(6)), setpoint(0.0)):
+        diffs = list(walk_find_diff(orig, other))
+        assert len(diffs) == 1
+        assert diffs[0].path == [(orig, "data")]
+
+
 @pytest.mark.parametrize("orig,new,expected_diffs,", [
     (Parameter(), Parameter(), []),
     (Parameter(pv_name="orig"), Parameter(), [
@@ -1,4 +1,10 @@
+import time
+
+import numpy as np
+
+from superscore.control_layers._aioca import AiocaShim
 from superscore.control_layers.core import ControlLayer
+from superscore.model import Severity, Status
 
 
 def test_ioc(linac_ioc):
@@ -18,3 +24,75 @@ def test_ioc(linac_ioc):
     assert cl.get("SCORETEST:LASR:IN10:TEST0").data == 645.26
     cl.put("SCORETEST:LASR:IN10:TEST0", 600.0)
     assert cl.get("SCORETEST:LASR:IN10:TEST0").data == 600.0
+
+
+def test_ioc_property_monitor(linac_ioc):
+    cl = ControlLayer(persistent_loop=True)
+    cl.shims = {'ca': AiocaShim(monitor_properties=True)}
+    assert cl.get("SCORETEST:LASR:GUNB:TEST2").data == 5
+    assert cl.shims['ca'].ctrl_cache.is_monitored("SCORETEST:LASR:GUNB:TEST2")
+    assert cl.get("SCORETEST:LASR:GUNB:TEST2").data == 5
+    cl.close()
+    assert not cl.shims['ca'].ctrl_cache.is_monitored("SCORETEST:LASR:GUNB:TEST2")
+
+
+def test_ioc_sharded(linac_ioc):
+    cl = ControlLayer(workers=2, shard_threshold=2)
+    pvs = ["SCORETEST:MGNT:GUNB:TEST0", "SCORETEST:LASR:GUNB:TEST2",
+           "SCORETEST:LASR:IN10:TEST0"]
+    assert [edata.data for edata in cl.get(pvs)] == [1, 5, 645.26]
+    cl.close()
+
+
+def test_pva_get_put(pva_server):
+    shim, _ = pva_server
+    cl = ControlLayer(shims=["pva"])
+    cl.shims = {"pva": shim}
+
+    edata = cl.get("pva://PVATEST:FLOAT")
+    assert edata.data == 1.5
+    assert edata.severity == Severity.MINOR
+    assert edata.status == Status.HIGH
+    assert edata.units == "mm"
+    assert edata.precision == 3
+    assert edata.upper_ctrl_limit == 10.0
+    assert edata.lower_ctrl_limit == -10.0
+
+    edata = cl.get("pva://PVATEST:ENUM")
+    assert edata.data == 1
+    assert edata.enums == ["OFF", "ON"]
+    assert edata.status == Status.NO_ALARM
+
+    assert np.array_equal(cl.get("pva://PVATEST:WAVEFORM").data, [1, 2, 3])
+    assert cl.get("pva://PVATEST:STR").data == "text"
+
+    cl.put("pva://PVATEST:FLOAT", 2.5)
+    assert cl.get("pva://PVATEST:FLOAT").data == 2.5
+    assert cl.put("pva://PVATEST:FLOAT", 3.5, wait=True, timeout=1.0).success
+    assert cl.get("pva://PVATEST:FLOAT").data == 3.5
+    cl.put("pva://PVATEST:ENUM", 0)
+    assert cl.get("pva://PVATEST:ENUM").data == 0
+
+
+def test_pva_bulk_get_and_monitor(pva_server):
+    shim, pvs = pva_server
+    cl = ControlLayer(shims=["pva"], persistent_loop=True)
+    cl.shims = {"pva": shim}
+
+    addresses = [f"pva://PVATEST:MANY{i}" for i in range(200)]
+    batch = cl.get(addresses, batch=True)
+    assert batch.ok.all()
+    assert np.array_equal(batch.numeric, np.arange(200))
+
+    updates = []
+    handle = cl.subscribe("pva://PVATEST:MANY0", updates.append)
+    try:
+        pvs["PVATEST:MANY0"].post(-1.0)
+        for _ in range(100):
+            if updates and updates[-1].data == -1.0:
+                break
+            time.sleep(0.05)
+        assert updates[-1].data == -1.0
+    finally:
+        cl.unsubscribe(handle)
+        cl.close()
@@ -1,5 +1,9 @@
+import json
+
 import apischema
+import numpy as np
 
+from superscore.backends.filestore import FilestoreBackend
 from superscore.model import (Collection, Parameter, Readback, Root, Setpoint,
                               Severity, Snapshot, Status)
 
@@ -40,6 +44,35 @@ def test_serialize_snapshot_roundtrip():
     assert deserialized.children[1].children[1] == v2
 
 
+def test_serialize_waveform_roundtrip(tmp_path):
+    waveform = np.linspace(0, 1, 1000)
+    readback = Readback(pv_name="TEST:WF:RBV", data=waveform.copy())
+    setpoint = Setpoint(pv_name="TEST:WF", data=waveform, readback=readback)
+    image = Setpoint(pv_name="TEST:IMAGE", data=np.arange(12, dtype=np.int16).reshape(3, 4))
+    labels = Setpoint(pv_name="TEST:LABELS", data=np.array(["a", "bc"], dtype=object))
+    snapshot = Snapshot(children=[setpoint, image, labels])
+
+    serial = apischema.serialize(Snapshot, snapshot)
+    # stored as a base64 block, not a list of numbers
+    assert isinstance(serial["children"][0]["data"]["data"], str)
+    deserialized = apischema.deserialize(Snapshot, json.loads(json.dumps(serial)))
+    assert deserialized == snapshot
+    assert deserialized.children[0].data.dtype == np.float64
+    assert deserialized.children[1].data.shape == (3, 4)
+    assert deserialized.children[1].data.dtype == np.int16
+    assert list(deserialized.children[2].data) == ["a", "bc"]
+    # deserialized arrays own writable buffers
+    deserialized.children[0].data[0] = 5
+
+    setpoint.data = waveform + 1
+    assert deserialized != snapshot
+
+    backend = FilestoreBackend(str(tmp_path / "waveforms.json"))
+    backend.save_entry(snapshot)
+    backend = FilestoreBackend(str(tmp_path / "waveforms.json"))
+    assert backend.get_entry(snapshot.uuid) == snapshot
+
+
 def test_sample_database_roundtrip(sample_database_fixture: Root):
     ser = apischema.serialize(Root, sample_database_fixture)
     deser = apischema.deserialize(Root, ser)
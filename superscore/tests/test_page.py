@@ -1,5 +1,6 @@
 """Largely smoke tests for various pages"""
 
+import asyncio
 from unittest.mock import MagicMock, PropertyMock, patch
 
 import pytest
@@ -233,6 +234,47 @@ def test_open_page_slot(
         assert page.open_page_slot.called
 
 
+def test_parameter_page_monitor_released(
+    qtbot: QtBot,
+    test_client: Client,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    subscriptions = MagicMock()
+    test_client.cl.subscriptions = subscriptions
+    monkeypatch.setattr(
+        "superscore.widgets.page.entry.monitors_available", lambda client: True
+    )
+    test_client.cl.get.return_value = EpicsData(
+        data=1, lower_ctrl_limit=-10, upper_ctrl_limit=10
+    )
+
+    # closing the page releases its monitor once
+    page = ParameterPage(data=Parameter(pv_name="SOME:PV"), client=test_client)
+    qtbot.waitUntil(lambda: not page._edata_thread.isRunning())
+    subscriptions.subscribe.assert_called_once_with(
+        "SOME:PV", page._monitor_callback
+    )
+    callback = page._monitor_callback
+    page.close()
+    page.deleteLater()
+    qtbot.waitUntil(lambda: subscriptions.unsubscribe.called)
+    qtbot.wait(50)
+    subscriptions.unsubscribe.assert_called_once_with("SOME:PV", callback)
+
+    # a page deleted with its parent, without a close event, also releases it
+    subscriptions.reset_mock()
+    parent = QtWidgets.QWidget()
+    page = ParameterPage(
+        data=Parameter(pv_name="OTHER:PV"), client=test_client, parent=parent
+    )
+    qtbot.waitUntil(lambda: not page._edata_thread.isRunning())
+    callback = page._monitor_callback
+    subscriptions.subscribe.assert_called_once_with("OTHER:PV", callback)
+    parent.deleteLater()
+    qtbot.waitUntil(lambda: subscriptions.unsubscribe.called)
+    subscriptions.unsubscribe.assert_called_once_with("OTHER:PV", callback)
+
+
 @pytest.mark.parametrize(
     "page_fixture,",
     ["parameter_page", "setpoint_page", "readback_page"]
@@ -290,7 +332,8 @@ def test_restore_dialog_restore(
     test_client: Client,
     simple_snapshot_fixture: Snapshot,
 ):
-    put_mock = test_client.cl.put
+    test_client.cl._run.side_effect = asyncio.run
+    put_mock = test_client.cl.put_many
     dialog = RestoreDialog(test_client, simple_snapshot_fixture)
     dialog.restore()
     assert put_mock.call_args.args == test_client._gather_data(simple_snapshot_fixture)
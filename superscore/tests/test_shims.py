@@ -0,0 +1,236 @@
+import asyncio
+import time
+from collections import Counter
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+from aioca import CANothing
+from epicscorelibs.ca import cadef, dbr
+
+from superscore.control_layers import ControlLayer
+from superscore.control_layers._aioca import AiocaShim
+from superscore.control_layers._sim import SimBehavior, SimShim
+from superscore.control_layers.stats import ControlLayerStats
+from superscore.errors import CommunicationTimeoutError, DisconnectedError
+from superscore.model import Severity, Status
+
+
+def augmented_value(value: float, format: int) -> dbr.ca_float:
+    """Build an aioca-style AugmentedValue for ``value``"""
+    aug_value = dbr.ca_float(value)
+    aug_value.severity = 0
+    aug_value.status = 0
+    aug_value.timestamp = 1000.0
+    if format == dbr.FORMAT_CTRL:
+        aug_value.units = "mm"
+        aug_value.precision = 3
+        aug_value.upper_ctrl_limit = 10.0
+        aug_value.lower_ctrl_limit = -10.0
+    return aug_value
+
+
+@pytest.fixture
+def mock_caget():
+    requests = Counter()
+
+    async def caget(address, format=dbr.FORMAT_RAW, **kwargs):
+        requests[format] += 1
+        return augmented_value(1.5, format)
+
+    async def connect(address, **kwargs):
+        return
+
+    with patch("superscore.control_layers._aioca.caget", caget):
+        with patch("superscore.control_layers._aioca.connect", connect):
+            yield requests
+
+
+async def test_aioca_put_wait():
+    caput = AsyncMock()
+    connect = AsyncMock()
+    with patch("superscore.control_layers._aioca.caput", caput):
+        with patch("superscore.control_layers._aioca.connect", connect):
+            shim = AiocaShim()
+            await shim.put("SOME:PV", 1)
+            caput.assert_awaited_with("SOME:PV", 1, wait=False)
+            connect.assert_not_awaited()
+            # processing is unlimited, but connecting is not
+            await shim.put("SOME:PV", 2, wait=True)
+            connect.assert_awaited_with("SOME:PV", timeout=shim.connect_timeout)
+            caput.assert_awaited_with("SOME:PV", 2, wait=True, timeout=None)
+            await shim.put("SOME:PV", 3, wait=True, timeout=30.0)
+            caput.assert_awaited_with("SOME:PV", 3, wait=True, timeout=30.0)
+
+            caput.reset_mock()
+            connect.side_effect = CANothing("SOME:PV", cadef.ECA_TIMEOUT)
+            with pytest.raises(DisconnectedError):
+                await shim.put("SOME:PV", 4, wait=True)
+            caput.assert_not_awaited()
+
+
+async def test_aioca_stats(mock_caget: Counter):
+    shim = AiocaShim()
+    shim.stats = ControlLayerStats()
+    await shim.get("SOME:PV")
+    await shim.get("SOME:PV")
+    latency = shim.stats.latency
+    assert latency[("caget_time", "AiocaShim")].count == 2
+    assert latency[("caget_ctrl", "AiocaShim")].count == 1
+
+
+async def test_aioca_ctrl_cache(mock_caget: Counter):
+    shim = AiocaShim()
+
+    edata = await shim.get("SOME:PV")
+    assert mock_caget[dbr.FORMAT_TIME] == 1
+    assert mock_caget[dbr.FORMAT_CTRL] == 1
+
+    # metadata is fresh, only the TIME request is sent
+    cached_edata = await shim.get("SOME:PV")
+    assert mock_caget[dbr.FORMAT_TIME] == 2
+    assert mock_caget[dbr.FORMAT_CTRL] == 1
+
+    for data in (edata, cached_edata):
+        assert data.data == 1.5
+        assert data.status == Status.NO_ALARM
+        assert data.severity == Severity.NO_ALARM
+        assert data.units == "mm"
+        assert data.precision == 3
+        assert data.upper_ctrl_limit == 10.0
+        assert data.lower_ctrl_limit == -10.0
+
+    shim.invalidate_metadata("SOME:PV")
+    await shim.get("SOME:PV")
+    assert mock_caget[dbr.FORMAT_CTRL] == 2
+
+
+async def test_aioca_ctrl_cache_ttl(mock_caget: Counter):
+    shim = AiocaShim(ctrl_ttl=0)
+    await shim.get("SOME:PV")
+    await shim.get("SOME:PV")
+    assert mock_caget[dbr.FORMAT_CTRL] == 2
+
+    shim = AiocaShim(ctrl_ttl=60)
+    await shim.get("SOME:PV")
+    # age the cached entry past its time-to-live
+    stored_at, value = shim.ctrl_cache._cache["SOME:PV"]
+    shim.ctrl_cache._cache["SOME:PV"] = (stored_at - 61, value)
+    await shim.get("SOME:PV")
+    assert mock_caget[dbr.FORMAT_CTRL] == 4
+
+
+async def test_aioca_errors():
+    shim = AiocaShim()
+
+    async def connect(address, **kwargs):
+        raise CANothing(address, cadef.ECA_TIMEOUT)
+
+    with patch("superscore.control_layers._aioca.connect", connect):
+        with pytest.raises(DisconnectedError):
+            await shim.get("SOME:PV")
+
+    async def caget(address, **kwargs):
+        raise CANothing(address, cadef.ECA_TIMEOUT)
+
+    with patch("superscore.control_layers._aioca.caget", caget):
+        with patch("superscore.control_layers._aioca.connect", AsyncMock()):
+            with pytest.raises(CommunicationTimeoutError):
+                await shim.get("SOME:PV")
+
+
+async def test_aioca_waveform():
+    shim = AiocaShim()
+    waveform = np.linspace(0, 1, 100).view(dbr.ca_array)
+    waveform.severity = 0
+    waveform.status = 0
+    waveform.timestamp = 1000.0
+
+    async def caget(address, format=dbr.FORMAT_RAW, **kwargs):
+        return waveform
+
+    with patch("superscore.control_layers._aioca.caget", caget):
+        with patch("superscore.control_layers._aioca.connect", AsyncMock()):
+            edata = await shim.get("SOME:WAVEFORM")
+
+    # a plain ndarray sharing aioca's buffer, not a copy
+    assert type(edata.data) is np.ndarray
+    assert np.shares_memory(edata.data, waveform)
+    assert edata.data.shape == (100,)
+
+
+def test_sim_shim():
+    shim = SimShim(seed=0)
+    cl = ControlLayer(shims=["sim"])
+    cl.shims = {"sim": shim}
+
+    shim.add_pv("sim://MOTOR", 1.5, units="mm", precision=2)
+    edata = cl.get("sim://MOTOR")
+    assert edata.data == 1.5
+    assert edata.units == "mm"
+    assert edata.status == Status.NO_ALARM
+
+    # unknown PVs are created on demand
+    assert [edata.data for edata in cl.get([f"sim://PV{i}" for i in range(5)])] == [0.0] * 5
+    cl.put("sim://PV0", 3)
+    assert cl.get("sim://PV0").data == 3
+
+    shim.auto_create = False
+    assert isinstance(cl.get("sim://MISSING"), DisconnectedError)
+
+    shim.add_pv("sim://FLAKY", 0.0, behavior=SimBehavior(disconnect_rate=1.0))
+    assert isinstance(cl.get("sim://FLAKY"), DisconnectedError)
+
+    cl.timeout = 0.05
+    shim.add_pv("sim://SLOW", 0.0, behavior=SimBehavior(latency=1.0))
+    assert isinstance(cl.get("sim://SLOW"), CommunicationTimeoutError)
+    # gets answer at once, puts only complete after the put delay
+    shim.add_pv("sim://SLOW_PUT", 0.0, behavior=SimBehavior(put_delay=0.2))
+    assert cl.get("sim://SLOW_PUT").data == 0.0
+    t0 = time.monotonic()
+    status = cl.put("sim://SLOW_PUT", 1.0)
+    assert time.monotonic() - t0 >= 0.2
+    assert status.success
+    assert cl.get("sim://SLOW_PUT").data == 1.0
+
+    # per-put timeouts
+    status = cl.put("sim://SLOW_PUT", 2.0, wait=True, timeout=0.05)
+    assert isinstance(status.exception(), CommunicationTimeoutError)
+    assert cl.get("sim://SLOW_PUT").data == 1.0
+
+
+def test_sim_put_limits():
+    shim = SimShim(behavior=SimBehavior(put_delay=0.05))
+    cl = ControlLayer(shims=["sim"], max_puts_in_flight=2)
+    cl.shims = {"sim": shim}
+
+    t0 = time.monotonic()
+    statuses = cl.put(
+        [f"sim://PV{i}" for i in range(4)], [1, 2, 3, 4],
+        wait=True, timeout=[1.0, 1.0, 1.0, 0.01],
+    )
+    # 2 rounds of 2 puts, the last of which times out in its round
+    assert 0.1 <= time.monotonic() - t0 < 0.2
+    assert [status.success for status in statuses] == [True, True, True, False]
+    with pytest.raises(ValueError):
+        cl.put(["sim://PV0", "sim://PV1"], [1, 2], timeout=[1.0])
+
+
+async def test_sim_shim_monitor():
+    shim = SimShim(seed=0)
+    shim.add_pv(
+        "sim://NOISY", 5.0, behavior=SimBehavior(monitor_rate=100, monitor_noise=0.1)
+    )
+    updates = []
+    handle = shim.monitor("sim://NOISY", updates.append)
+    await asyncio.sleep(0.2)
+    assert updates[0].data == 5.0
+    assert len(updates) > 5
+    assert any(edata.data != 5.0 for edata in updates[1:])
+
+    shim.set_value("sim://NOISY", 7.0)
+    assert updates[-1].data == 7.0
+    handle.close()
+    n_updates = len(updates)
+    await asyncio.sleep(0.05)
+    assert len(updates) == n_updates
@@ -1,9 +1,11 @@
 import asyncio
+import threading
 from typing import Any, Callable
 
 import pytest
 
-from superscore.control_layers.status import TaskStatus
+from superscore.control_layers._loop import LoopThread
+from superscore.control_layers.status import StatusGroup, TaskStatus
 
 
 @pytest.fixture
@@ -81,6 +83,49 @@ def test_status_wait(long_coroutine_status):
     assert isinstance(long_coroutine_status.exception(), asyncio.CancelledError)
 
 
+def test_status_wait_from_thread():
+    loop_thread = LoopThread()
+
+    async def make_status(coro) -> TaskStatus:
+        return TaskStatus(coro)
+
+    async def fail():
+        raise ValueError()
+
+    try:
+        status = loop_thread.run(make_status(asyncio.sleep(0.1)))
+        status.wait(1)
+        assert status.success
+
+        status = loop_thread.run(make_status(asyncio.sleep(10)))
+        with pytest.raises(asyncio.TimeoutError):
+            status.wait(0.05)
+        assert isinstance(status.exception(), asyncio.CancelledError)
+
+        status = loop_thread.run(make_status(fail()))
+        with pytest.raises(ValueError):
+            status.wait(1)
+
+        status = loop_thread.run(make_status(asyncio.sleep(10)))
+        status.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            status.wait(1)
+    finally:
+        loop_thread.stop()
+
+
+def test_status_wait_closed_loop():
+    async def make_status() -> TaskStatus:
+        status = TaskStatus(asyncio.sleep(0))
+        await status
+        return status
+
+    # the loop that ran the task has closed, but the task is finished
+    status = asyncio.run(make_status())
+    status.wait()
+    assert status.success
+
+
 async def test_status_wrap():
     @TaskStatus.wrap
     async def coro_status():
@@ -90,3 +135,53 @@ async def test_status_wrap():
     assert isinstance(st, TaskStatus)
     await st
     assert st.done
+
+
+async def test_status_group(normal_coroutine, failing_coroutine):
+    progress = []
+    completed = []
+    group = StatusGroup(
+        [normal_coroutine() for _ in range(3)] + [failing_coroutine()],
+        progress_interval=0,
+    )
+    group.add_progress_callback(lambda grp: progress.append(grp.n_done))
+    group.add_callback(completed.append)
+    assert not group.done
+    assert group.total == 4
+    with pytest.raises(RuntimeError):
+        group.wait()
+
+    await group
+    assert group.done
+    assert not group.success
+    assert (group.n_done, group.n_succeeded, group.n_failed) == (4, 3, 1)
+    assert list(group.errors) == [3]
+    assert isinstance(group.exception(3), ValueError)
+    assert group.exception(0) is None
+    assert progress == [1, 2, 3, 4]
+    assert completed == [group]
+
+    empty = StatusGroup([])
+    assert empty.done and empty.success
+    empty.wait()
+
+
+def test_status_group_wait_from_thread():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    async def make_group(delay: float) -> StatusGroup:
+        return StatusGroup([asyncio.sleep(delay) for _ in range(100)])
+
+    try:
+        group = asyncio.run_coroutine_threadsafe(make_group(0.2), loop).result()
+        with pytest.raises(asyncio.TimeoutError):
+            group.wait(0.01)
+        group.wait(2)
+        assert group.success
+        assert group.n_succeeded == 100
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -10,14 +10,15 @@ from qtpy import QtCore, QtWidgets
 
 from superscore.backends.test import TestBackend
 from superscore.client import Client
-from superscore.control_layers import EpicsData
+from superscore.control_layers import ControlLayer, EpicsData
+from superscore.errors import CommunicationTimeoutError
 from superscore.model import (Collection, Nestable, Parameter, Root, Severity,
                               Status)
 from superscore.tests.conftest import nest_depth, setup_test_stack
 from superscore.widgets.views import (CustRoles, EntryItem, LivePVHeader,
                                       LivePVTableModel, LivePVTableView,
                                       NestableTableView, RootTree,
-                                      RootTreeView)
+                                      RootTreeView, prepare_in_background)
 
 
 @pytest.fixture(scope='function')
@@ -100,6 +101,120 @@ def test_pvmodel_update(pv_poll_model: LivePVTableModel, qtbot: QtBot):
     )
 
 
+def test_pvmodel_monitors(
+    test_client: Client,
+    parameter_with_readback_fixture: Parameter,
+    dummy_persistent_cl: ControlLayer,
+    qtbot: QtBot,
+):
+    monitors = {}
+
+    def monitor(address, callback):
+        monitors[address] = callback
+        return MagicMock()
+
+    dummy_persistent_cl.shims['ca'].monitor = monitor
+    test_client.cl = dummy_persistent_cl
+
+    # persistent loop allows monitors, which replace the polling thread
+    model = LivePVTableModel(
+        client=test_client,
+        entries=[parameter_with_readback_fixture],
+    )
+    assert model.use_monitors
+    assert model._poll_thread is None
+    pv_name = parameter_with_readback_fixture.pv_name
+    # monitors are opened in the event loop, without blocking the Qt thread
+    qtbot.wait_until(lambda: list(monitors) == [pv_name])
+
+    # deliver a burst of updates from the event loop thread
+    async def send_updates():
+        for i in range(4):
+            monitors[pv_name](EpicsData(i))
+
+    dummy_persistent_cl.loop_thread.run(send_updates())
+    data_index = model.index_from_item(model.entries[0], 'Live Value')
+    qtbot.wait_until(lambda: model.data(data_index, QtCore.Qt.DisplayRole) == '3')
+
+    # the burst is coalesced into a single delivery of the latest value
+    assert model.monitor_buffer.received == 4
+    assert model.monitor_buffer.delivered == 1
+    assert model.monitor_buffer.batches == 1
+
+    model.stop_polling()
+    assert dummy_persistent_cl.subscriptions.addresses == []
+
+
+def test_pvmodel_monitor_batch_rows(
+    test_client: Client,
+    dummy_persistent_cl: ControlLayer,
+    qtbot: QtBot,
+):
+    dummy_persistent_cl.shims['ca'].monitor = lambda address, callback: MagicMock()
+    test_client.cl = dummy_persistent_cl
+    entries = [Parameter(pv_name=f"PV:{i}") for i in range(6)]
+    # a PV shown in two rows
+    entries.append(Parameter(pv_name="PV:0"))
+    model = LivePVTableModel(client=test_client, entries=entries)
+
+    changed = []
+    model.dataChanged.connect(
+        lambda first, last, *args: changed.append((first.row(), last.row()))
+    )
+    data = [EpicsData(i) for i in range(3)]
+    model._monitor_batch_ready({
+        "PV:1": data[1], "PV:0": data[0], "PV:4": data[2], "NOT:SHOWN": data[0],
+    })
+    # only the rows showing the PVs, merged into consecutive ranges
+    assert changed == [(0, 1), (4, 4), (6, 6)]
+    assert model._data_cache["PV:4"] == data[2]
+
+    # unchanged values are not signalled
+    changed.clear()
+    model._monitor_batch_ready({"PV:1": data[1]})
+    assert changed == []
+
+    # rows move with the entries
+    model.remove_entry(entries[0])
+    model._monitor_batch_ready({"PV:1": EpicsData(2)})
+    assert changed == [(0, 0)]
+    model.stop_polling()
+
+
+def test_prepare_in_background_reports(
+    test_client: Client,
+    qtbot: QtBot,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(
+        "superscore.widgets.views.monitors_available", lambda client: True
+    )
+    parent = QtWidgets.QWidget()
+    qtbot.addWidget(parent)
+
+    def wait_for_warning():
+        qtbot.wait_until(lambda: parent.findChild(QtWidgets.QMessageBox) is not None)
+        box = parent.findChild(QtWidgets.QMessageBox)
+        shown = box.text(), box.detailedText()
+        box.close()
+        qtbot.wait_until(lambda: parent.findChild(QtWidgets.QMessageBox) is None)
+        return shown
+
+    # unreachable PVs are shown to the user
+    test_client.prepare = MagicMock(
+        return_value={"BAD:PV": CommunicationTimeoutError("timed out")}
+    )
+    prepare_in_background(test_client, Collection(), parent)
+    text, details = wait_for_warning()
+    assert text == "1 PV(s) could not be reached"
+    assert details == "BAD:PV: timed out"
+
+    # as are errors
+    test_client.prepare = MagicMock(side_effect=RuntimeError("no backend"))
+    prepare_in_background(test_client, Collection(), parent)
+    assert wait_for_warning() == ("Failed to connect PVs ahead of time", "no backend")
+
+
 @pytest.mark.parametrize("row,widget_cls,", [
     (0, QtWidgets.QDoubleSpinBox),
     (1, QtWidgets.QSpinBox),
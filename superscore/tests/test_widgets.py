@@ -7,6 +7,7 @@ from pytestqt.qtbot import QtBot
 
 from superscore.model import Collection
 from superscore.widgets.core import DataWidget
+from superscore.widgets.thread_helpers import CoalescingBuffer
 
 
 @pytest.mark.parametrize(
@@ -38,3 +39,27 @@ def test_collection_datawidget_bridge(
 
     qtbot.addWidget(widget1)
     qtbot.addWidget(widget2)
+
+
+def test_coalescing_buffer(qtbot: QtBot):
+    buffer = CoalescingBuffer(interval=200)
+    batches = []
+    buffer.batch_ready.connect(batches.append)
+
+    with qtbot.wait_signal(buffer.batch_ready):
+        for i in range(10):
+            buffer.push("A", i)
+        buffer.push("B", 0)
+
+    # only the latest value for each key is delivered, in a single batch
+    assert batches == [{"A": 9, "B": 0}]
+    assert buffer.received == 11
+    assert buffer.delivered == 2
+    assert buffer.dropped == 9
+
+    # batches are delivered no more than once per interval
+    buffer.push("A", 10)
+    qtbot.wait(50)
+    assert len(batches) == 1
+    qtbot.wait_until(lambda: len(batches) == 2)
+    assert batches[1] == {"A": 10}
@@ -1,10 +1,14 @@
 from typing import TYPE_CHECKING, Callable, Dict, Protocol, Union
 
+import numpy as np
+
 if TYPE_CHECKING:
     from superscore.model import Entry
     from superscore.widgets.core import DataWidget
 
-AnyEpicsType = Union[int, str, float, bool]
+# Scalar PV values, or waveforms held as numpy arrays.  bool precedes float so
+# apischema does not deserialize booleans as floats.
+AnyEpicsType = Union[bool, int, float, str, np.ndarray]
 
 
 class AnyDataclass(Protocol):
@@ -1,6 +1,10 @@
 import os
+from dataclasses import fields
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
 
 SUPERSCORE_SOURCE_PATH = Path(__file__).parent
 
@@ -27,3 +31,55 @@ def build_abs_path(basedir: str, path: str) -> str:
     if not os.path.isabs(path):
         return os.path.abspath(os.path.join(basedir, path))
     return path
+
+
+def values_equal(left: Any, right: Any) -> bool:
+    """
+    Return True if ``left`` and ``right`` are equal.  Arrays are compared
+    element-wise, and are only equal to arrays of the same shape.
+    """
+    if isinstance(left, np.ndarray) or isinstance(right, np.ndarray):
+        return (
+            isinstance(left, np.ndarray)
+            and isinstance(right, np.ndarray)
+            and left.shape == right.shape
+            and bool(np.array_equal(left, right))
+        )
+    return bool(left == right)
+
+
+def values_close(
+    left: Any,
+    right: Any,
+    rel_tolerance: Optional[float] = None,
+    abs_tolerance: Optional[float] = None,
+) -> bool:
+    """
+    Return True if ``left`` is within tolerance of ``right``, as in
+    ``np.isclose``.  Arrays are close if they have the same shape and every
+    element is close.  Values that can't be compared numerically (e.g. strings)
+    must be equal.
+    """
+    rtol = rel_tolerance or 0.0
+    atol = abs_tolerance or 0.0
+    try:
+        left_array = np.asarray(left)
+        right_array = np.asarray(right)
+        if left_array.shape != right_array.shape:
+            return False
+        return bool(np.all(np.isclose(left_array, right_array, rtol=rtol, atol=atol)))
+    except TypeError:
+        return values_equal(left, right)
+
+
+def dataclass_equal(left: Any, right: Any) -> bool:
+    """
+    Field-by-field equality for dataclasses whose fields may hold arrays, for
+    use as ``__eq__``.
+    """
+    if left.__class__ is not right.__class__:
+        return NotImplemented
+    return all(
+        values_equal(getattr(left, fld.name), getattr(right, fld.name))
+        for fld in fields(left)
+    )
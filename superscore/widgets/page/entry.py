@@ -4,7 +4,7 @@ Widgets for visualizing and editing core model dataclasses
 import logging
 from copy import deepcopy
 from functools import partial
-from typing import Optional, Union
+from typing import Callable, Optional, Union
 
 import qtawesome as qta
 from qtpy import QtWidgets
@@ -19,10 +19,13 @@ from superscore.widgets.core import (DataWidget, Display, NameDescTagsWidget,
                                      WindowLinker)
 from superscore.widgets.manip_helpers import (insert_widget,
                                               match_line_edit_text_width)
-from superscore.widgets.thread_helpers import BusyCursorThread
+from superscore.widgets.thread_helpers import (BusyCursorThread,
+                                               CoalescingBuffer)
 from superscore.widgets.views import (LivePVTableView, NestableTableView,
                                       RootTreeView,
-                                      edit_widget_from_epics_data)
+                                      edit_widget_from_epics_data,
+                                      monitors_available,
+                                      prepare_in_background)
 
 logger = logging.getLogger(__name__)
 
@@ -75,6 +78,10 @@ class NestablePage(Display, DataWidget, WindowLinker):
 
         self.set_editable(self.editable)
 
+        if isinstance(self.data, Collection):
+            # connect ahead of snapshots
+            prepare_in_background(self.client, self.data, self)
+
     def set_editable(self, editable: bool) -> None:
         for col in self.sub_pv_table_view._model.header_enum:
             self.sub_pv_table_view.set_editable(col, editable)
@@ -190,6 +197,9 @@ class BaseParameterPage(Display, DataWidget, WindowLinker):
     save_button: QtWidgets.QPushButton
 
     _edata_thread: Optional[BusyCursorThread]
+    _monitored_pv: Optional[str]
+    _release_monitor: Optional[Callable[..., None]]
+    _live_buffer: CoalescingBuffer
     data: Union[Parameter, Setpoint, Readback]
 
     def __init__(
@@ -203,6 +213,9 @@ class BaseParameterPage(Display, DataWidget, WindowLinker):
         self.value_stored_widget = None
         self.edata = None
         self._edata_thread: Optional[BusyCursorThread] = None
+        self._monitored_pv = None
+        self._release_monitor = None
+        self._live_buffer = CoalescingBuffer(parent=self)
         self._last_data = deepcopy(self.data)
         self.setup_ui()
 
@@ -221,6 +234,7 @@ class BaseParameterPage(Display, DataWidget, WindowLinker):
         self.refresh_button.setToolTip('refresh edit details')
         self.refresh_button.setIcon(qta.icon('ei.refresh'))
         self.refresh_button.clicked.connect(self.get_edata)
+        self._live_buffer.batch_ready.connect(self._live_batch_ready)
         self.get_edata()
 
         self.save_button.clicked.connect(self.save)
@@ -276,11 +290,59 @@ class BaseParameterPage(Display, DataWidget, WindowLinker):
         self.set_editable(self.editable)
 
     def get_edata(self) -> None:
+        self.update_live_monitor()
         if self._edata_thread and self._edata_thread.isRunning():
             return
 
         self._edata_thread.start()
 
+    def update_live_monitor(self) -> None:
+        """
+        Keep the live value updated through a monitor on the current PV, if the
+        client supports monitors.
+        """
+        pv_name = self.data.pv_name
+        if pv_name == self._monitored_pv or not monitors_available(self.client):
+            return
+
+        self.stop_live_monitor()
+        subscriptions = self.client.cl.subscriptions
+        try:
+            subscriptions.subscribe(pv_name, self._monitor_callback)
+        except Exception as ex:
+            logger.warning(f"Unable to monitor {pv_name}: {ex}")
+            return
+        self._monitored_pv = pv_name
+        # pages deleted along with their parent (as in a closed tab) are not
+        # sent a close event, so also release the monitor when destroyed
+        callback = self._monitor_callback
+        # ignores the object passed by `destroyed`
+        self._release_monitor = lambda *args: subscriptions.unsubscribe(
+            pv_name, callback
+        )
+        self.destroyed.connect(self._release_monitor)
+
+    def stop_live_monitor(self) -> None:
+        if self._release_monitor is None:
+            return
+        self.destroyed.disconnect(self._release_monitor)
+        self._release_monitor()
+        self._release_monitor = None
+        self._monitored_pv = None
+        self._live_buffer.clear()
+
+    def _monitor_callback(self, pv_name: str, data: EpicsData) -> None:
+        """Receive a monitor update from any thread, buffer it for the Qt thread"""
+        self._live_buffer.push(pv_name, data)
+
+    def _live_batch_ready(self, batch: dict) -> None:
+        if self._monitored_pv in batch:
+            self._set_live_value(batch[self._monitored_pv])
+
+    def closeEvent(self, a0: QCloseEvent) -> None:
+        self.stop_live_monitor()
+        return super().closeEvent(a0)
+
     def _get_edata(self):
         self.edata = self.client.cl.get(self.data.pv_name)
 
@@ -326,7 +388,9 @@ class BaseParameterPage(Display, DataWidget, WindowLinker):
         self.set_editable(self.editable)
 
     def update_live_value(self):
-        data = self.edata
+        self._set_live_value(self.edata)
+
+    def _set_live_value(self, data: Optional[EpicsData]) -> None:
         if not isinstance(data, EpicsData):
             self.value_live_label.setText("(-)")
         else:
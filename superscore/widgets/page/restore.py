@@ -10,7 +10,7 @@ from superscore.client import Client
 from superscore.model import Setpoint, Snapshot
 from superscore.widgets.core import Display
 from superscore.widgets.views import (LivePVHeader, LivePVTableModel,
-                                      LivePVTableView)
+                                      LivePVTableView, prepare_in_background)
 
 logger = logging.getLogger(__name__)
 
@@ -139,6 +139,8 @@ class RestorePage(Display, QtWidgets.QWidget):
         self.client = client
 
         self.snapshot = data
+        # connect ahead of a restore, reporting unreachable PVs early
+        prepare_in_background(self.client, data, self)
         self.tableView.client = self.client
         self.tableView.set_data(data)
         self.tableView.hideColumn(LivePVHeader.REMOVE)
@@ -1,4 +1,6 @@
-from typing import ClassVar
+import threading
+import time
+from typing import Any, ClassVar, Dict, Hashable
 
 from qtpy import QtCore, QtGui, QtWidgets
 from qtpy.QtCore import QEvent
@@ -98,3 +100,99 @@ class BusyCursorThread(QtCore.QThread):
         if self.ignore_events:
             self.app = QtWidgets.QApplication.instance()
             self.app.removeEventFilter(FILTER)
+
+
+class CoalescingBuffer(QtCore.QObject):
+    """
+    Collects updates pushed from any thread, and delivers them to the Qt thread
+    in batches.  Updates are coalesced per key, so only the latest value for
+    each key is delivered, and at most one batch is delivered per ``interval``.
+
+    Counters of updates received and delivered are kept, to show how many
+    updates were coalesced away.
+
+    ``` python
+    buffer = CoalescingBuffer(interval=33, parent=model)
+    buffer.batch_ready.connect(model.apply_batch)
+
+    # from any thread
+    buffer.push("MY:PV", data)
+    ```
+
+    Parameters
+    ----------
+    interval : int, optional
+        The minimum time between batches in ms, by default 33 (~30 Hz)
+    """
+    batch_ready: ClassVar[QtCore.Signal] = QtCore.Signal(dict)
+    _flush_requested: ClassVar[QtCore.Signal] = QtCore.Signal()
+
+    received: int
+    delivered: int
+    batches: int
+
+    def __init__(self, *args, interval: int = 33, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interval = interval
+        self.received = 0
+        self.delivered = 0
+        self.batches = 0
+        self._pending: Dict[Hashable, Any] = {}
+        self._scheduled = False
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        self._flush_requested.connect(self._schedule_flush)
+
+    @property
+    def dropped(self) -> int:
+        """The number of updates replaced or discarded before delivery"""
+        with self._lock:
+            return self.received - self.delivered - len(self._pending)
+
+    def push(self, key: Hashable, value: Any) -> None:
+        """Queue ``value`` as the latest update for ``key``.  Thread-safe"""
+        with self._lock:
+            self._pending[key] = value
+            self.received += 1
+            if self._scheduled:
+                return
+            self._scheduled = True
+
+        self._flush_requested.emit()
+
+    @QtCore.Slot()
+    def _schedule_flush(self) -> None:
+        """Slot: deliver the next batch once ``interval`` has passed"""
+        elapsed = (time.monotonic() - self._last_flush) * 1000
+        self._timer.start(int(max(0, self.interval - elapsed)))
+
+    @QtCore.Slot()
+    def flush(self) -> None:
+        """Deliver all pending updates immediately as a single batch"""
+        self._timer.stop()
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._scheduled = False
+            self.delivered += len(batch)
+
+        self._last_flush = time.monotonic()
+        if batch:
+            self.batches += 1
+            self.batch_ready.emit(batch)
+
+    def clear(self) -> None:
+        """Discard all pending updates"""
+        self._timer.stop()
+        with self._lock:
+            self._pending = {}
+            self._scheduled = False
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.received = len(self._pending)
+            self.delivered = 0
+            self.batches = 0
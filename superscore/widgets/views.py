@@ -8,30 +8,48 @@ import logging
 import time
 from enum import Enum, IntEnum, auto
 from functools import partial
-from typing import (Any, Callable, ClassVar, Dict, Generator, List, Optional,
-                    Union)
+from typing import (Any, Callable, ClassVar, Dict, Generator, Iterable, List,
+                    Optional, Tuple, Union)
 from uuid import UUID
 from weakref import WeakValueDictionary
 
-import numpy as np
 import qtawesome as qta
 from qtpy import QtCore, QtGui, QtWidgets
 
 from superscore.backends.core import SearchTerm
 from superscore.client import Client
 from superscore.control_layers import EpicsData
+from superscore.control_layers.subscriptions import SubscriptionManager
 from superscore.errors import EntryNotFoundError
 from superscore.model import (Collection, Entry, Nestable, Parameter, Readback,
                               Root, Setpoint, Severity, Snapshot, Status)
 from superscore.qt_helpers import QDataclassBridge
+from superscore.utils import values_close
 from superscore.widgets import ICON_MAP, get_window
 from superscore.widgets.core import QtSingleton, WindowLinker
+from superscore.widgets.thread_helpers import (BusyCursorThread,
+                                               CoalescingBuffer)
 
 logger = logging.getLogger(__name__)
 
 
 PVEntry = Union[Parameter, Setpoint, Readback]
 
+# beyond this many separate ranges of changed rows, a single range spanning
+# them all is signalled instead
+MAX_CHANGED_RANGES = 64
+
+
+def merge_row_ranges(rows: Iterable[int]) -> List[Tuple[int, int]]:
+    """Return ``rows`` as sorted (first, last) ranges of consecutive rows"""
+    ranges = []
+    for row in sorted(set(rows)):
+        if ranges and row == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], row)
+        else:
+            ranges.append((row, row))
+    return ranges
+
 
 def add_open_page_to_menu(
     menu: QtWidgets.QMenu,
@@ -897,13 +915,89 @@ class LivePVHeader(HeaderEnum):
     REMOVE = auto()
 
 
+def monitors_available(client: Client) -> bool:
+    """
+    Return True if ``client`` can keep monitors open.  This requires a
+    ControlLayer with a persistent event loop.
+    """
+    return getattr(client.cl, 'loop_thread', None) is not None
+
+
+class _PrepareReporter(QtCore.QObject):
+    """
+    Shows the outcome of ``prepare_in_background`` over its parent widget.  As
+    a child of that widget, nothing is shown if it is deleted first.
+    """
+    def __init__(self, parent: QtWidgets.QWidget):
+        super().__init__(parent)
+        self.unreachable: Dict[str, Exception] = {}
+
+    @QtCore.Slot()
+    def report_unreachable(self) -> None:
+        if self.unreachable:
+            self.show_warning(
+                f"{len(self.unreachable)} PV(s) could not be reached",
+                "\n".join(f"{pv}: {ex}" for pv, ex in self.unreachable.items()),
+            )
+
+    @QtCore.Slot(Exception)
+    def report_error(self, ex: Exception) -> None:
+        logger.warning(f"Failed to connect PVs ahead of time: {ex}")
+        self.show_warning("Failed to connect PVs ahead of time", str(ex))
+
+    def show_warning(self, text: str, details: str) -> None:
+        box = QtWidgets.QMessageBox(
+            QtWidgets.QMessageBox.Warning, "Connecting PVs", text,
+            parent=self.parent(),
+        )
+        box.setDetailedText(details)
+        box.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        # not modal, so the page stays usable
+        box.show()
+
+
+def prepare_in_background(
+    client: Client,
+    entry: Entry,
+    parent: QtWidgets.QWidget,
+) -> Optional[BusyCursorThread]:
+    """
+    Connect the PVs under ``entry`` in a background thread (see
+    ``Client.prepare``), if ``client`` can keep channels connected between
+    requests.  PVs that could not be reached are shown in a warning over
+    ``parent``.
+
+    The thread belongs to the application, so it may outlive ``parent``, and
+    is deleted once finished.
+    """
+    if not monitors_available(client):
+        return None
+
+    reporter = _PrepareReporter(parent)
+
+    def prepare():
+        reporter.unreachable = client.prepare(entry)
+
+    thread = BusyCursorThread(func=prepare, parent=QtWidgets.QApplication.instance())
+    # queued to the Qt thread, where the reporter lives
+    thread.task_finished.connect(reporter.report_unreachable)
+    thread.raised_exception.connect(reporter.report_error)
+    thread.finished.connect(thread.deleteLater)
+    thread.start()
+    return thread
+
+
 class LivePVTableModel(BaseTableEntryModel):
     # Takes PV-entries
     # shows live details (current PV status, severity)
     # shows setpoints (can be blank)
+    # Live data is either polled in a thread, or received through monitors
+    # shared via the ControlLayer's SubscriptionManager
     headers: List[str]
     _data_cache: Dict[str, EpicsData]
     _poll_thread: Optional[_PVPollThread]
+    _subscribed: Dict[str, SubscriptionManager]
+    monitor_buffer: CoalescingBuffer
     _button_cols: List[LivePVHeader] = [LivePVHeader.OPEN, LivePVHeader.REMOVE]
     _header_to_field: Dict[LivePVHeader, str] = {
         LivePVHeader.PV_NAME: 'pv_name',
@@ -918,6 +1012,8 @@ class LivePVTableModel(BaseTableEntryModel):
         client: Client,
         entries: Optional[List[PVEntry]] = None,
         poll_period: float = 1.0,
+        use_monitors: Optional[bool] = None,
+        monitor_interval: int = 33,
         **kwargs
     ) -> None:
         super().__init__(*args, entries=entries, **kwargs)
@@ -930,13 +1026,29 @@ class LivePVTableModel(BaseTableEntryModel):
 
         self.client = client
         self.poll_period = poll_period
+        if use_monitors is None:
+            use_monitors = monitors_available(client)
+        self.use_monitors = use_monitors
         self._data_cache = {e.pv_name: None for e in entries}
         self._poll_thread = None
+        self._subscribed = {}
+        self._sync_pending = False
+        # rows showing each PV, rebuilt on request after the entries change
+        self._pv_rows = None
+        self.layoutChanged.connect(self._entries_changed)
+        self.modelReset.connect(self._entries_changed)
+        # monitor updates are coalesced per PV and delivered in batches
+        self.monitor_buffer = CoalescingBuffer(interval=monitor_interval, parent=self)
+        self.monitor_buffer.batch_ready.connect(self._monitor_batch_ready)
 
         self.start_polling()
 
     def start_polling(self) -> None:
-        """Start the polling thread"""
+        """Start the polling thread, or subscribe to monitors if ``use_monitors``"""
+        if self.use_monitors:
+            self.start_monitoring()
+            return
+
         if self._poll_thread and self._poll_thread.isRunning():
             return
 
@@ -956,7 +1068,10 @@ class LivePVTableModel(BaseTableEntryModel):
         """
         stop the polling thread, and mark it as stopped.
         wait time in ms
+
+        Unsubscribes from any monitors.
         """
+        self.stop_monitoring()
         if self._poll_thread is None or not self._poll_thread.isRunning():
             return
 
@@ -967,6 +1082,89 @@ class LivePVTableModel(BaseTableEntryModel):
             self._poll_thread.wait(wait_time)
         self._poll_thread.data = {}
 
+    def start_monitoring(self) -> None:
+        """Subscribe to monitors for every PV in the data cache"""
+        self._sync_monitors()
+
+    def stop_monitoring(self) -> None:
+        """Unsubscribe from all monitors"""
+        for pv_name, subscriptions in list(self._subscribed.items()):
+            subscriptions.unsubscribe(pv_name, self._monitor_callback)
+        self._subscribed = {}
+        self.monitor_buffer.clear()
+
+    def _sync_monitors(self) -> None:
+        """Match subscribed monitors to the PVs in the data cache"""
+        if not self.use_monitors:
+            return
+
+        for pv_name in set(self._subscribed) - set(self._data_cache):
+            subscriptions = self._subscribed.pop(pv_name)
+            subscriptions.unsubscribe(pv_name, self._monitor_callback)
+
+        subscriptions = self.client.cl.subscriptions
+        new_pvs = []
+        for pv_name in self._data_cache:
+            if pv_name in self._subscribed:
+                if self._data_cache[pv_name] is None:
+                    # the cache was rebuilt, refill it from the shared monitor
+                    self._data_cache[pv_name] = subscriptions.latest(pv_name)
+                continue
+            new_pvs.append(pv_name)
+            self._subscribed[pv_name] = subscriptions
+
+        if new_pvs:
+            # opened in the event loop, without blocking the Qt thread
+            subscriptions.subscribe_many(new_pvs, self._monitor_callback)
+
+    @QtCore.Slot()
+    def _deferred_sync_monitors(self) -> None:
+        """Slot: subscribe to PVs added to the data cache while painting"""
+        self._sync_pending = False
+        self._sync_monitors()
+
+    def _monitor_callback(self, pv_name: str, data: EpicsData) -> None:
+        """Receive a monitor update from any thread, buffer it for the Qt thread"""
+        self.monitor_buffer.push(pv_name, data)
+
+    @QtCore.Slot()
+    def _entries_changed(self) -> None:
+        """Slot: rows may have moved, so rebuild the map of rows by PV"""
+        self._pv_rows = None
+
+    def rows_for_pv(self, pv_name: str) -> List[int]:
+        """Return the rows showing ``pv_name``"""
+        if self._pv_rows is None:
+            self._pv_rows = {}
+            for row, entry in enumerate(self.entries):
+                pv = getattr(entry, "pv_name", None)
+                self._pv_rows.setdefault(pv, []).append(row)
+        return self._pv_rows.get(pv_name, [])
+
+    @QtCore.Slot(dict)
+    def _monitor_batch_ready(self, batch: Dict[str, EpicsData]) -> None:
+        """
+        Slot: store a batch of monitor updates, and signal the ranges of rows
+        showing the changed PVs to update
+        """
+        rows = []
+        for pv_name, data in batch.items():
+            # each update carries a new timestamp, so only repeats of the
+            # stored update are skipped, without comparing every field
+            if pv_name not in self._data_cache or self._data_cache[pv_name] is data:
+                continue
+            self._data_cache[pv_name] = data
+            rows.extend(self.rows_for_pv(pv_name))
+
+        ranges = merge_row_ranges(rows)
+        if len(ranges) > MAX_CHANGED_RANGES:
+            ranges = [(ranges[0][0], ranges[-1][1])]
+        for first, last in ranges:
+            self.dataChanged.emit(
+                self.createIndex(first, 0),
+                self.createIndex(last, self.columnCount()),
+            )
+
     @QtCore.Slot()
     def _poll_thread_finished(self):
         """Slot: poll thread finished and returned."""
@@ -991,13 +1189,9 @@ class LivePVTableModel(BaseTableEntryModel):
     def _data_changed(self, pv_name: str) -> None:
         """
         Slot: data changed for the given attribute in the thread.
-        Signals the entire row to update (a single PV worth of data)
+        Signals each row showing the PV to update
         """
-        try:
-            row = list(self._data_cache).index(pv_name)
-        except IndexError:
-            ...
-        else:
+        for row in self.rows_for_pv(pv_name):
             self.dataChanged.emit(
                 self.createIndex(row, 0),
                 self.createIndex(row, self.columnCount()),
@@ -1008,7 +1202,9 @@ class LivePVTableModel(BaseTableEntryModel):
         self.layoutAboutToBeChanged.emit()
         self.entries = entries
         self._data_cache = {e.pv_name: None for e in entries}
-        self._poll_thread.data = self._data_cache
+        if self._poll_thread is not None:
+            self._poll_thread.data = self._data_cache
+        self._sync_monitors()
         self.dataChanged.emit(
             self.createIndex(0, 0),
             self.createIndex(self.rowCount(), self.columnCount()),
@@ -1020,7 +1216,9 @@ class LivePVTableModel(BaseTableEntryModel):
         super().remove_entry(entry)
         self.layoutAboutToBeChanged.emit()
         self._data_cache = {e.pv_name: None for e in self.entries}
-        self._poll_thread.data = self._data_cache
+        if self._poll_thread is not None:
+            self._poll_thread.data = self._data_cache
+        self._sync_monitors()
         self.layoutChanged.emit()
 
     def index_from_item(
@@ -1076,6 +1274,7 @@ class LivePVTableModel(BaseTableEntryModel):
         if isinstance(entry, UUID):
             entry = self.client.backend.get_entry(self.entries[index.row()])
             self.entries[index.row()] = entry
+            self._pv_rows = None
 
         if index.column() == LivePVHeader.PV_NAME:
             if role == QtCore.Qt.DecorationRole:
@@ -1186,21 +1385,24 @@ class LivePVTableModel(BaseTableEntryModel):
             r_data = data
             l_data = e_data.data
 
-        try:
-            return np.isclose(l_data, r_data)
-        except TypeError:
-            return l_data == r_data
+        # np.isclose's default tolerances, element-wise for waveforms
+        return values_close(l_data, r_data, rel_tolerance=1e-05, abs_tolerance=1e-08)
 
     def get_cache_data(self, pv_name: str) -> Union[EpicsData, str]:
         """
         Get data from cache if possible.  If missing from cache, add pv_name for
-        the polling thread to update.
+        the polling thread (or monitors) to update.
         """
         data = self._data_cache.get(pv_name, None)
 
         if data is None:
             if pv_name not in self._data_cache:
                 self._data_cache[pv_name] = None
+                if self.use_monitors and not self._sync_pending:
+                    # called while painting, so subscribe once control returns
+                    # to the event loop
+                    self._sync_pending = True
+                    QtCore.QTimer.singleShot(0, self._deferred_sync_monitors)
 
             # TODO: A neat spinny icon maybe?
             return "fetching..."
@@ -1251,6 +1453,14 @@ class _PVPollThread(QtCore.QThread):
         self.running = False
         self._attrs = set()
 
+    def start(self, *args, **kwargs) -> None:
+        """
+        Start the polling thread.  Marked as running here rather than in
+        ``run``, so a ``stop`` issued before the thread begins is not lost.
+        """
+        self.running = True
+        super().start(*args, **kwargs)
+
     def stop(self) -> None:
         """Stop the polling thread."""
         self.running = False
@@ -1273,8 +1483,6 @@ class _PVPollThread(QtCore.QThread):
 
     def run(self):
         """The thread polling loop."""
-        self.running = True
-
         self.data_ready.emit()
 
         while self.running:
@@ -1479,13 +1687,22 @@ class LivePVTableView(BaseDataTableView):
     """
     _model: Optional[LivePVTableModel]
 
-    def __init__(self, *args, poll_period: float = 1.0, **kwargs):
+    def __init__(
+        self,
+        *args,
+        poll_period: float = 1.0,
+        use_monitors: Optional[bool] = None,
+        monitor_interval: int = 33,
+        **kwargs
+    ):
         self._model_cls = LivePVTableModel
         self.open_column = LivePVHeader.OPEN
         self.remove_column = LivePVHeader.REMOVE
         super().__init__(*args, **kwargs)
 
         self.model_kwargs['poll_period'] = poll_period
+        self.model_kwargs['use_monitors'] = use_monitors
+        self.model_kwargs['monitor_interval'] = monitor_interval
 
         self.value_delegate = ValueDelegate()
         for col in [LivePVHeader.PV_NAME, LivePVHeader.STORED_VALUE,
@@ -1523,6 +1740,8 @@ class LivePVTableView(BaseDataTableView):
         if self._model is not None:
             self._model.stop_polling()
             self._model.client = self._client
+            if self.model_kwargs['use_monitors'] is None:
+                self._model.use_monitors = monitors_available(self._client)
             self._model.start_polling()
 
     def closeEvent(self, a0: QtGui.QCloseEvent) -> None: